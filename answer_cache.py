@@ -0,0 +1,294 @@
+# answer_cache.py
+
+import os
+import re
+import time
+import threading
+from functools import lru_cache
+import logging
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from chain_cache import machine_set_key
+from machine_matcher import normalize_text, trie_pattern
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+# Seconds a coalesced request waits for the leader before answering the query itself
+FLIGHT_WAIT_TIMEOUT = float(os.getenv("FLIGHT_WAIT_TIMEOUT", "120"))
+
+def canonicalize_query(query: str, aliases: Optional[Dict[str, str]] = None) -> str:
+    """
+    Normalizes a query for exact matching: case, punctuation and whitespace
+    are ignored and machine aliases are replaced by the canonical name.
+
+    Args:
+        query (str): User question.
+        aliases (Optional[Dict[str, str]]): Output of machine_matcher.machine_aliases.
+
+    Returns:
+        str: Canonical form of the query.
+    """
+    canonical = normalize_text(query)
+    if aliases:
+        pattern = _alias_pattern(frozenset(aliases))
+        canonical = pattern.sub(lambda match: normalize_text(aliases[match.group(1)]), canonical)
+    return canonical
+
+@lru_cache(maxsize=8)
+def _alias_pattern(aliases: frozenset) -> "re.Pattern":
+    return trie_pattern(aliases)
+
+@dataclass
+class CachedAnswer:
+    query: str
+    vector: np.ndarray
+    answer: str
+    sources: List[Document]
+    created: float
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by (query embedding, machine set, index version). A query
+    whose embedding is within the cosine similarity threshold of a cached query
+    for the same machine set and index version is answered from the cache.
+    Entries expire after a TTL and the least recently used are evicted; entries
+    of a previous index version are dropped as soon as a new version is seen.
+    """
+
+    def __init__(self, embeddings: Embeddings, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._index_version: Optional[str] = None
+        self._next_id = 0
+        self._lru: "OrderedDict[int, Tuple[str, ...]]" = OrderedDict()
+        self._groups: Dict[Tuple[str, ...], Dict[int, CachedAnswer]] = {}
+        self._lock = threading.Lock()
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, index_version: str) -> None:
+        if index_version != self._index_version:
+            if self._lru:
+                logger.info(f"Index version changed to {index_version}; dropped {len(self._lru)} cached answers.")
+            self._index_version = index_version
+            self._lru.clear()
+            self._groups.clear()
+
+    def _remove(self, entry_id: int) -> None:
+        machine_key = self._lru.pop(entry_id)
+        group = self._groups[machine_key]
+        del group[entry_id]
+        if not group:
+            del self._groups[machine_key]
+
+    def lookup(self, query: str, machines: List[str], index_version: str) -> Optional[CachedAnswer]:
+        """
+        Returns the cached answer of the most similar cached query for this
+        machine set and index version, if it is above the threshold.
+
+        Args:
+            query (str): User question.
+            machines (List[str]): Machines the question is scoped to.
+            index_version (str): Version of the FAISS index answers were retrieved from.
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer, or None on a miss.
+        """
+        vector = self._embed(query)
+        machine_key = machine_set_key(machines)
+        with self._lock:
+            self._check_version(index_version)
+            group = self._groups.get(machine_key, {})
+            now = time.time()
+            for entry_id in [entry_id for entry_id, entry in group.items() if now - entry.created > self.ttl]:
+                self._remove(entry_id)
+            group = self._groups.get(machine_key, {})
+            if group:
+                entry_ids = list(group)
+                scores = np.vstack([group[entry_id].vector for entry_id in entry_ids]) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._lru.move_to_end(entry_ids[best])
+                    self.hits += 1
+                    entry = group[entry_ids[best]]
+                    logger.info(f"Answer cache hit (similarity {scores[best]:.3f}) for '{query}' "
+                                f"via '{entry.query}'.")
+                    return entry
+            self.misses += 1
+        return None
+
+    def store(self, query: str, machines: List[str], index_version: str, answer: str,
+              sources: List[Document]) -> None:
+        """
+        Caches the answer and sources of a query.
+
+        Args:
+            query (str): User question.
+            machines (List[str]): Machines the question was scoped to.
+            index_version (str): Version of the FAISS index the answer was retrieved from.
+            answer (str): Generated answer.
+            sources (List[Document]): Documents the answer was generated from.
+        """
+        if not answer:
+            return
+        vector = self._embed(query)
+        machine_key = machine_set_key(machines)
+        with self._lock:
+            self._check_version(index_version)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._groups.setdefault(machine_key, {})[entry_id] = CachedAnswer(
+                query, vector, answer, list(sources), time.time())
+            self._lru[entry_id] = machine_key
+            while len(self._lru) > self.max_entries:
+                self._remove(next(iter(self._lru)))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters and the number of cached answers.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._lru)}
+
+class ExactAnswerCache:
+    """
+    LRU of answers keyed by (canonical query, machine set, index version).
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(canonical_query: str, machines: List[str], index_version: str) -> Tuple:
+        return canonical_query, machine_set_key(machines), index_version
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached response for the key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, key: Tuple, response: Dict[str, Any]) -> None:
+        """
+        Caches a response ({"result": answer, "source_documents": docs}).
+        """
+        if not response.get("result"):
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Returns the leader's result or raises its error. Raises TimeoutError if
+        the leader takes longer than `timeout` or gave up without a result.
+        """
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"No answer from the in-flight request within {timeout:g}s.")
+        if self.error is not None:
+            raise self.error
+        if self.result is None:
+            raise TimeoutError("The in-flight request was abandoned.")
+        return self.result
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (the
+    leader) does the work, later callers wait for and share its result. A
+    caller that waits longer than wait_timeout does the work itself.
+    """
+
+    def __init__(self, wait_timeout: float = FLIGHT_WAIT_TIMEOUT):
+        self._flights: Dict[Any, _Flight] = {}
+        self._lock = threading.Lock()
+        self.wait_timeout = wait_timeout
+        self.coalesced = 0
+
+    def begin(self, key: Any) -> Tuple[_Flight, bool]:
+        """
+        Joins the in-flight call for the key or starts a new one.
+
+        Returns:
+            Tuple[_Flight, bool]: The flight and True if the caller is its leader
+            and must call finish().
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def finish(self, key: Any, flight: _Flight, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """
+        Publishes the leader's result (or error) to the waiting callers; with
+        neither, they answer on their own.
+        """
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result, flight.error = result, error
+        flight.done.set()
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        """
+        Runs fn once for all concurrent callers with the same key.
+        """
+        flight, leader = self.begin(key)
+        if not leader:
+            logger.info("Joined an identical in-flight request.")
+            try:
+                return flight.wait(self.wait_timeout)
+            except TimeoutError as e:
+                logger.warning(f"{e} Running the query independently.")
+                return fn()
+        result, error = None, None
+        try:
+            result = fn()
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.finish(key, flight, result, error)
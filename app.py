@@ -2,28 +2,30 @@
 
 import os
 import base64
-import re
 import streamlit as st
-import pdfplumber
-import glob
-import pandas as pd
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.chains import RetrievalQA
-from langchain_community.vectorstores import FAISS
 from langchain_community.llms import ollama
 from langchain_groq import ChatGroq
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from fuzzywuzzy import fuzz, process
 from langchain.memory import ConversationBufferMemory
-from langchain.docstore.document import Document
 from langchain.prompts import PromptTemplate
 import warnings
 import requests
 from dotenv import load_dotenv
+from machine_catalog import load_machine_catalog, pdf_dir_fingerprint, valid_machines
+import preprocess
+from retrieval import MachineIndexes, build_retriever
+from lexical_index import load_lexical_index
+from chain_cache import ChainCache
+from index_manifest import get_index_version
+from llm_health import BackendHealthMonitor
+from answer_cache import ExactAnswerCache, SemanticAnswerCache, SingleFlight, canonicalize_query
+from event_codes import answer_event_code_query, load_event_code_index
+from spec_store import SpecStore, answer_spec_query
+from capability_index import answer_capability_query, asks_for_machines, load_capability_index, machines_for_query
+from machine_matcher import MachineMatcher, machine_aliases
+from streaming import AnswerStream, format_sources, stream_retrieval_qa
 import logging
 import traceback
-from typing import Dict, List
 
 # ---------------------- Setup Logging ----------------------
 logging.basicConfig(level=logging.INFO, 
@@ -42,166 +44,23 @@ pdf_dir = 'pdfs'
 FAISS_DB_DIR = "faiss_dbs"
 os.makedirs(FAISS_DB_DIR, exist_ok=True)
 
+# Stream answers token by token (sources first); set to 0 to render complete answers
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "1") == "1"
+
 # Greeting responses
 GREETING_RESPONSES = ["hi", "hello", "hey", "hola", "howdy", "greetings"]
 
-# --------------------------------------------------------------------------------
-# Utility Functions to Convert DataFrame, Extract Sections, and Detect Processes
-# --------------------------------------------------------------------------------
-
-def dataframe_to_documents(df: pd.DataFrame) -> List[Document]:
-    """
-    Converts a DataFrame of welding processes and machines into
-    a list of string-based Documents for indexing and retrieval.
-    """
-    documents = []
-    for _, row in df.iterrows():
-        process = row["Welding Process"]
-        machines = row["Machines"]
-        content = f"The welding process {process} is compatible with the following machines: {machines}."
-        documents.append(Document(page_content=content))
-    return documents
-
-def extract_sections(pdf_paths: List[str], sections_to_extract: List[str]) -> Dict[str, Dict[str, str]]:
-    """
-    Extracts specified sections from the given PDF files.
-    Returns a nested dict: {machine_name: {section: "content", ...}, ...}
-    """
-    extracted_data = {}
-    # Patterns for the headers we care about
-    section_header_patterns = {
-        section: [
-            re.compile(rf'^\d+\.\s+{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^[IVXLCDM]+\.\s+{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^\d+\s+{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^[IVXLCDM]+\s+{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^\d+\.\s+{re.escape(section.upper())}[:\-]$', re.IGNORECASE),
-            re.compile(rf'^[IVXLCDM]+\.\s+{re.escape(section.upper())}[:\-]$', re.IGNORECASE),
-            re.compile(rf'^{re.escape(section.upper())}[:\-]$', re.IGNORECASE),
-        ]
-        for section in sections_to_extract
-    }
-    # Pattern for any new "unwanted" section header (stop capturing text if we hit a new one)
-    any_section_header_pattern = re.compile(r'^\d+\s+[A-Z\s\-]+$', re.IGNORECASE)
-
-    for pdf_path in pdf_paths:
-        machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        extracted_data[machine_name] = {section: "" for section in sections_to_extract}
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                current_section = None
-                collected_text = {section: "" for section in sections_to_extract}
-
-                for page_number, page in enumerate(pdf.pages, start=1):
-                    page_text = page.extract_text() or ""
-                    lines = page_text.split('\n')
-
-                    for i, line in enumerate(lines):
-                        line_stripped = line.strip()
-                        line_upper = line_stripped.upper()
-
-                        # Check if line is a header for a desired section
-                        matched_section = None
-                        for section, patterns in section_header_patterns.items():
-                            for pattern in patterns:
-                                if pattern.match(line_stripped):
-                                    matched_section = section
-                                    break
-                            if matched_section:
-                                break
-
-                        if matched_section:
-                            current_section = matched_section
-                            # Collect the rest of the page after the matched header
-                            if i + 1 < len(lines):
-                                collected_text[current_section] += '\n'.join(lines[i+1:]) + '\n'
-                            break  # move to next page
-                        elif any_section_header_pattern.match(line_upper):
-                            # Found a new section not in sections_to_extract
-                            current_section = None
-                            continue
-
-                        # If we're inside a desired section, accumulate text
-                        if current_section:
-                            collected_text[current_section] += line + '\n'
-
-                # Final assignment of extracted text
-                for section in sections_to_extract:
-                    content = collected_text[section].strip()
-                    if content:
-                        extracted_data[machine_name][section] = content
-                    else:
-                        extracted_data[machine_name][section] = f"[INFO] No {section.upper()} section found."
-        except Exception as e:
-            logger.error(f"[ERROR] Processing {pdf_path}: {e}")
-
-    return extracted_data
-
-def detect_welding_processes(sections: Dict[str, Dict[str, str]]) -> pd.DataFrame:
-    """
-    Detects which machines support MMA, MIG/MAG, TIG, FCAW, etc.
-    Returns a DataFrame with 'Welding Process' and 'Compatible Machines'.
-    """
-    welding_processes = {
-        "MMA": ["MMA", "STICK", "SMAW"],
-        "MIG/MAG": ["MIG", "MAG", "GMAW"],
-        "TIG": ["TIG", "GTAW"],
-        "FCAW": ["FCAW", "FLUX CORED"]
-    }
-    process_machines = {proc: [] for proc in welding_processes.keys()}
-
-    for machine, content_dict in sections.items():
-        # Combine "INTRODUCTION" + "TECHNICAL DATA" text
-        combined_content = ""
-        for sec_name in ["INTRODUCTION", "TECHNICAL DATA"]:
-            sec_text = content_dict.get(sec_name, "")
-            combined_content += sec_text.upper() + " "
-
-        # Match processes
-        for process_name, keywords in welding_processes.items():
-            for kw in keywords:
-                pattern = r'\b' + re.escape(kw.upper()) + r'\b'
-                if re.search(pattern, combined_content):
-                    process_machines[process_name].append(machine)
-                    break
-
-    data = {"Welding Process": [], "Machines": []}
-    for process_name, machines_list in process_machines.items():
-        if machines_list:
-            data["Welding Process"].append(process_name)
-            data["Machines"].append(", ".join(machines_list))
-
-    df = pd.DataFrame(data)
-    df = df.sort_values("Welding Process").reset_index(drop=True)
-    return df
-
 # --------------------------------------------------------------------------------
 # Existing Streamlit App Code
 # --------------------------------------------------------------------------------
 
-# 1) Validate PDFs by searching for "dimensions" text
-def is_pdf_valid(pdf_path):
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text and "dimensions" in text.lower():
-                    return True
-        return False
-    except Exception as e:
-        logger.error(f"Error validating PDF {pdf_path}: {e}")
-        return False
-
-ESAB_MACHINES = []
-for manual_name in os.listdir(pdf_dir):
-    if manual_name.lower().endswith('.pdf'):
-        pdf_path = os.path.join(pdf_dir, manual_name)
-        machine_name = manual_name[:-4]
-        if is_pdf_valid(pdf_path):
-            ESAB_MACHINES.append(machine_name)
-        else:
-            logger.warning(f"PDF for '{machine_name}' is invalid or lacks 'dimensions' data. Skipping.")
+# 1) Valid machines come from the catalog manifest written by preprocess.py;
+#    it is only rebuilt when the PDFs in the directory change
+@st.cache_data(show_spinner=False)
+def load_esab_machines(fingerprint):
+    return valid_machines(load_machine_catalog(pdf_dir))
+
+ESAB_MACHINES = load_esab_machines(pdf_dir_fingerprint(pdf_dir))
 
 if not ESAB_MACHINES:
     logger.error("No valid machine manuals found in the 'pdfs' directory.")
@@ -211,39 +70,69 @@ if not ESAB_MACHINES:
 GROQ_API_KEY = os.getenv("GROQ_API")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API")
 
+def probe_aws_connection():
+    """
+    Health probe of the AWS GPU server; raises if it does not answer with 200.
+    """
+    response = requests.get(f"http://{AWS_IP}:{AWS_PORT}", timeout=5)
+    if response.status_code != 200:
+        raise ConnectionError(f"AWS GPU server returned HTTP {response.status_code}")
+
+@st.cache_resource
+def get_ollama_monitor():
+    """
+    Process-wide background health monitor (circuit breaker) of the AWS GPU server.
+    """
+    return BackendHealthMonitor("ollama", probe_aws_connection).start()
+
 def check_aws_connection():
     """
-    Checks connection to AWS GPU server.
+    Reports whether the AWS GPU server is usable, from the background health
+    monitor; never makes a network call on the request path.
     """
-    try:
-        response = requests.get(f"http://{AWS_IP}:{AWS_PORT}", timeout=5)
-        if response.status_code == 200:
-            st.sidebar.success("✅ Connected to AWS GPU server")
-            return True
-        else:
-            st.sidebar.error("❌ Connection to AWS GPU server failed")
-            return False
-    except requests.exceptions.RequestException:
-        st.sidebar.error("❌ Unable to connect to AWS GPU server")
-        return False
+    monitor = get_ollama_monitor()
+    status = monitor.status()
+    if monitor.is_available():
+        latency = f" ({status['latency_ms']:.0f} ms)" if status["latency_ms"] is not None else ""
+        st.sidebar.success(f"✅ Connected to AWS GPU server{latency}")
+        return True
+    if status["last_checked"] is None:
+        st.sidebar.info("⏳ Checking AWS GPU server...")
+    else:
+        error_rate = f", {status['error_rate']:.0%} recent errors" if status["error_rate"] is not None else ""
+        st.sidebar.error(f"❌ Unable to connect to AWS GPU server ({status['state']}{error_rate})")
+    return False
 
-def get_llm():
+def get_llm_backend():
     """
-    Initializes the LLM (Ollama on AWS or fallback to Groq).
+    Picks the LLM backend: "ollama" on AWS, or "groq" as the fallback.
     """
     if check_aws_connection():
+        return "ollama"
+    st.sidebar.warning("⚠️ Using Groq model instead of AWS GPU server.")
+    return "groq"
+
+def create_llm(backend):
+    """
+    Initializes the LLM client for a backend returned by get_llm_backend.
+    """
+    if backend == "ollama":
         return ollama.Ollama(
             model="llama3",
             temperature=0.05,
             base_url=f"http://{AWS_IP}:{AWS_PORT}"
         )
-    else:
-        st.sidebar.warning("⚠️ Using Groq model instead of AWS GPU server.")
-        return ChatGroq(
-            groq_api_key=GROQ_API_KEY,
-            model_name="llama3-8b-8192",
-            temperature=0.05
-        )
+    return ChatGroq(
+        groq_api_key=GROQ_API_KEY,
+        model_name="llama3-8b-8192",
+        temperature=0.05
+    )
+
+def get_llm():
+    """
+    Initializes the LLM (Ollama on AWS or fallback to Groq).
+    """
+    return create_llm(get_llm_backend())
 
 manual_template = """
 Welcome to the ESAB Knowledge Base!
@@ -255,149 +144,96 @@ For specific troubleshooting steps or corrective actions, simply enter your quer
 3) Refresh the page if you want to asks questions generally about ESAB machines.
 """
 
-def extract_all_content_as_documents(pdf_paths):
+@st.cache_resource
+def load_or_create_faiss_db():
     """
-    Convert each PDF's text + tables into Document objects for FAISS indexing.
+    Builds, loads or incrementally updates the local FAISS database of all
+    PDF content + the welding process analysis + the machine list doc.
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    documents = []
-    for pdf_path in pdf_paths:
-        machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_number, page in enumerate(pdf.pages, start=1):
-                page_text = page.extract_text() or ""
-                if page_text:
-                    split_texts = text_splitter.split_text(page_text)
-                    for idx, chunk in enumerate(split_texts):
-                        documents.append(Document(
-                            page_content=chunk,
-                            metadata={
-                                "machine": machine_name,
-                                "page": page_number,
-                                "chunk_idx": idx
-                            }
-                        ))
-                # Convert tables to CSV
-                tables = page.extract_tables()
-                if tables:
-                    for table_idx, table in enumerate(tables):
-                        if table and len(table) > 1:
-                            df = pd.DataFrame(table[1:], columns=table[0]).fillna("")
-                            table_csv = df.to_csv(index=False)
-                            documents.append(Document(
-                                page_content=table_csv,
-                                metadata={
-                                    "machine": machine_name,
-                                    "page": page_number,
-                                    "table_idx": table_idx
-                                }
-                            ))
-    return documents
+    db = preprocess.create_faiss_db(ESAB_MACHINES, pdf_dir=pdf_dir, faiss_db_dir=FAISS_DB_DIR)
+    if db is None:
+        st.error(f"Unable to build the knowledge base from the {pdf_dir} directory.")
+    return db
 
 @st.cache_resource
-def load_or_create_faiss_db():
+def load_machine_indexes():
     """
-    Builds or loads a local FAISS database of all PDF content + 
-    the welding process analysis + the machine list doc.
+    Groups the combined FAISS database's documents by machine for machine-scoped search.
     """
-    faiss_db_path = os.path.join(FAISS_DB_DIR, "combined_faiss_db")
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=GOOGLE_API_KEY
-    )
+    db = load_or_create_faiss_db()
+    return MachineIndexes(db) if db is not None else None
 
-    # If FAISS DB already exists, load it
-    if os.path.exists(faiss_db_path):
-        logger.info("Loading existing FAISS database...")
-        db = FAISS.load_local(faiss_db_path, embeddings, allow_dangerous_deserialization=True)
-        logger.info("FAISS database loaded successfully.")
-        return db
-
-    # Otherwise create a new one
-    logger.info("Creating new FAISS database...")
-    pdf_paths = glob.glob(os.path.join(pdf_dir, "*.pdf"))
-    if not pdf_paths:
-        logger.error(f"No PDF files found in {pdf_dir} directory.")
-        st.error(f"No PDF files found in {pdf_dir} directory.")
-        return None
-
-    # 1) Extract base documents from PDFs
-    documents = extract_all_content_as_documents(pdf_paths)
-    logger.info(f"Extracted {len(documents)} documents from PDFs.")
-
-    # 2) Also create a doc listing all ESAB machines
-    all_machines_text = "ESAB Machines List:\n" + "\n".join(ESAB_MACHINES)
-    machine_list_doc = Document(
-        page_content=all_machines_text,
-        metadata={"source": "machine_list"}
-    )
-    documents.append(machine_list_doc)
-
-    # 3) Extract sections and detect welding processes
-    sections_to_extract = ["INTRODUCTION", "TECHNICAL DATA"]
-    extracted_sections = extract_sections(pdf_paths, sections_to_extract)
-    process_df = detect_welding_processes(extracted_sections)
-
-    if not process_df.empty:
-        # Convert that DataFrame into Document objects
-        process_documents = dataframe_to_documents(process_df)
-        # Add them to the list of documents
-        documents.extend(process_documents)
-        logger.info(f"Added {len(process_documents)} welding process documents to the knowledge base.")
-    else:
-        logger.info("No welding processes identified or no relevant sections found.")
+@st.cache_resource
+def load_bm25_index():
+    """
+    Loads the BM25 keyword index written next to the FAISS database.
+    """
+    load_or_create_faiss_db()
+    return load_lexical_index(os.path.join(FAISS_DB_DIR, "combined_faiss_db"))
 
-    # 4) Build the FAISS DB
-    db = FAISS.from_documents(documents, embeddings)
-    db.save_local(faiss_db_path)
-    logger.info(f"FAISS database created and saved to {faiss_db_path}.")
-    return db
+@st.cache_resource
+def load_event_codes():
+    """
+    Loads the per-machine event code index written by preprocess.create_faiss_db.
+    """
+    load_or_create_faiss_db()
+    return load_event_code_index(os.path.join(FAISS_DB_DIR, "event_codes.json"))
 
-def detect_machine_in_query(query):
+@st.cache_resource
+def load_spec_store():
     """
-    Attempt to detect specific machine names from the user's query.
+    Opens the technical data store written by preprocess.create_faiss_db.
     """
-    query_lower = query.lower()
-    machine_names = {m.lower(): m for m in ESAB_MACHINES}
-    detected = []
+    load_or_create_faiss_db()
+    return SpecStore(os.path.join(FAISS_DB_DIR, "specs.sqlite"))
 
-    # Exact match
-    for machine_key in machine_names:
-        pattern = re.compile(rf"\b{re.escape(machine_key)}\b", re.IGNORECASE)
-        if pattern.findall(query_lower):
-            detected.append(machine_names[machine_key])
+@st.cache_resource
+def load_capabilities():
+    """
+    Loads the welding process -> machines index written by preprocess.create_faiss_db.
+    """
+    load_or_create_faiss_db()
+    return load_capability_index(os.path.join(FAISS_DB_DIR, "process_capabilities.json"))
 
-    if detected:
-        return list(set(detected))
+def answer_from_indexes(user_query, detected_machines):
+    """
+    Answers welding process, event code and technical data questions from the
+    structured indexes, without retrieval or LLM. Returns (answer, sources) or None.
+    """
+    return (answer_capability_query(user_query, detected_machines, load_capabilities())
+            or answer_event_code_query(user_query, detected_machines, load_event_codes())
+            or answer_spec_query(user_query, detected_machines, load_spec_store()))
 
-    # Fuzzy matching
-    for machine_key, machine_original in machine_names.items():
-        partial_score = fuzz.partial_ratio(machine_key, query_lower)
-        token_set_score = fuzz.token_set_ratio(machine_key, query_lower)
-        if max(partial_score, token_set_score) > 70:
-            detected.append(machine_original)
+def retrieval_machines(user_query, detected_machines):
+    """
+    Machines to retrieve from: the detected ones, or for questions about a
+    welding process, the machines supporting it.
+    """
+    return detected_machines or machines_for_query(user_query, load_capabilities())
 
-    # Simple "plural" check
-    for machine_key, machine_original in machine_names.items():
-        if machine_original.endswith('i') and not machine_original.endswith('ii'):
-            plural = machine_original + 's'
-            if plural.lower() in query_lower:
-                detected.append(machine_original)
+@st.cache_resource
+def load_index_version():
+    """
+    Version of the loaded FAISS database; cached chains are only reused for the same version.
+    """
+    load_or_create_faiss_db()
+    return get_index_version(os.path.join(FAISS_DB_DIR, "combined_faiss_db"))
 
-    return list(set(detected))
+@st.cache_resource
+def get_machine_matcher():
+    """
+    Compiled matcher over the catalog machine names and their aliases.
+    """
+    return MachineMatcher(ESAB_MACHINES)
 
-def setup_chain(detected_machines):
+def detect_machine_in_query(query):
     """
-    Sets up the RetrievalQA chain with a specialized prompt:
-      - If user mentions a machine, focus on that machine's docs
-      - Otherwise, use entire DB for general queries.
+    Attempt to detect specific machine names from the user's query.
     """
-    llm = get_llm()
-    prompt = PromptTemplate(
-        template="""
+    return get_machine_matcher().detect(query)
+
+QA_PROMPT = PromptTemplate(
+    template="""
 You are an AI assistant for ESAB, knowledgeable about ESAB welding machines.
 
 Instructions:
@@ -415,62 +251,125 @@ Question: {question}
 Provide an accurate and concise answer, referencing only the knowledge you have retrieved.
 Promote ESAB products and services where appropriate.
 """,
-        input_variables=["context", "question"]
-    )
+    input_variables=["context", "question"]
+)
 
+def build_chain(detected_machines, llm_backend):
+    """
+    Builds the RetrievalQA chain with the specialized prompt:
+      - If user mentions a machine, focus on that machine's docs
+      - Otherwise, use entire DB for general queries.
+    """
+    llm = create_llm(llm_backend)
     db = load_or_create_faiss_db()
+    # Machine-scoped queries search sub-indexes of the stored vectors; nothing is re-embedded.
+    # Vector hits are fused with BM25 keyword hits so codes and part numbers are found exactly
+    # and the fused chunks are de-duplicated and packed into the prompt's token budget by MMR
+    retriever = build_retriever(db, load_machine_indexes(), detected_machines, lexical_index=load_bm25_index())
 
-    # If user specified machines, filter docs
-    if detected_machines:
-        relevant_docs = []
-        for doc_id, doc in db.docstore._dict.items():
-            # If doc's 'machine' metadata is in the detected_machines list
-            # or doc is a "welding_process_analysis" or "machine_list" doc, we can keep it
-            machine_meta = doc.metadata.get("machine", "").lower()
-            source_meta = doc.metadata.get("source", "")
-            if machine_meta in [m.lower() for m in detected_machines]:
-                relevant_docs.append(doc)
-            elif source_meta in ("welding_process_analysis", "machine_list"):
-                relevant_docs.append(doc)
-        if relevant_docs:
-            # Make a smaller FAISS with those docs
-            new_db = FAISS.from_documents(relevant_docs, db.embedding_function)
-            retriever = new_db.as_retriever(search_type="similarity", search_kwargs={"k": 13})
-            logger.info(f"Using filtered FAISS DB for {detected_machines} + analysis docs.")
-        else:
-            # Fallback: no matching docs => use entire DB
-            retriever = db.as_retriever(search_type="similarity", search_kwargs={"k": 13})
-            logger.warning("No matching docs for that machine. Using full DB.")
-    else:
-        # No machine => entire DB
-        retriever = db.as_retriever(search_type="similarity", search_kwargs={"k": 13})
-        logger.info("No specific machine. Using entire knowledge base.")
-
-    # Build the QA chain
-    qa_chain = RetrievalQA.from_chain_type(
+    return RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
         retriever=retriever,
         return_source_documents=True,
-        chain_type_kwargs={"prompt": prompt}
+        chain_type_kwargs={"prompt": QA_PROMPT}
     )
 
+@st.cache_resource
+def get_chain_cache():
+    """
+    Process-wide (cross-session) LRU of built chains, warmed up with the
+    general context and the most common machine sets.
+    """
+    cache = ChainCache(build_chain)
+    cache.warm_up(load_index_version(), get_llm_backend())
+    return cache
+
+def setup_chain(detected_machines):
+    """
+    Returns the cached RetrievalQA chain for the detected machines, the current
+    index version and LLM backend, plus a fresh conversation memory.
+    """
+    qa_chain = get_chain_cache().get(detected_machines, load_index_version(), get_llm_backend())
     memory = ConversationBufferMemory(return_messages=True, memory_key="chat_history")
     return qa_chain, memory
 
+@st.cache_resource
+def get_answer_cache():
+    """
+    Process-wide semantic cache of answers; entries are tied to the index version.
+    """
+    return SemanticAnswerCache(load_or_create_faiss_db().embedding_function)
+
+@st.cache_resource
+def get_exact_cache():
+    """
+    Process-wide exact-match cache of answers keyed by the canonical query,
+    plus the single-flight group coalescing identical in-flight queries.
+    """
+    return ExactAnswerCache(), SingleFlight()
+
+MACHINE_ALIASES = machine_aliases(ESAB_MACHINES)
+
+def answer_query(user_query, detected_machines, index_version):
+    """
+    Answers the query from the semantic cache, or with the chain (falling back
+    to Groq if Ollama fails) and caches the answer.
+    """
+    cached = get_answer_cache().lookup(user_query, detected_machines, index_version)
+    if cached is not None:
+        return {"query": user_query, "result": cached.answer, "source_documents": cached.sources}
+
+    llm_backend = get_llm_backend()
+    qa_chain = get_chain_cache().get(detected_machines, index_version, llm_backend)
+    try:
+        response = qa_chain.invoke({"query": user_query})
+    except Exception as e:
+        if llm_backend != "ollama":
+            raise
+        # Count the failure toward the circuit breaker's threshold and answer this query with the fallback backend
+        get_ollama_monitor().record_failure(e)
+        logger.warning(f"Ollama request failed ({e}); retrying with Groq.")
+        qa_chain = get_chain_cache().get(detected_machines, index_version, "groq")
+        response = qa_chain.invoke({"query": user_query})
+    else:
+        if llm_backend == "ollama":
+            get_ollama_monitor().record_success()
+    get_answer_cache().store(user_query, detected_machines, index_version,
+                             response["result"], response.get("source_documents", []))
+    return response
+
 def process_query(user_query, detected_machines):
     """
-    Processes the user query with the chain. 
+    Processes the user query with the chain. Identical (canonicalized) queries
+    are answered from the exact-match cache, and concurrent identical queries
+    share a single retrieval + generation.
     """
     try:
-        if not detected_machines and st.session_state.current_machines:
-            # Re-use any existing context if user had previously set machines
+        # Re-use any existing context if user had previously set machines, except for questions
+        # about all machines ("Which machines support TIG?")
+        if not detected_machines and st.session_state.current_machines and not asks_for_machines(user_query):
             detected_machines = st.session_state.current_machines
 
-        qa_chain, memory = setup_chain(detected_machines)
-        response = qa_chain.invoke({"query": user_query})
+        # Process, event code and technical data questions are answered from the indexes without retrieval or LLM
+        fast_answer = answer_from_indexes(user_query, detected_machines)
+        if fast_answer is not None:
+            return {"query": user_query, "result": fast_answer[0], "source_documents": fast_answer[1]}
+        detected_machines = retrieval_machines(user_query, detected_machines)
+
+        index_version = load_index_version()
+        exact_cache, flights = get_exact_cache()
+        key = ExactAnswerCache.key(canonicalize_query(user_query, MACHINE_ALIASES), detected_machines, index_version)
+        response = exact_cache.get(key)
+        if response is None:
+            def compute():
+                result = answer_query(user_query, detected_machines, index_version)
+                exact_cache.put(key, result)
+                return result
+            response = flights.do(key, compute)
 
         # Keep chat memory for multi-turn
+        memory = ConversationBufferMemory(return_messages=True, memory_key="chat_history")
         memory.chat_memory.add_user_message(user_query)
         memory.chat_memory.add_ai_message(response["result"])
 
@@ -480,6 +379,93 @@ def process_query(user_query, detected_machines):
         logger.error(traceback.format_exc())
         return {"error": "Unable to process the query at the moment."}
 
+def stream_answer(user_query, detected_machines, index_version):
+    """
+    Streams the answer from the semantic cache or the chain, falling back to
+    Groq if Ollama fails before the first token. Returns the response dict.
+    """
+    cached = get_answer_cache().lookup(user_query, detected_machines, index_version)
+    if cached is not None:
+        yield "sources", cached.sources
+        yield "token", cached.answer
+        return {"query": user_query, "result": cached.answer, "source_documents": cached.sources}
+
+    llm_backend = get_llm_backend()
+    qa_chain = get_chain_cache().get(detected_machines, index_version, llm_backend)
+    sources, tokens = None, []
+    try:
+        for kind, value in stream_retrieval_qa(qa_chain, user_query):
+            if kind == "sources":
+                sources = value
+            elif value:
+                tokens.append(value)
+            yield kind, value
+    except Exception as e:
+        # Tokens already shown cannot be taken back; only fall back before the first one
+        if llm_backend != "ollama" or tokens:
+            raise
+        get_ollama_monitor().record_failure(e)
+        logger.warning(f"Ollama request failed ({e}); retrying with Groq.")
+        qa_chain = get_chain_cache().get(detected_machines, index_version, "groq")
+        for kind, value in stream_retrieval_qa(qa_chain, user_query):
+            if kind == "token":
+                tokens.append(value)
+            yield kind, value
+    else:
+        if llm_backend == "ollama":
+            get_ollama_monitor().record_success()
+    response = {"query": user_query, "result": "".join(tokens), "source_documents": sources or []}
+    get_answer_cache().store(user_query, detected_machines, index_version,
+                             response["result"], response["source_documents"])
+    return response
+
+def stream_query(user_query, detected_machines):
+    """
+    Streams the answer to the user query: ("sources", docs) as soon as
+    retrieval finishes, then ("token", text) events from the LLM. Cached and
+    coalesced answers arrive as a single token.
+    """
+    # Re-use any existing context if user had previously set machines, except for questions
+    # about all machines ("Which machines support TIG?")
+    if not detected_machines and st.session_state.current_machines and not asks_for_machines(user_query):
+        detected_machines = st.session_state.current_machines
+
+    fast_answer = answer_from_indexes(user_query, detected_machines)
+    if fast_answer is not None:
+        yield "sources", fast_answer[1]
+        yield "token", fast_answer[0]
+        return
+    detected_machines = retrieval_machines(user_query, detected_machines)
+
+    index_version = load_index_version()
+    exact_cache, flights = get_exact_cache()
+    key = ExactAnswerCache.key(canonicalize_query(user_query, MACHINE_ALIASES), detected_machines, index_version)
+    response = exact_cache.get(key)
+    if response is None:
+        flight, leader = flights.begin(key)
+        if leader:
+            # The leader streams; identical concurrent queries wait for its complete answer
+            response, error = None, None
+            try:
+                response = yield from stream_answer(user_query, detected_machines, index_version)
+                exact_cache.put(key, response)
+                return
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                # Also runs when the client goes away and the generator is closed; waiters then answer on their own
+                flights.finish(key, flight, response, error)
+        logger.info("Joined an identical in-flight request.")
+        try:
+            response = flight.wait(flights.wait_timeout)
+        except TimeoutError as e:
+            logger.warning(f"{e} Answering the query independently.")
+            yield from stream_answer(user_query, detected_machines, index_version)
+            return
+    yield "sources", response.get("source_documents", [])
+    yield "token", response["result"]
+
 @st.cache_data
 def load_esab_logo():
     """
@@ -576,7 +562,16 @@ if prompt := st.chat_input("Ask a question about ESAB or specific machines..."):
     # Generate the AI response
     with st.chat_message("assistant"):
         try:
-            response = process_query(prompt, detected_machines)
+            if STREAM_ANSWERS:
+                stream = AnswerStream(stream_query(prompt, detected_machines))
+                sources = stream.wait_for_sources()
+                if sources:
+                    with st.expander(f"📄 Sources ({len(sources)})"):
+                        st.markdown(format_sources(sources))
+                st.write_stream(stream.tokens())
+                response = {"result": stream.answer}
+            else:
+                response = process_query(prompt, detected_machines)
             if "error" in response:
                 st.markdown(response["error"])
                 st.session_state.machine_chat_history[key].append({
@@ -584,7 +579,8 @@ if prompt := st.chat_input("Ask a question about ESAB or specific machines..."):
                     "content": response["error"]
                 })
             else:
-                st.markdown(response["result"])
+                if not STREAM_ANSWERS:
+                    st.markdown(response["result"])
                 st.session_state.machine_chat_history[key].append({
                     "role": "assistant",
                     "content": response["result"]
@@ -0,0 +1,112 @@
+# bench_docstore.py
+"""
+Docstore Format Benchmark
+-------------------------
+Compares the pickled docstore written by FAISS.save_local (index.pkl) with
+the SQLite (docstore.sqlite) and columnar (docstore.columns) docstores on a
+synthetic corpus: file size, load time and private memory in a fresh
+process, the latency of fetching a retrieval's worth of documents by id,
+and the time to build every Document.
+
+    python bench_docstore.py --sizes 10000 100000
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import tempfile
+import argparse
+import logging
+import subprocess
+import numpy as np
+from typing import Dict
+from bench_faiss_load import build_corpus, memory_kb
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+FORMAT_FILES = {"pickle": "index.pkl", "sqlite": "docstore.sqlite", "columnar": "docstore.columns"}
+
+def open_docstore(path: str, fmt: str):
+    """
+    Returns (docstore, position -> id map) as the matching load mode would.
+    """
+    if fmt == "pickle":
+        with open(os.path.join(path, FORMAT_FILES[fmt]), "rb") as f:
+            return pickle.load(f)
+    if fmt == "sqlite":
+        from disk_docstore import SQLiteDocstore
+        docstore = SQLiteDocstore(os.path.join(path, FORMAT_FILES[fmt]))
+    else:
+        from columnar_docstore import ColumnarDocstore
+        docstore = ColumnarDocstore(os.path.join(path, FORMAT_FILES[fmt]))
+    return docstore, docstore.id_map()
+
+def measure(path: str, fmt: str, k: int, lookups: int) -> Dict:
+    # Import the docstore classes first so only loading is timed
+    import disk_docstore  # noqa: F401
+    from langchain_community.docstore.in_memory import InMemoryDocstore  # noqa: F401
+    before = memory_kb()
+    started = time.perf_counter()
+    docstore, id_map = open_docstore(path, fmt)
+    load_ms = (time.perf_counter() - started) * 1000
+    after = memory_kb()
+
+    rng = np.random.RandomState(1)
+    n = len(id_map)
+    fetch_ms = []
+    for _ in range(lookups):
+        ids = [id_map[int(position)] for position in rng.randint(0, n, k)]
+        started = time.perf_counter()
+        for doc_id in ids:
+            docstore.search(doc_id)
+        fetch_ms.append((time.perf_counter() - started) * 1000)
+
+    ids = list(id_map.values())
+    started = time.perf_counter()
+    docstore.mget(ids) if hasattr(docstore, "mget") else [docstore.search(doc_id) for doc_id in ids]
+    all_ms = (time.perf_counter() - started) * 1000
+    return {"load_ms": load_ms, "private_mb": (after["RssAnon"] - before["RssAnon"]) / 1024,
+            "fetch_p50_ms": float(np.percentile(fetch_ms, 50)), "all_ms": all_ms}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark docstore formats against the pickle.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=8, help="Embedding dimension (the index is not measured).")
+    parser.add_argument("--formats", nargs="+", default=list(FORMAT_FILES))
+    parser.add_argument("--k", type=int, default=13, help="Documents fetched per lookup.")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--measure", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--faiss-db", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        # Child process: one cold load
+        print(json.dumps(measure(args.faiss_db, args.measure, args.k, args.lookups)))
+        sys.exit(0)
+
+    from langchain_community.embeddings import FakeEmbeddings
+    from disk_docstore import load_faiss_db, write_disk_docstore
+    from index_spec import IndexSpec
+    print(f"{'docs':>8} {'format':<9} {'file MB':>8} {'load ms':>9} {'private MB':>11} "
+          f"{'fetch k=' + str(args.k) + ' ms':>14} {'all docs ms':>12}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "combined_faiss_db")
+            logger.info(f"Saving a synthetic database of {size} documents.")
+            build_corpus(path, size, args.dim)
+            db = load_faiss_db(path, FakeEmbeddings(size=args.dim), IndexSpec(), "memory")
+            write_disk_docstore(path, db, "bench", "mmap")
+            write_disk_docstore(path, db, "bench", "columnar")
+            del db
+            for fmt in args.formats:
+                output = subprocess.run([sys.executable, __file__, "--measure", fmt, "--faiss-db", path,
+                                         "--k", str(args.k), "--lookups", str(args.lookups)],
+                                        capture_output=True, text=True, check=True)
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                file_mb = os.path.getsize(os.path.join(path, FORMAT_FILES[fmt])) / 2 ** 20
+                print(f"{size:>8} {fmt:<9} {file_mb:>8.1f} {result['load_ms']:>9.1f} {result['private_mb']:>11.1f} "
+                      f"{result['fetch_p50_ms']:>14.3f} {result['all_ms']:>12.1f}")
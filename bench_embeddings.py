@@ -0,0 +1,111 @@
+# bench_embeddings.py
+"""
+Embedding Backend Benchmark
+---------------------------
+Compares embedding backends on the chunks of the manuals in `pdfs`:
+query latency (p50/p95), document throughput and recall@k of each backend's
+nearest neighbours against a reference backend (the remote Google model by default).
+
+    python bench_embeddings.py --backends google local onnx --k 5
+"""
+
+import os
+import glob
+import time
+import argparse
+import logging
+import numpy as np
+from typing import Dict, List
+from embedding_backends import available_backends, create_backend
+from preprocess import extract_all_content_as_documents
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+SAMPLE_QUERIES = [
+    "What does event code x29 mean?",
+    "Recommended fuse size for Warrior 500i",
+    "Open circuit voltage of the Fabricator ET 410iP",
+    "Duty cycle at 40 °C",
+    "How do I fill the coolant?",
+    "Which machines support TIG welding?",
+    "Gas pressure fault troubleshooting",
+    "Lifting instructions for the power source",
+    "How to connect the welding and return cable",
+    "Thermal protection and fan control",
+    "Mains supply requirements and minimum cable area",
+    "How to order spare parts",
+]
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def benchmark_backend(backend: str, texts: List[str], queries: List[str], k: int) -> Dict:
+    """
+    Embeds the corpus and queries with one backend and measures latency.
+
+    Returns:
+        Dict: Timings plus the top-k neighbour ids of every query.
+    """
+    embeddings, model_id = create_backend(backend)
+    # Warm-up so model loading is not counted as query latency
+    embeddings.embed_query("warm-up")
+
+    started = time.perf_counter()
+    doc_vectors = _normalize(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+    doc_seconds = time.perf_counter() - started
+
+    latencies = []
+    query_vectors = []
+    for query in queries:
+        started = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        latencies.append((time.perf_counter() - started) * 1000)
+    query_vectors = _normalize(np.asarray(query_vectors, dtype=np.float32))
+
+    scores = query_vectors @ doc_vectors.T
+    top_k = np.argsort(-scores, axis=1)[:, :k]
+    return {
+        "backend": backend,
+        "model": model_id,
+        "docs_per_s": len(texts) / doc_seconds if doc_seconds else float("inf"),
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+        "top_k": top_k,
+    }
+
+def recall_at_k(candidate: np.ndarray, reference: np.ndarray) -> float:
+    """
+    Mean overlap of the candidate and reference top-k neighbour sets.
+    """
+    k = reference.shape[1]
+    overlaps = [len(set(c) & set(r)) / k for c, r in zip(candidate, reference)]
+    return float(np.mean(overlaps))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends.")
+    parser.add_argument("--backends", nargs="+", default=["google", "local"], choices=available_backends())
+    parser.add_argument("--reference", default="google", choices=available_backends(),
+                        help="Backend whose neighbours are treated as ground truth.")
+    parser.add_argument("--pdf-dir", default="pdfs")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-chunks", type=int, default=2000)
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.pdf_dir, "*.pdf")))
+    documents = extract_all_content_as_documents(pdf_paths)[:args.max_chunks]
+    texts = [doc.page_content for doc in documents]
+    logger.info(f"Benchmarking on {len(texts)} chunks and {len(SAMPLE_QUERIES)} queries.")
+
+    backends = list(dict.fromkeys([args.reference] + args.backends))
+    results = {backend: benchmark_backend(backend, texts, SAMPLE_QUERIES, args.k) for backend in backends}
+    reference = results[args.reference]["top_k"]
+
+    print(f"{'backend':<10} {'model':<48} {'docs/s':>9} {'q p50 ms':>9} {'q p95 ms':>9} {'recall@' + str(args.k):>9}")
+    for backend in backends:
+        result = results[backend]
+        print(f"{backend:<10} {result['model']:<48} {result['docs_per_s']:>9.1f} "
+              f"{result['query_p50_ms']:>9.2f} {result['query_p95_ms']:>9.2f} "
+              f"{recall_at_k(result['top_k'], reference):>9.3f}")
@@ -0,0 +1,88 @@
+# bench_faiss_index.py
+"""
+FAISS Index Benchmark
+---------------------
+Builds each index spec (see index_spec.py) over synthetic clustered
+embeddings and reports build time, recall@k against the exact flat index,
+single-query latency (p50/p95) and index size.
+
+    python bench_faiss_index.py --sizes 10000 100000 1000000 --dim 768 \
+        --specs flat hnsw:hnsw_m=32 ivf_flat:nprobe=16 ivf_pq:nprobe=32
+"""
+
+import os
+import time
+import tempfile
+import argparse
+import logging
+import numpy as np
+import faiss
+from typing import Dict
+from index_spec import IndexSpec, build_index
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+def synthetic_vectors(n: int, d: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """
+    Unit-norm vectors drawn around random cluster centers, like chunk
+    embeddings of a corpus with recurring topics. Generated in blocks to bound memory.
+    """
+    rng = np.random.RandomState(seed)
+    centers = rng.randn(clusters, d).astype(np.float32)
+    vectors = np.empty((n, d), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        end = min(n, start + 100_000)
+        block = centers[rng.randint(0, clusters, end - start)] + 0.6 * rng.randn(end - start, d).astype(np.float32)
+        faiss.normalize_L2(block)
+        vectors[start:end] = block
+    return vectors
+
+def index_bytes(index: faiss.Index) -> int:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "index.faiss")
+        faiss.write_index(index, path)
+        return os.path.getsize(path)
+
+def benchmark_spec(spec: IndexSpec, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict:
+    started = time.perf_counter()
+    index = build_index(spec, vectors)
+    build_s = time.perf_counter() - started
+
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(ids[0])
+    recall = float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+    return {"build_s": build_s, "recall": recall, "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)), "mb": index_bytes(index) / 2 ** 20}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types against the flat baseline.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension (768 for models/embedding-001).")
+    parser.add_argument("--specs", nargs="+", default=["flat", "hnsw", "ivf_flat", "ivf_pq"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads (1 = per-request latency).")
+    args = parser.parse_args()
+    faiss.omp_set_num_threads(args.threads)
+
+    specs = [IndexSpec.parse(spec) for spec in args.specs]
+    print(f"{'vectors':>9} {'spec':<34} {'build s':>8} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8} {'MB':>9}")
+    for size in args.sizes:
+        vectors = synthetic_vectors(size, args.dim)
+        queries = synthetic_vectors(args.queries, args.dim, seed=1)
+        # Ground truth: exact neighbours from the flat index
+        flat = faiss.IndexFlat(args.dim, faiss.METRIC_L2)
+        flat.add(vectors)
+        _, truth = flat.search(queries, args.k)
+        del flat
+        logger.info(f"Benchmarking {len(specs)} index specs on {size} x {args.dim} vectors.")
+        for spec, text in zip(specs, args.specs):
+            result = benchmark_spec(spec, vectors, queries, truth, args.k)
+            print(f"{size:>9} {text:<34} {result['build_s']:>8.1f} {result['recall']:>9.3f} "
+                  f"{result['p50_ms']:>8.3f} {result['p95_ms']:>8.3f} {result['mb']:>9.1f}")
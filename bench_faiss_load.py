@@ -0,0 +1,106 @@
+# bench_faiss_load.py
+"""
+FAISS Load Benchmark
+--------------------
+Saves a synthetic corpus (chunks of manual-like text with machine/page
+metadata and random embeddings) and loads it in a fresh process per load
+mode (see disk_docstore.py), reporting load time, the time of the first
+query and the process's private (anonymous) and file-backed resident memory.
+File-backed pages of a memory-mapped index are shared by every process
+serving the same files.
+
+    python bench_faiss_load.py --sizes 10000 100000 --dim 768
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import logging
+import subprocess
+import numpy as np
+import faiss
+from typing import Dict
+from langchain_community.embeddings import FakeEmbeddings
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+def memory_kb() -> Dict[str, int]:
+    """
+    Private and file-backed resident memory of this process (Linux).
+    """
+    values = {}
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("RssAnon", "RssFile"):
+                values[key] = int(value.split()[0])
+    return values
+
+def build_corpus(path: str, n: int, dim: int) -> None:
+    from langchain_core.documents import Document
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from disk_docstore import save_faiss_db
+    rng = np.random.RandomState(0)
+    words = ["wire", "feed", "speed", "torch", "current", "voltage", "gas", "duty", "cycle", "fuse",
+             "mains", "supply", "error", "code", "setting", "panel", "Warrior", "MIG", "TIG", "MMA"]
+    ids = [f"{i:016x}" for i in range(n)]
+    docs = {}
+    for i, doc_id in enumerate(ids):
+        text = " ".join(rng.choice(words, 150))
+        docs[doc_id] = Document(page_content=text, metadata={
+            "machine": f"Machine-{i % 40}", "source": "manual", "page": int(i % 120) + 1,
+            "chunk_idx": int(i % 9), "table_idx": None})
+    vectors = rng.randn(n, dim).astype(np.float32)
+    index = faiss.IndexFlat(dim, faiss.METRIC_L2)
+    index.add(vectors)
+    save_faiss_db(FAISS(FakeEmbeddings(size=dim), index, InMemoryDocstore(docs), dict(enumerate(ids))), path)
+
+def load_once(path: str, mode: str, dim: int) -> Dict:
+    from disk_docstore import load_faiss_db
+    from index_spec import IndexSpec
+    before = memory_kb()
+    started = time.perf_counter()
+    db = load_faiss_db(path, FakeEmbeddings(size=dim), IndexSpec(), mode, "bench")
+    load_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    db.similarity_search_by_vector(np.random.RandomState(1).randn(dim).tolist(), k=13)
+    query_ms = (time.perf_counter() - started) * 1000
+    after = memory_kb()
+    return {"load_ms": load_ms, "query_ms": query_ms,
+            "anon_mb": (after["RssAnon"] - before["RssAnon"]) / 1024,
+            "file_mb": (after["RssFile"] - before["RssFile"]) / 1024}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FAISS database load modes.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--modes", nargs="+", default=["memory", "mmap", "columnar"])
+    parser.add_argument("--load", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--faiss-db", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        # Child process: one cold load
+        print(json.dumps(load_once(args.faiss_db, args.load, args.dim)))
+        sys.exit(0)
+
+    print(f"{'chunks':>8} {'mode':<8} {'load ms':>9} {'query ms':>9} {'private MB':>11} {'file MB':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "combined_faiss_db")
+            logger.info(f"Saving a synthetic database of {size} x {args.dim}.")
+            build_corpus(path, size, args.dim)
+            for mode in args.modes:
+                # The first load of a mode writes its on-disk docstore; the timed load is the second
+                for _ in range(2):
+                    output = subprocess.run([sys.executable, __file__, "--load", mode, "--faiss-db", path,
+                                             "--dim", str(args.dim)], capture_output=True, text=True, check=True)
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                print(f"{size:>8} {mode:<8} {result['load_ms']:>9.1f} {result['query_ms']:>9.2f} "
+                      f"{result['anon_mb']:>11.1f} {result['file_mb']:>9.1f}")
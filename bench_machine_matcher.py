@@ -0,0 +1,110 @@
+# bench_machine_matcher.py
+"""
+Machine Detection Benchmark
+---------------------------
+Compares the per-query, per-machine detection loop (one regex compiled and
+two fuzzy scores computed for every machine name on every query) with the
+compiled MachineMatcher on synthetic catalogs of growing size.
+
+    python bench_machine_matcher.py --sizes 10 100 1000 5000 --queries 200
+"""
+
+import re
+import time
+import random
+import argparse
+import logging
+import numpy as np
+from typing import Dict, List
+from rapidfuzz import fuzz
+from machine_matcher import MachineMatcher
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+FAMILIES = ["Warrior", "Fabricator", "Aristo", "Renegade", "Rebel", "Origo", "Caddy", "Rogue", "Buddy", "Cutmaster"]
+SUFFIXES = ["i", "iP", "ix", "es", "em", "et", "cc", "cv", "Pro", "Edge"]
+QUERY_TEMPLATES = [
+    "What is the duty cycle of the {name}?",
+    "How do I fill the coolant on my {alias}?",
+    "Recommended fuse size for {alias}",
+    "Compare the {name} and the {other}",
+    "error x29 on {typo}",
+    "Which machines support TIG welding?",
+    "How to connect the return cable",
+]
+
+def synthetic_catalog(size: int, seed: int = 0) -> List[str]:
+    """
+    Unique machine names built from families, model numbers and suffixes.
+    """
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < size:
+        family = rng.choice(FAMILIES)
+        model = rng.choice([rng.randrange(100, 1000, 5), rng.randrange(10, 100)])
+        suffix = rng.choice(SUFFIXES)
+        separator = rng.choice([" ", "-", " ET ", " EM "])
+        names.add(f"{family}{separator}{model}{suffix}")
+    return sorted(names)
+
+def synthetic_queries(machines: List[str], count: int, seed: int = 1) -> List[str]:
+    """
+    Queries mentioning catalog names, aliases, typos or no machine at all.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name, other = rng.choice(machines), rng.choice(machines)
+        alias = rng.choice([name.lower(), name.replace("-", " "), name.replace(" ", "").replace("-", "")])
+        position = rng.randrange(len(name))
+        typo = name[:position] + name[position + 1:]
+        queries.append(rng.choice(QUERY_TEMPLATES).format(name=name, alias=alias, other=other, typo=typo))
+    return queries
+
+def legacy_detect(query: str, machines: List[str]) -> List[str]:
+    """
+    The previous detection: a regex per machine per query, then a fuzzy score
+    per machine when nothing matched exactly.
+    """
+    query_normalized = re.sub(r'[-]', ' ', query.lower())
+    machine_names = {re.sub(r'[-]', ' ', m.lower()): m for m in machines}
+    detected = [original for key, original in machine_names.items()
+                if re.compile(rf"\b{re.escape(key)}\b", re.IGNORECASE).findall(query_normalized)]
+    if detected:
+        return list(set(detected))
+    return [original for key, original in machine_names.items()
+            if max(fuzz.partial_ratio(key, query_normalized), fuzz.token_set_ratio(key, query_normalized)) > 70]
+
+def time_queries(detect, queries: List[str]) -> Dict:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        detect(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {"p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95))}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark machine-name detection.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 5000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the compiled matcher.")
+    args = parser.parse_args()
+
+    print(f"{'names':>6} {'build ms':>9} {'new p50':>9} {'new p95':>9} {'old p50':>9} {'old p95':>9}")
+    for size in args.sizes:
+        machines = synthetic_catalog(size)
+        queries = synthetic_queries(machines, args.queries)
+
+        started = time.perf_counter()
+        matcher = MachineMatcher(machines)
+        build_ms = (time.perf_counter() - started) * 1000
+        matcher.detect("warm-up")
+        new = time_queries(matcher.detect, queries)
+
+        old = {"p50_ms": float("nan"), "p95_ms": float("nan")}
+        if not args.skip_legacy:
+            old = time_queries(lambda query: legacy_detect(query, machines), queries)
+        print(f"{size:>6} {build_ms:>9.1f} {new['p50_ms']:>9.3f} {new['p95_ms']:>9.3f} "
+              f"{old['p50_ms']:>9.3f} {old['p95_ms']:>9.3f}")
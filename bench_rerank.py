@@ -0,0 +1,100 @@
+# bench_rerank.py
+"""
+Reranking Benchmark
+-------------------
+Compares the current k=13 "stuff" retrieval with wide retrieval (50
+candidates) reranked by a CPU cross-encoder down to a few chunks, on the
+FAISS database in `faiss_dbs`: retrieval and rerank latency, context tokens
+and, with an LLM, generation latency and end-to-end latency.
+
+    python bench_rerank.py --candidates 50 --top-n 5
+    python bench_rerank.py --ollama-url http://15.207.109.112:11434
+"""
+
+import os
+import time
+import argparse
+import logging
+import numpy as np
+from typing import Dict, List, Optional
+from langchain_community.vectorstores import FAISS
+from langchain.prompts import PromptTemplate
+from embedding_backends import get_embeddings
+from context_packer import token_counter
+from reranker import RERANK_MODEL, load_cross_encoder, rerank_documents
+from bench_embeddings import SAMPLE_QUERIES
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+BENCH_PROMPT = PromptTemplate(
+    template="Answer the question about ESAB welding machines from the context.\n\n"
+             "Context:\n{context}\n\nQuestion: {question}\n\nAnswer:",
+    input_variables=["context", "question"]
+)
+
+def run_query(db: FAISS, query: str, k: int, rerank_top_n: Optional[int], latency_budget_ms: Optional[float],
+              llm=None) -> Dict:
+    """
+    Retrieves (and reranks) the context of one query and optionally answers it.
+    """
+    count_tokens = token_counter()
+    started = time.perf_counter()
+    docs = db.similarity_search(query, k=k)
+    retrieval_ms = (time.perf_counter() - started) * 1000
+
+    rerank_ms = 0.0
+    if rerank_top_n is not None:
+        started = time.perf_counter()
+        docs = rerank_documents(query, docs, rerank_top_n, latency_budget_ms=latency_budget_ms)
+        rerank_ms = (time.perf_counter() - started) * 1000
+
+    context = "\n\n".join(doc.page_content for doc in docs)
+    llm_ms = float("nan")
+    if llm is not None:
+        started = time.perf_counter()
+        llm.invoke(BENCH_PROMPT.format(context=context, question=query))
+        llm_ms = (time.perf_counter() - started) * 1000
+    return {"retrieval_ms": retrieval_ms, "rerank_ms": rerank_ms, "llm_ms": llm_ms,
+            "tokens": count_tokens(context), "chunks": len(docs)}
+
+def summarize(name: str, runs: List[Dict]) -> None:
+    end_to_end = [run["retrieval_ms"] + run["rerank_ms"] + run["llm_ms"] for run in runs]
+    print(f"{name:<22} {np.mean([r['chunks'] for r in runs]):>7.1f} {np.mean([r['tokens'] for r in runs]):>8.0f} "
+          f"{np.percentile([r['retrieval_ms'] for r in runs], 50):>9.1f} "
+          f"{np.percentile([r['rerank_ms'] for r in runs], 50):>9.1f} "
+          f"{np.percentile([r['rerank_ms'] for r in runs], 95):>9.1f} "
+          f"{np.percentile([r['llm_ms'] for r in runs], 50):>9.1f} {np.percentile(end_to_end, 50):>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cross-encoder reranking against k=13 stuffing.")
+    parser.add_argument("--faiss-db", default=os.path.join("faiss_dbs", "combined_faiss_db"))
+    parser.add_argument("--baseline-k", type=int, default=13)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--top-n", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--latency-budget-ms", type=float, default=None,
+                        help="Rerank scoring budget (default: unlimited, to measure the full cost).")
+    parser.add_argument("--model", default=RERANK_MODEL)
+    parser.add_argument("--ollama-url", default=None, help="Also time answers with llama3 on this Ollama server.")
+    args = parser.parse_args()
+
+    db = FAISS.load_local(args.faiss_db, get_embeddings(), allow_dangerous_deserialization=True)
+    llm = None
+    if args.ollama_url:
+        from langchain_community.llms import ollama
+        llm = ollama.Ollama(model="llama3", temperature=0.05, base_url=args.ollama_url)
+    if load_cross_encoder(args.model) is None:
+        raise SystemExit(f"Cross-encoder '{args.model}' could not be loaded.")
+    # Warm-up so model loading is not counted as query latency
+    run_query(db, "warm-up", args.candidates, args.top_n[0], None)
+    logger.info(f"Benchmarking {len(SAMPLE_QUERIES)} queries on {db.index.ntotal} chunks.")
+
+    print(f"{'mode':<22} {'chunks':>7} {'tokens':>8} {'ret p50':>9} {'rr p50':>9} {'rr p95':>9} "
+          f"{'llm p50':>9} {'e2e p50':>9}")
+    summarize(f"stuff k={args.baseline_k}",
+              [run_query(db, query, args.baseline_k, None, None, llm) for query in SAMPLE_QUERIES])
+    for top_n in args.top_n:
+        summarize(f"rerank {args.candidates}->{top_n}",
+                  [run_query(db, query, args.candidates, top_n, args.latency_budget_ms, llm)
+                   for query in SAMPLE_QUERIES])
@@ -0,0 +1,102 @@
+# bench_sections.py
+"""
+Section Extraction Benchmark
+----------------------------
+Times the previous section extraction (eight patterns per wanted section
+tried on every line, text grown with `str +=`) against the single-pass
+section tree of section_index on the parsed pages of the manuals in `pdfs`.
+`--scale` repeats every page to simulate longer manuals.
+
+    python bench_sections.py --pdf-dir pdfs --scale 1 10 50 --repeat 5
+"""
+
+import os
+import re
+import glob
+import time
+import argparse
+import logging
+import numpy as np
+from typing import Dict, List
+from pdf_cache import get_pages
+from section_index import parse_sections
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+WANTED = ["INTRODUCTION", "TECHNICAL DATA"]
+
+def legacy_extract(pages: List[Dict], sections_to_extract: List[str]) -> Dict[str, str]:
+    """
+    The previous per-manual extraction loop, without logging.
+    """
+    patterns = {
+        section: [re.compile(rf'^\d+\.\s+{re.escape(section)}$', re.IGNORECASE),
+                  re.compile(rf'^[IVXLCDM]+\.\s+{re.escape(section)}$', re.IGNORECASE),
+                  re.compile(rf'^\d+\s+{re.escape(section)}$', re.IGNORECASE),
+                  re.compile(rf'^[IVXLCDM]+\s+{re.escape(section)}$', re.IGNORECASE),
+                  re.compile(rf'^{re.escape(section)}$', re.IGNORECASE),
+                  re.compile(rf'^\d+\.\s+{re.escape(section)}[:\-]$', re.IGNORECASE),
+                  re.compile(rf'^[IVXLCDM]+\.\s+{re.escape(section)}[:\-]$', re.IGNORECASE),
+                  re.compile(rf'^{re.escape(section)}[:\-]$', re.IGNORECASE)]
+        for section in sections_to_extract
+    }
+    any_header = re.compile(r'^\d+\s+[A-Z\s\-]+$', re.IGNORECASE)
+    current, collected = None, {section: "" for section in sections_to_extract}
+    for page in pages:
+        lines = page["text"].split('\n')
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            matched = next((section for section, section_patterns in patterns.items()
+                            if any(pattern.match(stripped) for pattern in section_patterns)), None)
+            if matched:
+                current = matched
+                if i + 1 < len(lines):
+                    collected[current] += '\n'.join(lines[i + 1:]) + '\n'
+                break
+            elif any_header.match(stripped.upper()):
+                current = None
+                continue
+            if current:
+                collected[current] += line + '\n'
+    return collected
+
+def new_extract(pages: List[Dict], sections_to_extract: List[str]) -> Dict[str, str]:
+    manual = parse_sections(pages, sections_to_extract)
+    return {section: "\n".join(manual.text(s) for s in manual.find(section) if s.level == 1)
+            for section in sections_to_extract}
+
+def time_extract(extract, manuals: List[List[Dict]], repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for pages in manuals:
+            extract(pages, WANTED)
+        runs.append((time.perf_counter() - started) * 1000)
+    return float(np.median(runs))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark section extraction.")
+    parser.add_argument("--pdf-dir", default="pdfs")
+    parser.add_argument("--scale", nargs="+", type=int, default=[1, 10, 50],
+                        help="Times every page is repeated.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.pdf_dir, "*.pdf")))
+    manuals = [get_pages(pdf_path) for pdf_path in pdf_paths]
+    logger.info(f"Benchmarking on {len(manuals)} manuals ({sum(len(pages) for pages in manuals)} pages).")
+
+    for pages in manuals:
+        manual = parse_sections(pages, WANTED)
+        print(f"{len(list(manual.walk()))} sections, "
+              f"{len(manual.roots)} top-level: {[root.title for root in manual.roots]}")
+
+    print(f"{'scale':>6} {'lines':>9} {'old ms':>10} {'new ms':>10} {'speed-up':>9}")
+    for scale in args.scale:
+        scaled = [[page for page in pages for _ in range(scale)] for pages in manuals]
+        line_count = sum(page["text"].count("\n") + 1 for pages in scaled for page in pages)
+        old_ms = time_extract(legacy_extract, scaled, args.repeat)
+        new_ms = time_extract(new_extract, scaled, args.repeat)
+        print(f"{scale:>6} {line_count:>9} {old_ms:>10.1f} {new_ms:>10.1f} {old_ms / (new_ms or 1e-9):>8.1f}x")
@@ -0,0 +1,194 @@
+# capability_index.py
+
+import os
+import re
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+from langchain.docstore.document import Document
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+CAPABILITY_INDEX_PATH = os.path.join("faiss_dbs", "process_capabilities.json")
+CAPABILITY_FORMAT_VERSION = 1
+CAPABILITY_MAX_QUERY_WORDS = 14
+
+WELDING_PROCESSES = {
+    "MMA": ["MMA", "STICK", "SMAW"],
+    "MIG/MAG": ["MIG", "MAG", "GMAW"],
+    "TIG": ["TIG", "GTAW"],
+    "FCAW": ["FCAW", "FLUX CORED"]
+}
+# One pattern per process, compiled once (case-insensitive, whole words)
+PROCESS_PATTERNS = {
+    process: re.compile(r"\b(?:" + "|".join(re.escape(kw) for kw in keywords) + r")\b", re.IGNORECASE)
+    for process, keywords in WELDING_PROCESSES.items()
+}
+# Questions about the machine lineup ("Which machines support TIG?", "List the MIG welders")
+_MACHINES_QUESTION = r"^\s*(?:which|what|list|show)\b.*\b(?:machines?|models?|units?|power sources?|welders?)\b"
+# Explicit capability questions only: the above, "Does the Warrior 500i handle MMA?", "Can the Renegade do TIG?"
+_CAPABILITY_INTENT = re.compile(
+    _MACHINES_QUESTION +
+    r"|\b(?:supports?|supported|handles?|capable|compatible|suitable)\b"
+    r"|^\s*(?:does|do|can|is|are)\b.*\b(?:do|weld|run)\b",
+    re.IGNORECASE
+)
+# Words a capability question may contain besides processes and machine names; any other
+# content word ("duty cycle", "torch", "gas") means the question is about something else
+_CAPABILITY_WORDS = {
+    "which", "what", "list", "show", "me", "all", "any", "the", "a", "an", "esab", "machine", "machines",
+    "model", "models", "unit", "units", "power", "source", "sources", "welder", "welders", "equipment",
+    "support", "supports", "supported", "handle", "handles", "capable", "of", "compatible", "with", "suitable",
+    "for", "can", "do", "does", "is", "are", "it", "this", "that", "my", "your", "weld", "welding", "run",
+    "process", "processes", "and", "or", "either", "both", "there", "available", "in", "on", "mode", "modes",
+}
+_PROCESS_WORDS = {word.lower() for keywords in WELDING_PROCESSES.values() for kw in keywords for word in kw.split()}
+
+def detect_processes(text: str) -> List[str]:
+    """
+    Welding processes mentioned in a text, in WELDING_PROCESSES order.
+    """
+    return [process for process, pattern in PROCESS_PATTERNS.items() if pattern.search(text)]
+
+def process_capabilities(sections: Dict[str, Dict[str, str]]) -> Dict[str, List[str]]:
+    """
+    Builds the process -> machines matrix from the INTRODUCTION and TECHNICAL
+    DATA sections of each manual.
+
+    Args:
+        sections (Dict[str, Dict[str, str]]): Extracted sections per machine.
+
+    Returns:
+        Dict[str, List[str]]: Process -> sorted machines supporting it (every process present).
+    """
+    capabilities = {process: [] for process in WELDING_PROCESSES}
+    for machine in sorted(sections):
+        content = " ".join(sections[machine].get(name, "") for name in ["INTRODUCTION", "TECHNICAL DATA"])
+        for process in detect_processes(content):
+            capabilities[process].append(machine)
+            logger.info(f"Machine '{machine}' supports welding process '{process}'.")
+    return capabilities
+
+def save_capability_index(capabilities: Dict[str, List[str]], path: str = CAPABILITY_INDEX_PATH) -> None:
+    """
+    Persists the process -> machines matrix (only rewritten when it changed).
+    """
+    data = {"format_version": CAPABILITY_FORMAT_VERSION, "processes": capabilities}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                if json.load(f) == data:
+                    return
+        except Exception:
+            pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_capability_index(path: str = CAPABILITY_INDEX_PATH) -> Dict[str, List[str]]:
+    """
+    Loads the process -> machines matrix ({} if missing or outdated).
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable capability index '{path}': {e}")
+        return {}
+    return data.get("processes", {}) if data.get("format_version") == CAPABILITY_FORMAT_VERSION else {}
+
+def machine_family(machine: str) -> str:
+    """
+    Family of a machine: the lower-cased first word of its name ("warrior", "fabricator").
+    """
+    return re.split(r"[\s_-]+", machine.strip())[0].lower()
+
+def capable_machines(capabilities: Dict[str, List[str]], processes: List[str],
+                     family: Optional[str] = None, require_all: bool = True) -> List[str]:
+    """
+    Machines supporting the processes (all of them, or any with require_all=False),
+    optionally restricted to a machine family.
+    """
+    machine_sets = [set(capabilities.get(process, [])) for process in processes]
+    if not machine_sets:
+        return []
+    machines = set.intersection(*machine_sets) if require_all else set.union(*machine_sets)
+    if family:
+        machines = {m for m in machines if machine_family(m) == family.lower()}
+    return sorted(machines)
+
+def asks_for_machines(query: str) -> bool:
+    """
+    Whether the question asks which machines (of all of them) match, e.g.
+    "Which machines support TIG?"; earlier conversation context must not narrow it.
+    """
+    return re.search(_MACHINES_QUESTION, query, re.IGNORECASE) is not None
+
+def machines_for_query(query: str, capabilities: Dict[str, List[str]]) -> List[str]:
+    """
+    Machines supporting any welding process mentioned in the query, for use as
+    a retrieval filter; [] if no process is mentioned.
+    """
+    processes = detect_processes(query)
+    return capable_machines(capabilities, processes, require_all=False) if processes else []
+
+def answer_capability_query(query: str, machines: List[str],
+                            capabilities: Dict[str, List[str]]) -> Optional[Tuple[str, List[Document]]]:
+    """
+    Answers "Which machines handle TIG?" (optionally "... Fabricator ... TIG and MMA")
+    or "Does the Warrior 500i support TIG?" directly from the capability matrix.
+    Questions with content words beyond the processes, machine names and
+    capability wording ("TIG duty cycle", "MIG gas") are left to the LLM.
+
+    Args:
+        query (str): User question.
+        machines (List[str]): Detected machines; when given, answers for those machines.
+        capabilities (Dict[str, List[str]]): Output of load_capability_index.
+
+    Returns:
+        Optional[Tuple[str, List[Document]]]: Answer and source documents, or None
+            when the question should go to the LLM.
+    """
+    if not capabilities or len(query.split()) > CAPABILITY_MAX_QUERY_WORDS:
+        return None
+    processes = detect_processes(query)
+    if not processes or not _CAPABILITY_INTENT.search(query):
+        return None
+    all_machines = sorted({m for process_machines in capabilities.values() for m in process_machines})
+    machine_words = {word for name in all_machines + machines for word in re.findall(r"[a-z0-9]+", name.lower())}
+    query_words = set(re.findall(r"[a-z0-9]+", query.lower()))
+    if query_words - _CAPABILITY_WORDS - _PROCESS_WORDS - machine_words:
+        return None
+    require_all = not re.search(r"\bor\b|\beither\b", query, re.IGNORECASE)
+    joiner = " and " if require_all else " or "
+    process_text = joiner.join(processes)
+
+    if machines:
+        lines = []
+        for machine in machines:
+            supported = [p for p in processes if machine.lower() in {m.lower() for m in capabilities.get(p, [])}]
+            ok = len(supported) == len(processes) if require_all else bool(supported)
+            lines.append(f"- {machine}: {'supports' if ok else 'does not support'} {process_text} welding")
+        answer = "\n".join(lines)
+    else:
+        family = next((f for f in sorted({machine_family(m) for m in all_machines}) if f in query_words), None)
+        capable = capable_machines(capabilities, processes, family, require_all)
+        scope = f"{family.capitalize()} machines" if family else "machines"
+        if capable:
+            answer = f"ESAB {scope} supporting {process_text} welding:\n" + "\n".join(f"- {m}" for m in capable)
+        else:
+            answer = f"None of the ESAB {scope} in the knowledge base support {process_text} welding."
+    sources = [Document(
+        page_content=f"The welding process {process} is compatible with the following machines: "
+                     f"{', '.join(capabilities.get(process, []))}.",
+        metadata={"source": "welding_process_analysis", "welding_process": process}
+    ) for process in processes]
+    logger.info(f"Answered capability query '{query}' from the capability index.")
+    return answer, sources
@@ -0,0 +1,149 @@
+# chain_cache.py
+
+import os
+import json
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+CHAIN_CACHE_SIZE = int(os.getenv("CHAIN_CACHE_SIZE", "32"))
+CHAIN_USAGE_PATH = os.path.join("faiss_dbs", "chain_usage.json")
+
+ChainKey = Tuple[Tuple[str, ...], str, str]
+
+def machine_set_key(machines: List[str]) -> Tuple[str, ...]:
+    """
+    Canonical, order-independent key of a machine set.
+
+    Args:
+        machines (List[str]): Machine names (any case, any order).
+
+    Returns:
+        Tuple[str, ...]: Sorted, lower-cased, de-duplicated machine names.
+    """
+    return tuple(sorted({m.lower() for m in machines}))
+
+class ChainCache:
+    """
+    Process-wide LRU of ready-to-use retrieval chains keyed by
+    (sorted machine set, index version, LLM backend). Usage counts per machine
+    set are persisted so the most common sets can be warmed up at startup.
+    """
+
+    def __init__(self, factory: Callable[[List[str], str], Any], max_size: int = CHAIN_CACHE_SIZE,
+                 usage_path: str = CHAIN_USAGE_PATH, persist_every: int = 20):
+        self.factory = factory
+        self.max_size = max_size
+        self.usage_path = usage_path
+        self.persist_every = persist_every
+        self.hits = 0
+        self.misses = 0
+        self._chains: "OrderedDict[ChainKey, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[ChainKey, threading.Lock] = {}
+        self._usage: Dict[str, int] = self._load_usage()
+        self._unsaved_uses = 0
+
+    def _load_usage(self) -> Dict[str, int]:
+        if not os.path.exists(self.usage_path):
+            return {}
+        try:
+            with open(self.usage_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable chain usage file '{self.usage_path}': {e}")
+            return {}
+
+    def _save_usage(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.usage_path) or ".", exist_ok=True)
+            tmp_path = self.usage_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._usage, f, indent=2)
+            os.replace(tmp_path, self.usage_path)
+        except Exception as e:
+            logger.warning(f"Could not write chain usage file '{self.usage_path}': {e}")
+
+    def _record_use(self, machine_key: Tuple[str, ...]) -> None:
+        usage_key = "|".join(machine_key)
+        self._usage[usage_key] = self._usage.get(usage_key, 0) + 1
+        self._unsaved_uses += 1
+        if self._unsaved_uses >= self.persist_every:
+            self._unsaved_uses = 0
+            self._save_usage()
+
+    def get(self, machines: List[str], index_version: str, llm_backend: str, record_use: bool = True) -> Any:
+        """
+        Returns the cached chain for this machine set, index version and LLM
+        backend, building it with the factory on a miss. Concurrent misses for
+        the same key build the chain only once.
+
+        Args:
+            machines (List[str]): Detected machines; empty for general queries.
+            index_version (str): Version of the FAISS index the chain retrieves from.
+            llm_backend (str): Name of the LLM backend the chain generates with.
+            record_use (bool): Count this call towards the machine set's usage.
+
+        Returns:
+            Any: The chain returned by the factory.
+        """
+        machine_key = machine_set_key(machines)
+        key = (machine_key, index_version, llm_backend)
+        with self._lock:
+            if record_use:
+                self._record_use(machine_key)
+            chain = self._chains.get(key)
+            if chain is not None:
+                self._chains.move_to_end(key)
+                self.hits += 1
+                return chain
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                chain = self._chains.get(key)
+                if chain is not None:
+                    self.hits += 1
+                    return chain
+            logger.info(f"Building chain for machines {list(machine_key) or 'ALL'} ({llm_backend}, index {index_version}).")
+            chain = self.factory(list(machines), llm_backend)
+            with self._lock:
+                self.misses += 1
+                self._chains[key] = chain
+                self._chains.move_to_end(key)
+                while len(self._chains) > self.max_size:
+                    evicted, _ = self._chains.popitem(last=False)
+                    logger.info(f"Evicted cached chain for machines {list(evicted[0]) or 'ALL'}.")
+                self._build_locks.pop(key, None)
+        return chain
+
+    def most_common(self, n: int) -> List[List[str]]:
+        """
+        Returns the `n` most frequently used machine sets (lower-cased).
+        """
+        with self._lock:
+            ranked = sorted(self._usage.items(), key=lambda item: -item[1])[:n]
+        return [usage_key.split("|") if usage_key else [] for usage_key, _ in ranked]
+
+    def warm_up(self, index_version: str, llm_backend: str, n: int = 5) -> None:
+        """
+        Pre-builds chains for the general context and the `n` most common machine sets.
+
+        Args:
+            index_version (str): Current index version.
+            llm_backend (str): LLM backend to build the chains for.
+            n (int): Number of machine sets to warm up.
+        """
+        machine_sets = [[]] + [machines for machines in self.most_common(n) if machines]
+        for machines in machine_sets:
+            try:
+                self.get(machines, index_version, llm_backend, record_use=False)
+            except Exception as e:
+                logger.warning(f"Could not warm up chain for {machines or 'ALL'}: {e}")
+        logger.info(f"Warmed up {len(machine_sets)} chains.")
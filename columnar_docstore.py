@@ -0,0 +1,265 @@
+# columnar_docstore.py
+
+import os
+import copy
+import json
+import mmap
+import struct
+import logging
+import numpy as np
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Single file: magic, header length, JSON header (columns, interned values, array layout),
+# then 64-byte aligned arrays read in place through mmap
+COLUMNAR_DOCSTORE_FILE = "docstore.columns"
+COLUMNAR_FORMAT_VERSION = 1
+_MAGIC = b"ESABDOC1"
+_PREFIX = len(_MAGIC) + 8
+_ALIGN = 64
+# Metadata keys of the manual chunks; any other key found in the documents gets its own column too
+METADATA_COLUMNS = ("machine", "page", "chunk_idx", "table_idx", "source")
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def write_columnar_docstore(faiss_db_path: str, db: FAISS, index_version: str) -> None:
+    """
+    Writes the documents of `db` in FAISS index order as a text blob with an
+    offsets array, plus one column of codes per metadata key into a table of
+    its distinct values. Replaces the file atomically.
+
+    Args:
+        faiss_db_path (str): Directory of the saved FAISS database.
+        db (FAISS): The FAISS database (index positions must be 0..n-1).
+        index_version (str): Current index version from the manifest.
+    """
+    items = sorted(db.index_to_docstore_id.items())
+    if [position for position, _ in items] != list(range(len(items))):
+        raise ValueError("FAISS index positions are not contiguous.")
+    ids = [doc_id for _, doc_id in items]
+    docs = [db.docstore.search(doc_id) for doc_id in ids]
+    missing = [doc_id for doc_id, doc in zip(ids, docs) if isinstance(doc, str)]
+    if missing:
+        raise ValueError(f"{len(missing)} indexed documents are missing from the docstore, e.g. '{missing[0]}'.")
+
+    columns = list(METADATA_COLUMNS) + sorted({key for doc in docs for key in doc.metadata} - set(METADATA_COLUMNS))
+    values: List[List] = [[] for _ in columns]
+    interned: List[Dict[str, int]] = [{} for _ in columns]
+    codes = np.full((len(docs), len(columns)), -1, dtype=np.int64)
+    for row, doc in enumerate(docs):
+        for col, key in enumerate(columns):
+            if key not in doc.metadata:
+                continue
+            token = json.dumps(doc.metadata[key], sort_keys=True, ensure_ascii=False, default=str)
+            code = interned[col].get(token)
+            if code is None:
+                code = interned[col][token] = len(values[col])
+                values[col].append(json.loads(token))
+            codes[row, col] = code
+
+    texts = [doc.page_content.encode("utf-8") for doc in docs]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(text) for text in texts])
+    # Ids are stored once, sorted for binary search, with the row <-> sorted slot permutations
+    id_bytes = np.array([doc_id.encode("utf-8") for doc_id in ids], dtype=f"S{max([len(i) for i in ids] + [1])}")
+    sorted_rows = np.argsort(id_bytes, kind="stable").astype(np.int32)
+    id_slots = np.empty(len(ids), dtype=np.int32)
+    id_slots[sorted_rows] = np.arange(len(ids), dtype=np.int32)
+    most_values = max([len(column_values) for column_values in values] + [0])
+    arrays = {
+        "offsets": offsets,
+        "codes": codes.astype(np.int16 if most_values < 2 ** 15 else np.int32),
+        "sorted_ids": id_bytes[sorted_rows],
+        "sorted_rows": sorted_rows,
+        "id_slots": id_slots,
+        "text": np.frombuffer(b"".join(texts), dtype=np.uint8),
+    }
+    layout, end = {}, 0
+    for name, array in arrays.items():
+        start = _aligned(end)
+        layout[name] = {"offset": start, "dtype": array.dtype.str, "shape": list(array.shape)}
+        end = start + array.nbytes
+    header = json.dumps({
+        "format_version": COLUMNAR_FORMAT_VERSION,
+        "index_version": index_version,
+        "columns": columns,
+        "values": values,
+        "arrays": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(_PREFIX + len(header))
+
+    path = os.path.join(faiss_db_path, COLUMNAR_DOCSTORE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        # Covers trailing empty arrays, whose offset may lie past the last write
+        f.truncate(data_start + end)
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote columnar docstore with {len(docs)} documents and {len(columns)} metadata columns to '{path}'.")
+
+def _read_header(data) -> Dict:
+    if data[:len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not a columnar docstore file.")
+    (length,) = struct.unpack_from("<Q", data, len(_MAGIC))
+    return json.loads(bytes(data[_PREFIX:_PREFIX + length]).decode("utf-8"))
+
+def columnar_docstore_version(faiss_db_path: str) -> Optional[str]:
+    """
+    Index version the columnar docstore was written for, or None if it is missing, unreadable or outdated.
+    """
+    path = os.path.join(faiss_db_path, COLUMNAR_DOCSTORE_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX)
+            (length,) = struct.unpack_from("<Q", prefix, len(_MAGIC))
+            header = _read_header(prefix + f.read(length))
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable columnar docstore '{path}': {e}")
+        return None
+    return header["index_version"] if header.get("format_version") == COLUMNAR_FORMAT_VERSION else None
+
+class ColumnarDocstore(Docstore):
+    """
+    Read-only docstore over a memory-mapped columnar file. Only the header
+    (column names and interned values) is parsed at load; Documents are built
+    from the text blob and the metadata codes when requested.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _read_header(self._mm)
+        if header.get("format_version") != COLUMNAR_FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar docstore format in '{path}'.")
+        self.index_version = header["index_version"]
+        self.columns: List[str] = header["columns"]
+        self._values: List[List] = header["values"]
+        (length,) = struct.unpack_from("<Q", self._mm, len(_MAGIC))
+        data_start = _aligned(_PREFIX + length)
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(self._mm, dtype=dtype, count=count,
+                                         offset=data_start + spec["offset"]).reshape(spec["shape"])
+        self._offsets = arrays["offsets"]
+        self._codes = arrays["codes"]
+        self._sorted_ids = arrays["sorted_ids"]
+        self._sorted_rows = arrays["sorted_rows"]
+        self._id_slots = arrays["id_slots"]
+        # Texts are decoded straight from the mapped file
+        self._text_start = data_start + header["arrays"]["text"]["offset"]
+
+    def __len__(self) -> int:
+        return len(self._id_slots)
+
+    def _rows(self, ids: List[str]) -> np.ndarray:
+        # Row of each id, or -1 if absent (binary search over the sorted id column)
+        if not len(self._sorted_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        keys = np.array([doc_id.encode("utf-8") for doc_id in ids], dtype=bytes)
+        found = np.minimum(np.searchsorted(self._sorted_ids, keys), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[found] == keys, self._sorted_rows[found], -1)
+
+    def _metadata(self, columns: List[int], codes: List[int]) -> Dict:
+        metadata = {}
+        for col, code in zip(columns, codes):
+            if code >= 0:
+                value = self._values[col][code]
+                # Interned lists and dicts are shared between rows; callers get their own copy
+                metadata[self.columns[col]] = copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+        return metadata
+
+    def documents(self, rows: List[int]) -> List[Document]:
+        """
+        Builds the Documents stored at `rows` (their FAISS index positions).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = (self._text_start + self._offsets[rows]).tolist()
+        ends = (self._text_start + self._offsets[rows + 1]).tolist()
+        ids = self._sorted_ids[self._id_slots[rows]].tolist()
+        columns = list(range(len(self.columns)))
+        return [Document(id=doc_id.decode("utf-8"), page_content=self._mm[start:end].decode("utf-8"),
+                         metadata=self._metadata(columns, codes))
+                for doc_id, start, end, codes in zip(ids, starts, ends, self._codes[rows].tolist())]
+
+    def metadata_rows(self, keys: List[str]) -> List[Tuple[int, Dict]]:
+        """
+        (index position, {key: value}) of every row, decoded from the code
+        columns of `keys` only; no text is read.
+        """
+        columns = [self.columns.index(key) for key in keys if key in self.columns]
+        return [(row, self._metadata(columns, codes)) for row, codes in enumerate(self._codes[:, columns].tolist())]
+
+    def positions(self, ids: List[str]) -> List[Optional[int]]:
+        """
+        Index position of each of `ids` (rows are stored in index order), or None if absent.
+        """
+        return [row if row >= 0 else None for row in self._rows(ids).tolist()]
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = int(self._rows([search])[0])
+        return self.documents([row])[0] if row >= 0 else f"ID {search} not found."
+
+    def mget(self, ids: List[str]) -> List[Union[str, Document]]:
+        """
+        Looks up many ids at once; results follow the order of `ids`.
+        """
+        rows = self._rows(ids)
+        found = iter(self.documents(rows[rows >= 0]))
+        return [next(found) if row >= 0 else f"ID {doc_id} not found." for doc_id, row in zip(ids, rows.tolist())]
+
+    def id_map(self) -> "ColumnarIdMap":
+        """
+        The index position -> docstore id map (rows are stored in index order).
+        """
+        return ColumnarIdMap(self._sorted_ids, self._id_slots)
+
+class ColumnarIdMap(Mapping):
+    """
+    Read-only index position -> docstore id mapping over the id column.
+    """
+
+    def __init__(self, sorted_ids: np.ndarray, id_slots: np.ndarray):
+        self._sorted_ids = sorted_ids
+        self._id_slots = id_slots
+
+    def __getitem__(self, position: int) -> str:
+        position = int(position)
+        if not 0 <= position < len(self._id_slots):
+            raise KeyError(position)
+        return self._sorted_ids[self._id_slots[position]].decode("utf-8")
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._id_slots)))
+
+    def __len__(self) -> int:
+        return len(self._id_slots)
+
+    def values(self):
+        return [doc_id.decode("utf-8") for doc_id in self._sorted_ids[self._id_slots].tolist()]
+
+    def items(self):
+        return list(enumerate(self.values()))
+
+    def ids_at(self, positions: List[int]) -> List[str]:
+        """
+        Docstore ids of many positions at once.
+        """
+        slots = self._id_slots[np.asarray(positions, dtype=np.int64)]
+        return [doc_id.decode("utf-8") for doc_id in self._sorted_ids[slots].tolist()]
@@ -0,0 +1,111 @@
+# context_packer.py
+
+import os
+import logging
+import numpy as np
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Tokens of retrieved text allowed in the "stuff" prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1800"))
+# Relevance vs. diversity trade-off of maximal marginal relevance (1.0 = relevance only)
+PACK_MMR_LAMBDA = float(os.getenv("PACK_MMR_LAMBDA", "0.7"))
+# Chunks scoring below this share of the best chunk's relevance are trimmed
+PACK_MIN_RELATIVE_SCORE = float(os.getenv("PACK_MIN_RELATIVE_SCORE", "0.8"))
+# Tokenizer of the served model (Llama 3 on both Ollama and Groq); a Hugging Face id or local path
+PACK_TOKENIZER = os.getenv("PACK_TOKENIZER", "NousResearch/Meta-Llama-3-8B")
+# Fallback estimate when the tokenizer cannot be loaded
+CHARS_PER_TOKEN = 4
+# Separator and formatting tokens added per packed chunk
+CHUNK_OVERHEAD_TOKENS = 4
+
+@lru_cache(maxsize=4)
+def token_counter(tokenizer_name: str = PACK_TOKENIZER) -> Callable[[str], int]:
+    """
+    Returns a function counting tokens with the model's tokenizer, or a
+    characters-per-token estimate if `transformers` or the tokenizer is unavailable.
+    """
+    if tokenizer_name:
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+            logger.info(f"Counting context tokens with the '{tokenizer_name}' tokenizer.")
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        except Exception as e:
+            logger.warning(f"Tokenizer '{tokenizer_name}' unavailable ({e}); estimating tokens from characters.")
+    return lambda text: (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def mmr_pack(query_vector: np.ndarray, doc_vectors: np.ndarray, token_counts: List[int],
+             budget: int = CONTEXT_TOKEN_BUDGET, mmr_lambda: float = PACK_MMR_LAMBDA,
+             min_relative_score: float = PACK_MIN_RELATIVE_SCORE) -> Tuple[List[int], Dict[str, int]]:
+    """
+    Selects chunks by maximal marginal relevance until the token budget is spent.
+
+    The retriever's first chunk is always a candidate; other chunks whose
+    cosine relevance falls below `min_relative_score` of the best are trimmed.
+    Chunks that no longer fit the remaining budget are skipped for smaller ones.
+    Assumes non-negative relevance scores (cosine of text embeddings).
+
+    Args:
+        query_vector (np.ndarray): Query embedding (d,).
+        doc_vectors (np.ndarray): Chunk embeddings (n, d), in retriever rank order.
+        token_counts (List[int]): Prompt tokens of each chunk.
+        budget (int): Maximum total tokens.
+        mmr_lambda (float): Weight of relevance against redundancy.
+        min_relative_score (float): Relevance cut-off relative to the best chunk.
+
+    Returns:
+        Tuple[List[int], Dict[str, int]]: Selected chunk positions in selection
+            order, and token stats ("candidate_tokens", "packed_tokens", "trimmed").
+    """
+    n = len(token_counts)
+    stats = {"candidate_tokens": int(sum(token_counts)), "packed_tokens": 0, "trimmed": 0}
+    if n == 0:
+        return [], stats
+    norms = np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+    docs = doc_vectors / np.where(norms == 0, 1, norms)
+    query = query_vector / (np.linalg.norm(query_vector) or 1)
+    relevance = docs @ query
+    similarity = docs @ docs.T
+
+    best = float(relevance.max())
+    candidates = [i for i in range(n) if i == 0 or relevance[i] >= min_relative_score * best]
+    stats["trimmed"] = n - len(candidates)
+
+    selected: List[int] = []
+    redundancy = np.full(n, -np.inf)
+    remaining = budget
+    while candidates:
+        scores = [mmr_lambda * relevance[i] - (1 - mmr_lambda) * (redundancy[i] if selected else 0.0)
+                  for i in candidates]
+        i = candidates.pop(int(np.argmax(scores)))
+        # The first pick is kept even if it alone exceeds the budget, so the context is never empty
+        if token_counts[i] > remaining and selected:
+            continue
+        selected.append(i)
+        remaining -= token_counts[i]
+        redundancy = np.maximum(redundancy, similarity[i])
+    stats["packed_tokens"] = budget - remaining
+    return selected, stats
+
+def budget_pack(token_counts: List[int], budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[List[int], Dict[str, int]]:
+    """
+    Keeps chunks in their given (already reranked) order while they fit the
+    token budget; the first chunk is always kept.
+
+    Returns:
+        Tuple[List[int], Dict[str, int]]: Selected chunk positions and token stats as in mmr_pack.
+    """
+    selected: List[int] = []
+    remaining = budget
+    for i, tokens in enumerate(token_counts):
+        if tokens > remaining and selected:
+            continue
+        selected.append(i)
+        remaining -= tokens
+    return selected, {"candidate_tokens": int(sum(token_counts)), "packed_tokens": budget - remaining, "trimmed": 0}
@@ -0,0 +1,309 @@
+# disk_docstore.py
+
+import os
+import json
+import sqlite3
+import threading
+import logging
+import faiss
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from index_spec import IndexSpec, configure_index
+from columnar_docstore import COLUMNAR_DOCSTORE_FILE, ColumnarDocstore, columnar_docstore_version, write_columnar_docstore
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+DOCSTORE_DB_FILE = "docstore.sqlite"
+# "memory" unpickles the docstore and reads the index into process memory; "mmap" maps the index
+# file read-only and reads documents lazily from SQLite, so worker processes share the page cache;
+# "columnar" maps the index and a columnar docstore file (see columnar_docstore.py), without pickle
+FAISS_LOAD_MODE = os.getenv("FAISS_LOAD_MODE", "memory")
+LOAD_MODES = ("memory", "mmap", "columnar")
+# SQLite limits the number of bound parameters per statement
+_BATCH_SIZE = 500
+
+def write_sqlite_docstore(faiss_db_path: str, db: FAISS, index_version: str) -> None:
+    """
+    Writes the documents and the position -> id map of `db` to an SQLite file
+    next to the FAISS files, for the "mmap" load mode.
+
+    Args:
+        faiss_db_path (str): Directory of the saved FAISS database.
+        db (FAISS): The FAISS database.
+        index_version (str): Current index version from the manifest.
+    """
+    path = os.path.join(faiss_db_path, DOCSTORE_DB_FILE)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("CREATE TABLE docs (id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL)")
+        conn.execute("CREATE TABLE positions (position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL)")
+        conn.execute("CREATE INDEX positions_doc_id ON positions (doc_id)")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('index_version', ?)", (index_version,))
+        rows = []
+        for position, doc_id in sorted(db.index_to_docstore_id.items()):
+            doc = db.docstore.search(doc_id)
+            if isinstance(doc, str):
+                continue
+            rows.append((doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False, default=str)))
+        conn.executemany("INSERT OR REPLACE INTO docs (id, text, metadata) VALUES (?, ?, ?)", rows)
+        conn.executemany("INSERT INTO positions (position, doc_id) VALUES (?, ?)",
+                         sorted(db.index_to_docstore_id.items()))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote on-disk docstore with {len(rows)} documents to '{path}'.")
+
+def save_faiss_db(db: FAISS, faiss_db_path: str) -> None:
+    """
+    Saves like FAISS.save_local, but replaces the files atomically: processes
+    that memory-mapped the previous index keep reading the old file instead
+    of a truncated one.
+    """
+    tmp_dir = faiss_db_path + ".tmp"
+    db.save_local(tmp_dir)
+    os.makedirs(faiss_db_path, exist_ok=True)
+    for name in ("index.faiss", "index.pkl"):
+        os.replace(os.path.join(tmp_dir, name), os.path.join(faiss_db_path, name))
+    os.rmdir(tmp_dir)
+
+def sqlite_docstore_version(faiss_db_path: str) -> Optional[str]:
+    """
+    Index version the SQLite docstore was written for, or None if it is missing or unreadable.
+    """
+    path = os.path.join(faiss_db_path, DOCSTORE_DB_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'index_version'").fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        logger.warning(f"Ignoring unreadable docstore '{path}': {e}")
+        return None
+
+class SQLiteDocstore(Docstore):
+    """
+    Read-only docstore that loads Documents by id from the SQLite file on
+    demand; nothing is held in memory beyond SQLite's page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def search(self, search: str) -> Union[str, Document]:
+        rows = self._query("SELECT text, metadata FROM docs WHERE id = ?", (search,))
+        if not rows:
+            return f"ID {search} not found."
+        text, metadata = rows[0]
+        return Document(id=search, page_content=text, metadata=json.loads(metadata))
+
+    def mget(self, ids: List[str]) -> List[Union[str, Document]]:
+        """
+        Looks up many ids with one query per batch; results follow the order of `ids`.
+        """
+        found: Dict[str, Document] = {}
+        for start in range(0, len(ids), _BATCH_SIZE):
+            batch = ids[start:start + _BATCH_SIZE]
+            rows = self._query(f"SELECT id, text, metadata FROM docs WHERE id IN ({','.join('?' * len(batch))})",
+                               batch)
+            for doc_id, text, metadata in rows:
+                found[doc_id] = Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+        return [found.get(doc_id, f"ID {doc_id} not found.") for doc_id in ids]
+
+    def metadata_rows(self, keys: List[str]) -> List[Tuple[int, Dict]]:
+        """
+        (index position, {key: value}) of every indexed document, reading only
+        the `keys` of its metadata; no Documents are built.
+        """
+        # json_type() is NULL only for absent keys, so absent and null values stay distinct
+        fields = "".join(f", CASE WHEN json_type(d.metadata, ?{i}) IS NULL THEN NULL "
+                         f"ELSE json_quote(json_extract(d.metadata, ?{i})) END" for i in range(1, len(keys) + 1))
+        rows = self._query(f"SELECT p.position{fields} FROM positions p JOIN docs d ON d.id = p.doc_id "
+                           f"ORDER BY p.position", [f'$."{key}"' for key in keys])
+        return [(row[0], {key: json.loads(value) for key, value in zip(keys, row[1:]) if value is not None})
+                for row in rows]
+
+    def positions(self, ids: List[str]) -> List[Optional[int]]:
+        """
+        Index position of each of `ids`, or None if it is not indexed.
+        """
+        found: Dict[str, int] = {}
+        for start in range(0, len(ids), _BATCH_SIZE):
+            batch = ids[start:start + _BATCH_SIZE]
+            found.update(self._query(
+                f"SELECT doc_id, position FROM positions WHERE doc_id IN ({','.join('?' * len(batch))})", batch))
+        return [found.get(doc_id) for doc_id in ids]
+
+    def id_map(self) -> "SQLiteIdMap":
+        """
+        The index position -> docstore id map, read from the same file.
+        """
+        return SQLiteIdMap(self)
+
+class SQLiteIdMap(Mapping):
+    """
+    Read-only index position -> docstore id mapping backed by the SQLite docstore.
+    """
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self._docstore = docstore
+        self._len: Optional[int] = None
+
+    def __getitem__(self, position: int) -> str:
+        rows = self._docstore._query("SELECT doc_id FROM positions WHERE position = ?", (int(position),))
+        if not rows:
+            raise KeyError(position)
+        return rows[0][0]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter([row[0] for row in self._docstore._query("SELECT position FROM positions ORDER BY position")])
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = self._docstore._query("SELECT COUNT(*) FROM positions")[0][0]
+        return self._len
+
+    def items(self):
+        return self._docstore._query("SELECT position, doc_id FROM positions ORDER BY position")
+
+    def values(self):
+        return [row[0] for row in self._docstore._query("SELECT doc_id FROM positions ORDER BY position")]
+
+    def ids_at(self, positions: List[int]) -> List[str]:
+        """
+        Docstore ids of many positions with one query per batch.
+        """
+        positions = [int(position) for position in positions]
+        found: Dict[int, str] = {}
+        for start in range(0, len(positions), _BATCH_SIZE):
+            batch = positions[start:start + _BATCH_SIZE]
+            found.update(self._docstore._query(
+                f"SELECT position, doc_id FROM positions WHERE position IN ({','.join('?' * len(batch))})", batch))
+        return [found[position] for position in positions]
+
+def is_read_only(db: FAISS) -> bool:
+    """
+    Whether `db` was loaded in "mmap" or "columnar" mode and cannot be updated in place.
+    """
+    return isinstance(db.docstore, (SQLiteDocstore, ColumnarDocstore))
+
+def write_disk_docstore(faiss_db_path: str, db: FAISS, index_version: str, mode: str = FAISS_LOAD_MODE) -> None:
+    """
+    Writes the on-disk docstore read by `mode` (nothing for "memory").
+    """
+    if mode == "mmap":
+        write_sqlite_docstore(faiss_db_path, db, index_version)
+    elif mode == "columnar":
+        write_columnar_docstore(faiss_db_path, db, index_version)
+
+def _mmap_flags(spec: IndexSpec) -> int:
+    # IVF inverted lists are mapped as on-disk lists; flat and HNSW vectors are mapped in place
+    if spec.kind.startswith("ivf"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+def load_faiss_db(faiss_db_path: str, embeddings, spec: IndexSpec, mode: str = FAISS_LOAD_MODE,
+                  index_version: Optional[str] = None) -> FAISS:
+    """
+    Loads a saved FAISS database.
+
+    In "mmap" mode the index file is memory-mapped read-only and documents are
+    read from the SQLite docstore by id, so startup does not depend on corpus
+    size and processes serving the same files share their pages. "columnar"
+    mode does the same with the columnar docstore file, which needs no
+    unpickling. A missing or stale on-disk docstore is rewritten from the
+    pickled one first.
+
+    Args:
+        faiss_db_path (str): Directory of the saved FAISS database.
+        embeddings: Embeddings used for queries.
+        spec (IndexSpec): Spec of the stored index, for its search parameters.
+        mode (str): "memory", "mmap" or "columnar".
+        index_version (Optional[str]): Current index version from the manifest;
+            required to validate the on-disk docstore.
+
+    Returns:
+        FAISS: The loaded database (read-only unless in "memory" mode).
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown FAISS load mode '{mode}'. Available: {', '.join(LOAD_MODES)}.")
+    if mode != "memory" and index_version is None:
+        logger.warning("No index version to validate the on-disk docstore; loading the FAISS database into memory.")
+        mode = "memory"
+    if mode == "memory":
+        db = FAISS.load_local(faiss_db_path, embeddings, allow_dangerous_deserialization=True)
+        configure_index(db.index, spec)
+        return db
+
+    stored_version = (sqlite_docstore_version if mode == "mmap" else columnar_docstore_version)(faiss_db_path)
+    if stored_version != index_version:
+        write_disk_docstore(faiss_db_path, load_faiss_db(faiss_db_path, embeddings, spec, "memory"), index_version, mode)
+    index = faiss.read_index(os.path.join(faiss_db_path, "index.faiss"), _mmap_flags(spec))
+    configure_index(index, spec)
+    if mode == "mmap":
+        docstore = SQLiteDocstore(os.path.join(faiss_db_path, DOCSTORE_DB_FILE))
+    else:
+        docstore = ColumnarDocstore(os.path.join(faiss_db_path, COLUMNAR_DOCSTORE_FILE))
+    logger.info(f"Memory-mapped FAISS index with {index.ntotal} vectors; documents are read on demand.")
+    return FAISS(embeddings, index, docstore, docstore.id_map())
+
+def get_documents(db: FAISS, ids: List[str]) -> List[Union[str, Document]]:
+    """
+    Documents of `ids`, in one batched read when the docstore supports it.
+    Returned Documents carry their docstore id.
+    """
+    if hasattr(db.docstore, "mget"):
+        return db.docstore.mget(ids)
+    docs = [db.docstore.search(doc_id) for doc_id in ids]
+    # Stored Documents are shared, so ones saved without their id are copied rather than changed
+    return [doc.copy(update={"id": doc_id}) if isinstance(doc, Document) and doc.id != doc_id else doc
+            for doc_id, doc in zip(ids, docs)]
+
+def index_metadata(db: FAISS, keys: List[str]) -> List[Tuple[int, Dict]]:
+    """
+    (index position, {key: value}) of every indexed document, limited to the
+    metadata `keys`. On-disk docstores answer with one metadata query instead
+    of building every Document.
+    """
+    reader = getattr(db.docstore, "metadata_rows", None)
+    if reader is not None:
+        return reader(keys)
+    rows = []
+    for position, doc_id in db.index_to_docstore_id.items():
+        doc = db.docstore.search(doc_id)
+        if not isinstance(doc, str):
+            rows.append((position, {key: doc.metadata[key] for key in keys if key in doc.metadata}))
+    return rows
+
+def index_positions(db: FAISS, ids: List[str]) -> List[Optional[int]]:
+    """
+    Index position of each docstore id in `ids` (None if not indexed), for
+    reading stored vectors back. On-disk docstores look the ids up in their
+    id column; otherwise the position -> id map is inverted.
+    """
+    finder = getattr(db.docstore, "positions", None)
+    if finder is not None:
+        return finder(ids)
+    wanted = set(ids)
+    found = {doc_id: position for position, doc_id in db.index_to_docstore_id.items() if doc_id in wanted}
+    return [found.get(doc_id) for doc_id in ids]
@@ -0,0 +1,121 @@
+# embedding_backends.py
+
+import os
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from embedding_cache import CachedEmbeddings
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Backend used to build and query the FAISS database ("google", "local" or "onnx")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "google")
+GOOGLE_EMBEDDING_MODEL = "models/embedding-001"
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "256"))
+# CPU threads for local inference; 0 keeps the library default
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# Use the int8-quantized ONNX export for the "onnx" backend
+ONNX_INT8 = os.getenv("ONNX_INT8", "1") == "1"
+ONNX_INT8_FILE = os.getenv("ONNX_INT8_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+
+# name -> factory returning (embeddings, model id); the model id is part of cache keys and the index manifest
+_BACKENDS: Dict[str, Callable[[], Tuple[Embeddings, str]]] = {}
+
+def register_backend(name: str) -> Callable:
+    """
+    Decorator registering an embedding backend factory under `name`.
+
+    Args:
+        name (str): Backend name used in EMBEDDING_BACKEND.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(factory: Callable[[], Tuple[Embeddings, str]]) -> Callable[[], Tuple[Embeddings, str]]:
+        _BACKENDS[name] = factory
+        return factory
+    return decorator
+
+def available_backends() -> List[str]:
+    """
+    Returns the names of the registered embedding backends.
+    """
+    return sorted(_BACKENDS)
+
+@register_backend("google")
+def _google_backend() -> Tuple[Embeddings, str]:
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    embeddings = GoogleGenerativeAIEmbeddings(
+        model=GOOGLE_EMBEDDING_MODEL,
+        google_api_key=os.getenv("GOOGLE_API")
+    )
+    return embeddings, GOOGLE_EMBEDDING_MODEL
+
+def _set_torch_threads() -> None:
+    if EMBEDDING_THREADS > 0:
+        import torch
+        torch.set_num_threads(EMBEDDING_THREADS)
+        logger.info(f"Local embedding inference limited to {EMBEDDING_THREADS} threads.")
+
+@register_backend("local")
+def _local_backend() -> Tuple[Embeddings, str]:
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    _set_torch_threads()
+    embeddings = HuggingFaceEmbeddings(
+        model_name=LOCAL_EMBEDDING_MODEL,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": LOCAL_EMBEDDING_BATCH_SIZE, "normalize_embeddings": True}
+    )
+    return embeddings, LOCAL_EMBEDDING_MODEL
+
+@register_backend("onnx")
+def _onnx_backend() -> Tuple[Embeddings, str]:
+    # Requires sentence-transformers >= 3.2 with the onnx extra (optimum + onnxruntime)
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    import onnxruntime
+    session_options = onnxruntime.SessionOptions()
+    if EMBEDDING_THREADS > 0:
+        session_options.intra_op_num_threads = EMBEDDING_THREADS
+    onnx_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+    if ONNX_INT8:
+        onnx_kwargs["file_name"] = ONNX_INT8_FILE
+    embeddings = HuggingFaceEmbeddings(
+        model_name=LOCAL_EMBEDDING_MODEL,
+        model_kwargs={"device": "cpu", "backend": "onnx", "model_kwargs": onnx_kwargs},
+        encode_kwargs={"batch_size": LOCAL_EMBEDDING_BATCH_SIZE, "normalize_embeddings": True}
+    )
+    return embeddings, f"{LOCAL_EMBEDDING_MODEL}:onnx{'-int8' if ONNX_INT8 else ''}"
+
+def create_backend(backend: Optional[str] = None) -> Tuple[Embeddings, str]:
+    """
+    Instantiates an embedding backend without the cache.
+
+    Args:
+        backend (Optional[str]): Backend name; defaults to EMBEDDING_BACKEND.
+
+    Returns:
+        Tuple[Embeddings, str]: The embeddings object and its model id.
+    """
+    name = backend or EMBEDDING_BACKEND
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Available: {', '.join(available_backends())}.")
+    embeddings, model_id = _BACKENDS[name]()
+    logger.info(f"Initialized '{name}' embedding backend ({model_id}).")
+    return embeddings, model_id
+
+def get_embeddings(backend: Optional[str] = None) -> CachedEmbeddings:
+    """
+    Returns the configured embedding backend behind the persistent embedding cache.
+
+    Args:
+        backend (Optional[str]): Backend name; defaults to EMBEDDING_BACKEND.
+
+    Returns:
+        CachedEmbeddings: Cached embeddings; `model_name` identifies the backend model.
+    """
+    embeddings, model_id = create_backend(backend)
+    return CachedEmbeddings(embeddings, model_id)
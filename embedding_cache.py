@@ -0,0 +1,128 @@
+# embedding_cache.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+import numpy as np
+from typing import Dict, List
+from langchain_core.embeddings import Embeddings
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+EMBEDDING_CACHE_PATH = os.path.join("faiss_dbs", "embedding_cache.sqlite")
+# Upper bound on cached vectors; least recently used entries are evicted beyond it
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object with an on-disk, content-addressed cache.
+    Vectors are keyed by (model name, kind, SHA-256 of the text) and stored as
+    float32 blobs in SQLite, so unchanged text never reaches the embedding API twice.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str,
+                 cache_path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        # Running upper estimate of the table size (replaced keys are counted again); only an
+        # estimate above max_entries costs a COUNT(*)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{digest}"
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors.items()]
+            )
+            self._count += len(vectors)
+            if self._count > self.max_entries:
+                # Other processes sharing the file may have added or evicted entries meanwhile
+                self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                if self._count > self.max_entries:
+                    evict = self._count - self.max_entries
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN "
+                        "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (evict,)
+                    )
+                    self._count = self.max_entries
+                    logger.info(f"Evicted {evict} least recently used embeddings from the cache.")
+            self._conn.commit()
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        cached = self._lookup(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        with self._lock:
+            self.hits += sum(1 for key in keys if key in cached)
+            self.misses += len(missing)
+
+        if missing:
+            if kind == "query":
+                computed = [self.underlying.embed_query(text) for text in missing.values()]
+            else:
+                computed = self.underlying.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), computed))
+            self._store(new_vectors)
+            cached.update(new_vectors)
+        return [cached[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text])[0]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters for this process and the number of cached vectors.
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
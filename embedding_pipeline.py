@@ -0,0 +1,195 @@
+# embedding_pipeline.py
+
+import os
+import re
+import time
+import random
+import shutil
+import hashlib
+import threading
+import logging
+import traceback
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+CHECKPOINT_DIR = os.path.join("faiss_dbs", "embedding_checkpoints")
+
+# Finished batch checkpoints; "batch_NNNNNN.tmp.npy" files are partial writes left by a crash
+_CHECKPOINT_FILE = re.compile(r"^batch_(\d{6})\.npy$")
+
+_RATE_LIMIT_MARKERS = ("429", "rate limit", "ratelimit", "quota", "resource exhausted",
+                       "resourceexhausted", "too many requests")
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Heuristically detects throttling errors from the embedding API.
+
+    Args:
+        error (Exception): Error raised by the embeddings call.
+
+    Returns:
+        bool: True if the error looks like a rate-limit or quota error.
+    """
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in _RATE_LIMIT_MARKERS)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps the number of batches in flight. The cap is halved on throttling and
+    grows back by one after a run of successful batches (AIMD).
+    """
+
+    def __init__(self, max_concurrency: int, recovery_successes: int = 5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.throttled_count = 0
+        self._recovery_successes = recovery_successes
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, success: bool, throttled: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled_count += 1
+                self._successes = 0
+                new_limit = max(1, self.limit // 2)
+                if new_limit != self.limit:
+                    logger.warning(f"Embedding API throttled; lowering concurrency to {new_limit}.")
+                self.limit = new_limit
+            elif success:
+                self._successes += 1
+                if self._successes >= self._recovery_successes and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+def _checkpoint_path(texts: List[str], embeddings: Embeddings, batch_size: int, checkpoint_dir: str) -> str:
+    """
+    Returns the checkpoint directory of this exact corpus, model and batching.
+    """
+    sha = hashlib.sha256()
+    model_name = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None) or type(embeddings).__name__
+    sha.update(f"{model_name}\0{batch_size}\0".encode("utf-8"))
+    for text in texts:
+        sha.update(hashlib.sha256(text.encode("utf-8")).digest())
+    return os.path.join(checkpoint_dir, sha.hexdigest()[:24])
+
+def embed_texts_concurrently(texts: List[str], embeddings: Embeddings,
+                             batch_size: int = EMBED_BATCH_SIZE,
+                             max_concurrency: int = EMBED_MAX_CONCURRENCY,
+                             max_retries: int = EMBED_MAX_RETRIES,
+                             checkpoint_dir: Optional[str] = CHECKPOINT_DIR) -> List[List[float]]:
+    """
+    Embeds texts in batches sent concurrently from a thread pool.
+    Throttling errors halve the number of batches in flight and are retried with
+    exponential backoff. Every finished batch is checkpointed to disk, so a failed
+    build resumes with only the missing batches; checkpoints are removed on success.
+
+    Args:
+        texts (List[str]): Texts to embed.
+        embeddings (Embeddings): Embeddings object used for each batch.
+        batch_size (int): Number of texts per API call.
+        max_concurrency (int): Maximum number of batches in flight.
+        max_retries (int): Retries per batch before the build fails.
+        checkpoint_dir (Optional[str]): Root directory for checkpoints; None disables them.
+
+    Returns:
+        List[List[float]]: One vector per input text, in input order.
+    """
+    if not texts:
+        return []
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    results: Dict[int, np.ndarray] = {}
+
+    run_dir = None
+    if checkpoint_dir:
+        run_dir = _checkpoint_path(texts, embeddings, batch_size, checkpoint_dir)
+        os.makedirs(run_dir, exist_ok=True)
+        for file_name in os.listdir(run_dir):
+            match = _CHECKPOINT_FILE.match(file_name)
+            if not match:
+                continue
+            try:
+                batch_idx = int(match.group(1))
+                vectors = np.load(os.path.join(run_dir, file_name))
+                if batch_idx >= len(batches) or len(vectors) != len(batches[batch_idx]):
+                    raise ValueError("batch does not match the current texts")
+                results[batch_idx] = vectors
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable checkpoint '{file_name}': {e}")
+        if results:
+            logger.info(f"Resuming embedding from checkpoint: {len(results)}/{len(batches)} batches already done.")
+
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+    progress_lock = threading.Lock()
+    done_chunks = [0]
+    started = time.perf_counter()
+
+    def run_batch(batch_idx: int) -> int:
+        batch = batches[batch_idx]
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            try:
+                vectors = np.asarray(embeddings.embed_documents(batch), dtype=np.float32)
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                limiter.release(success=False, throttled=throttled)
+                if attempt == max_retries:
+                    raise
+                delay = min(60.0, (2 ** attempt) * (2.0 if throttled else 0.5)) * (0.5 + random.random())
+                logger.warning(f"Embedding batch {batch_idx} failed ({e}); retrying in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+            limiter.release(success=True)
+            if run_dir:
+                tmp_path = os.path.join(run_dir, f"batch_{batch_idx:06d}.tmp.npy")
+                np.save(tmp_path, vectors)
+                os.replace(tmp_path, os.path.join(run_dir, f"batch_{batch_idx:06d}.npy"))
+            results[batch_idx] = vectors
+            with progress_lock:
+                done_chunks[0] += len(batch)
+                elapsed = time.perf_counter() - started
+                logger.info(f"Embedded {done_chunks[0]} new chunks ({done_chunks[0] / elapsed:.1f} chunks/s, "
+                            f"{limiter.in_flight} batches in flight, limit {limiter.limit}).")
+            return batch_idx
+
+    pending = [batch_idx for batch_idx in range(len(batches)) if batch_idx not in results]
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        futures = [pool.submit(run_batch, batch_idx) for batch_idx in pending]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            logger.error(f"Embedding failed; {len(results)}/{len(batches)} batches are checkpointed: {e}")
+            logger.debug(traceback.format_exc())  # Detailed traceback for debugging
+            raise
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Embedding throughput: {len(texts)} chunks in {len(batches)} batches, "
+                f"{done_chunks[0]} embedded in {elapsed:.2f}s ({done_chunks[0] / elapsed if elapsed else 0:.1f} chunks/s), "
+                f"peak {limiter.peak_in_flight} batches in flight, {limiter.throttled_count} throttled.")
+    if run_dir:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return [vector.tolist() for batch_idx in range(len(batches)) for vector in results[batch_idx]]
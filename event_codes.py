@@ -0,0 +1,215 @@
+# event_codes.py
+
+import os
+import re
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+from langchain.docstore.document import Document
+from pdf_cache import file_sha256, get_pages
+from section_index import match_header
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+EVENT_CODE_INDEX_PATH = os.path.join("faiss_dbs", "event_codes.json")
+EVENT_CODE_FORMAT_VERSION = 2
+# Longer questions are open-ended ("why does x29 keep coming back after...") and go to the LLM
+FAST_PATH_MAX_WORDS = 12
+# Bounds of one entry; lines beyond them are not part of the event code description
+EVENT_MAX_CAUSES = 8
+EVENT_MAX_ACTIONS = 16
+EVENT_MAX_ITEM_CHARS = 400
+
+# "x29 No coolant flow" (event codes) or "E01 Over voltage protection" (error codes), optionally markdown-headed
+_CODE_HEADING = re.compile(r"^(?:#+\s*)?([xX]\d{2}|E\d{2,3})\s+([A-Z][\w/&()' ,.-]{2,80})$")
+# "- 429 - ELP off during welding." / "• 429 – No flow ..."; the numeric code is optional
+_CAUSE = re.compile(r"^[-•–·▪*]\s*(?:(\d{3})\s*[-–]\s*)?(.+)$")
+_ACTION = re.compile(r"^(\d{1,2})\.\s+(.+)$")
+_SUBHEADING = re.compile(r"^\**For \d{3}\b.*$")
+_NOISE = re.compile(r"^(?:-+|\d+|\d+\s+[A-Z][A-Z &]+|[A-Z][A-Z &]+)$")
+
+_QUERY_CODE = re.compile(r"\b([xX]\d{2}|[eE]\d{2,3}|\d{3})\b")
+_CODE_INTENT = re.compile(r"\b(error|event|code|fault|alarm|warning|mean|means|meaning|display(?:s|ed)?|show(?:s|n|ing)?)\b", re.IGNORECASE)
+
+def parse_event_codes(pages: List[Dict]) -> Dict[str, Dict]:
+    """
+    Extracts the event/error code entries of a manual. An entry ends at the
+    next code heading or at any other section heading ("9 TROUBLESHOOTING").
+
+    Args:
+        pages (List[Dict]): Parsed pages ({"page_number", "text", ...}) from pdf_cache.
+
+    Returns:
+        Dict[str, Dict]: Code ("x29") -> {"code", "title", "causes", "actions", "page"}, where
+            causes are {"code", "text"} dicts and actions are instruction strings.
+    """
+    codes: Dict[str, Dict] = {}
+    entry: Optional[Dict] = None
+    target: Optional[List] = None
+    section: Optional[Tuple] = None
+    for page in pages:
+        for raw_line in page["text"].splitlines():
+            line = raw_line.strip()
+            if not line or line.startswith("This event code is displayed"):
+                continue
+            heading = _CODE_HEADING.match(line)
+            if heading:
+                code = heading.group(1).lower()
+                entry = codes.setdefault(code, {"code": code, "title": heading.group(2).strip(),
+                                                "causes": [], "actions": [], "page": page["page_number"]})
+                target = None
+                continue
+            header = match_header(line)
+            if header:
+                # Repeats of the current section's title are running page headers ("8 EVENT CODES")
+                if header != section:
+                    section, entry, target = header, None, None
+                continue
+            if entry is None or _NOISE.match(line):
+                continue
+            cause = _CAUSE.match(line)
+            action = _ACTION.match(line)
+            if _SUBHEADING.match(line):
+                # Sub-heading of the actions ("For 406 and 206")
+                entry["actions"].append(line.strip("* ").rstrip(":") + ":")
+                target = None
+            elif cause:
+                if len(entry["causes"]) < EVENT_MAX_CAUSES:
+                    entry["causes"].append({"code": cause.group(1), "text": cause.group(2).strip()})
+                    target = entry["causes"]
+                else:
+                    target = None
+            elif action:
+                if len(entry["actions"]) < EVENT_MAX_ACTIONS:
+                    entry["actions"].append(action.group(2).strip())
+                    target = entry["actions"]
+                else:
+                    target = None
+            elif target:
+                # Wrapped continuation of the previous cause or action
+                if isinstance(target[-1], dict):
+                    if len(target[-1]["text"]) + len(line) < EVENT_MAX_ITEM_CHARS:
+                        target[-1]["text"] += " " + line
+                elif len(target[-1]) + len(line) < EVENT_MAX_ITEM_CHARS:
+                    target[-1] += " " + line
+    return codes
+
+def _read_index(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable event code index '{path}': {e}")
+        return {}
+    return data.get("machines", {}) if data.get("format_version") == EVENT_CODE_FORMAT_VERSION else {}
+
+def build_event_code_index(pdf_paths: List[str], path: str = EVENT_CODE_INDEX_PATH) -> Dict[str, Dict]:
+    """
+    Builds the per-machine event code index, re-parsing only manuals whose
+    content hash changed, and writes it to `path`.
+
+    Args:
+        pdf_paths (List[str]): Paths of the machine manuals.
+        path (str): Index file.
+
+    Returns:
+        Dict[str, Dict]: Machine -> {"sha256", "codes": {code: entry}}.
+    """
+    old = _read_index(path)
+    machines = {}
+    for pdf_path in pdf_paths:
+        machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        digest = file_sha256(pdf_path)
+        entry = old.get(machine_name)
+        if entry is None or entry["sha256"] != digest:
+            entry = {"sha256": digest, "codes": parse_event_codes(get_pages(pdf_path))}
+            logger.info(f"Indexed {len(entry['codes'])} event codes of '{machine_name}'.")
+        machines[machine_name] = entry
+    if machines != old:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format_version": EVENT_CODE_FORMAT_VERSION, "machines": machines}, f, indent=2)
+        os.replace(tmp_path, path)
+    return machines
+
+def load_event_code_index(path: str = EVENT_CODE_INDEX_PATH) -> Dict[str, Dict[str, Dict]]:
+    """
+    Loads the index as lower-cased machine -> {code -> entry}, with the
+    three-digit variants ("429") pointing to the entry of their code ("x29").
+    """
+    index = {}
+    for machine_name, entry in _read_index(path).items():
+        codes = dict(entry["codes"])
+        for code_entry in entry["codes"].values():
+            for cause in code_entry["causes"]:
+                if cause["code"]:
+                    codes.setdefault(cause["code"], code_entry)
+        index[machine_name.lower()] = {"name": machine_name, "codes": codes}
+    return index
+
+def format_event_code(machine_name: str, entry: Dict, asked_code: str) -> str:
+    """
+    Markdown answer for one event code entry.
+    """
+    causes = [cause for cause in entry["causes"] if cause["code"] == asked_code] or entry["causes"]
+    lines = [f"**{machine_name} — {entry['code']} {entry['title']}** (manual page {entry['page']})"]
+    if causes:
+        lines += ["", "This event code is displayed due to one of the following:"]
+        lines += [f"- {cause['code'] + ' - ' if cause['code'] else ''}{cause['text']}" for cause in causes]
+    if entry["actions"]:
+        lines += ["", "Corrective actions:"]
+        number = 0
+        for action in entry["actions"]:
+            if action.endswith(":"):
+                lines.append(f"*{action}*")
+                number = 0
+            else:
+                number += 1
+                lines.append(f"{number}. {action}")
+    return "\n".join(lines)
+
+def answer_event_code_query(query: str, machines: List[str],
+                            index: Dict[str, Dict[str, Dict]]) -> Optional[Tuple[str, List[Document]]]:
+    """
+    Answers short "what does error x29 mean" questions straight from the index.
+
+    Args:
+        query (str): User question.
+        machines (List[str]): Detected machines; empty searches every machine.
+        index (Dict[str, Dict[str, Dict]]): Output of load_event_code_index.
+
+    Returns:
+        Optional[Tuple[str, List[Document]]]: Answer and source documents, or None
+            when the question should go to the LLM.
+    """
+    if not index or len(query.split()) > FAST_PATH_MAX_WORDS:
+        return None
+    asked = [code.lower() for code in _QUERY_CODE.findall(query)]
+    if not asked:
+        return None
+    # Bare numbers ("300") are only codes when the question is about codes
+    if not any(code.startswith(("x", "e")) for code in asked) and not _CODE_INTENT.search(query):
+        return None
+
+    scope = [m.lower() for m in machines if m.lower() in index] or list(index)
+    answers, sources = [], []
+    for machine_key in scope:
+        machine = index[machine_key]
+        for code in asked:
+            entry = machine["codes"].get(code)
+            if entry is None:
+                continue
+            answer = format_event_code(machine["name"], entry, code)
+            answers.append(answer)
+            sources.append(Document(page_content=answer, metadata={
+                "machine": machine["name"], "page": entry["page"], "source": "event_codes"}))
+    if not answers:
+        return None
+    logger.info(f"Answered event code query '{query}' from the index.")
+    return "\n\n".join(answers), sources
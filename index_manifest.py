@@ -0,0 +1,100 @@
+# index_manifest.py
+
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Optional
+from langchain.docstore.document import Document
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+MANIFEST_FILE = "manifest.json"
+# Bump when document ids or the manifest layout change; older manifests force a full rebuild
+MANIFEST_FORMAT_VERSION = 1
+
+def document_id(doc: Document) -> str:
+    """
+    Returns a content-derived docstore id for a Document, so an unchanged
+    chunk keeps the same id (and vector) across builds.
+
+    Args:
+        doc (Document): Document to identify.
+
+    Returns:
+        str: Hex digest of the document text and metadata.
+    """
+    payload = json.dumps({"text": doc.page_content, "metadata": doc.metadata},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def compute_index_version(doc_ids: Iterable[str]) -> str:
+    """
+    Derives a short version string from the full set of document ids.
+    It changes whenever any chunk is added, changed or removed.
+
+    Args:
+        doc_ids (Iterable[str]): All docstore ids in the index.
+
+    Returns:
+        str: Index version.
+    """
+    sha = hashlib.sha256()
+    for doc_id in sorted(doc_ids):
+        sha.update(doc_id.encode("ascii"))
+    return sha.hexdigest()[:16]
+
+def load_index_manifest(faiss_db_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Loads the manifest stored next to a FAISS database.
+
+    Args:
+        faiss_db_path (str): Directory of the saved FAISS database.
+
+    Returns:
+        Optional[Dict[str, Any]]: The manifest, or None if missing, unreadable or outdated.
+    """
+    manifest_path = os.path.join(faiss_db_path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable index manifest '{manifest_path}': {e}")
+        return None
+    if manifest.get("format_version") != MANIFEST_FORMAT_VERSION:
+        logger.warning(f"Index manifest '{manifest_path}' has an outdated format.")
+        return None
+    return manifest
+
+def save_index_manifest(faiss_db_path: str, manifest: Dict[str, Any]) -> None:
+    """
+    Atomically writes the manifest next to a FAISS database.
+
+    Args:
+        faiss_db_path (str): Directory of the saved FAISS database.
+        manifest (Dict[str, Any]): Manifest to persist.
+    """
+    os.makedirs(faiss_db_path, exist_ok=True)
+    manifest_path = os.path.join(faiss_db_path, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(manifest, format_version=MANIFEST_FORMAT_VERSION), f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def get_index_version(faiss_db_path: str) -> str:
+    """
+    Returns the version of the FAISS database at `faiss_db_path`, or "" if unknown.
+
+    Args:
+        faiss_db_path (str): Directory of the saved FAISS database.
+
+    Returns:
+        str: Index version.
+    """
+    manifest = load_index_manifest(faiss_db_path)
+    return manifest.get("index_version", "") if manifest else ""
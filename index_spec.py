@@ -0,0 +1,150 @@
+# index_spec.py
+
+import os
+import json
+import math
+import logging
+import numpy as np
+import faiss
+from dataclasses import asdict, dataclass, fields, replace
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+INDEX_SPEC_FILE = "index_spec.json"
+# Index type of the combined FAISS database, e.g. "flat", "hnsw:hnsw_m=32", "ivf_flat:nprobe=16" or
+# "ivf_pq:nlist=1024,pq_m=48,nprobe=32"; changing it rebuilds the index without re-embedding
+FAISS_INDEX_SPEC = os.getenv("FAISS_INDEX_SPEC", "flat")
+INDEX_KINDS = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+# k-means needs enough points per centroid; with fewer, nlist is reduced (IVF) or PQ falls back to IVF-Flat
+MIN_POINTS_PER_CENTROID = 39
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """
+    FAISS index type and its build/search parameters. Zero values are derived
+    from the number of vectors and the dimension at build time.
+    """
+    kind: str = "flat"
+    hnsw_m: int = 32
+    ef_construction: int = 40
+    ef_search: int = 64
+    nlist: int = 0
+    nprobe: int = 16
+    pq_m: int = 0
+    pq_bits: int = 8
+    train_size: int = 0
+
+    @classmethod
+    def parse(cls, text: str) -> "IndexSpec":
+        """
+        Parses "kind" or "kind:key=value,key=value" (keys are the field names).
+        """
+        kind, _, params = text.strip().partition(":")
+        kind = kind.strip().lower().replace("-", "_")
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown FAISS index kind '{kind}'. Available: {', '.join(INDEX_KINDS)}.")
+        names = {f.name for f in fields(cls)} - {"kind"}
+        values = {}
+        for param in filter(None, (p.strip() for p in params.split(","))):
+            key, _, value = param.partition("=")
+            if key.strip() not in names:
+                raise ValueError(f"Unknown FAISS index parameter '{key.strip()}'.")
+            values[key.strip()] = int(value)
+        return cls(kind=kind, **values)
+
+def _pq_subquantizers(d: int) -> int:
+    # Largest divisor of d giving sub-vectors of at least 8 dimensions
+    return max(m for m in range(1, max(1, d // 8) + 1) if d % m == 0)
+
+def stores_exact_vectors(index: faiss.Index) -> bool:
+    """
+    Whether reconstruct() returns the original vectors (False for product quantization).
+    """
+    return not isinstance(faiss.try_extract_index_ivf(index), faiss.IndexIVFPQ)
+
+def configure_index(index: faiss.Index, spec: IndexSpec) -> faiss.Index:
+    """
+    Applies the search-time parameters of `spec` to a built or loaded index and
+    enables reconstruct() on IVF indexes (used by context packing).
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = spec.nprobe
+        if ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.make_direct_map()
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = spec.ef_search
+    return index
+
+def build_index(spec: IndexSpec, vectors: np.ndarray, metric: int = faiss.METRIC_L2) -> faiss.Index:
+    """
+    Builds (and for IVF types trains) an index of the given spec over `vectors`.
+
+    Args:
+        spec (IndexSpec): Index type and parameters.
+        vectors (np.ndarray): Vectors (n, d).
+        metric (int): FAISS metric type.
+
+    Returns:
+        faiss.Index: Populated index, ready for search.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    kind = spec.kind
+    if kind == "ivf_pq" and n < MIN_POINTS_PER_CENTROID * (1 << spec.pq_bits):
+        logger.warning(f"Only {n} vectors: too few to train product quantization; using IVF-Flat.")
+        kind = "ivf_flat"
+
+    if kind == "flat":
+        index = faiss.IndexFlat(d, metric)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(d, spec.hnsw_m, metric)
+        index.hnsw.efConstruction = spec.ef_construction
+    else:
+        nlist = spec.nlist or int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n // MIN_POINTS_PER_CENTROID))
+        quantizer = faiss.IndexFlat(d, metric)
+        if kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, metric)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, spec.pq_m or _pq_subquantizers(d), spec.pq_bits, metric)
+        train_size = min(n, spec.train_size or max(256 * nlist, MIN_POINTS_PER_CENTROID * (1 << spec.pq_bits)))
+        sample = vectors if train_size >= n else vectors[np.random.RandomState(0).choice(n, train_size, replace=False)]
+        index.train(sample)
+        logger.info(f"Trained {kind} index with {nlist} lists on {len(sample)} vectors.")
+    index.add(vectors)
+    return configure_index(index, spec)
+
+def save_index_spec(faiss_db_path: str, spec: IndexSpec) -> None:
+    """
+    Writes the index spec next to the FAISS files.
+    """
+    os.makedirs(faiss_db_path, exist_ok=True)
+    path = os.path.join(faiss_db_path, INDEX_SPEC_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(asdict(spec), f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_index_spec(faiss_db_path: str) -> IndexSpec:
+    """
+    Reads the spec stored with a FAISS database (flat for databases saved without one).
+    """
+    path = os.path.join(faiss_db_path, INDEX_SPEC_FILE)
+    if not os.path.exists(path):
+        return IndexSpec()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return replace(IndexSpec(), **json.load(f))
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable index spec '{path}': {e}")
+        return IndexSpec()
+
+def default_index_spec() -> IndexSpec:
+    """
+    The spec configured by FAISS_INDEX_SPEC.
+    """
+    return IndexSpec.parse(FAISS_INDEX_SPEC)
@@ -0,0 +1,177 @@
+# lexical_index.py
+
+import os
+import re
+import json
+import math
+import logging
+import numpy as np
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from langchain_community.vectorstores import FAISS
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+LEXICAL_INDEX_FILE = "bm25.json"
+LEXICAL_FORMAT_VERSION = 1
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Codes and part numbers ("x29", "0460-510-880", "3x400", "16a") stay single tokens
+_TOKEN = re.compile(r"[a-z0-9]+(?:[./-][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased word/code tokens of a text.
+    """
+    return _TOKEN.findall(text.lower())
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index (term -> doc positions and term
+    frequencies) of the documents in the FAISS docstore.
+    """
+
+    def __init__(self, doc_ids: List[str], doc_lengths: np.ndarray,
+                 postings: Dict[str, Tuple[np.ndarray, np.ndarray]], index_version: Optional[str] = None,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.doc_ids = doc_ids
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.index_version = index_version
+        self.k1 = k1
+        self.b = b
+        self.positions = {doc_id: position for position, doc_id in enumerate(doc_ids)}
+        average_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        # Per-document length normalisation of the BM25 denominator
+        self._norm = k1 * (1 - b + b * doc_lengths / (average_length or 1.0))
+        n = len(doc_ids)
+        self._idf = {term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                     for term, (docs, _) in postings.items()}
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, str]], index_version: Optional[str] = None) -> "BM25Index":
+        """
+        Builds the index from (doc id, text) pairs.
+        """
+        doc_ids, doc_lengths = [], []
+        term_docs: Dict[str, List[int]] = {}
+        term_freqs: Dict[str, List[int]] = {}
+        for position, (doc_id, text) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_docs.setdefault(term, []).append(position)
+                term_freqs.setdefault(term, []).append(tf)
+        postings = {term: (np.asarray(term_docs[term], dtype=np.int32), np.asarray(term_freqs[term], dtype=np.float32))
+                    for term in term_docs}
+        return cls(doc_ids, np.asarray(doc_lengths, dtype=np.float32), postings, index_version)
+
+    @classmethod
+    def from_faiss(cls, db: FAISS, index_version: Optional[str] = None) -> "BM25Index":
+        """
+        Builds the index over every document of a FAISS store.
+        """
+        pairs = []
+        for doc_id in db.index_to_docstore_id.values():
+            doc = db.docstore.search(doc_id)
+            if not isinstance(doc, str):
+                pairs.append((doc_id, doc.page_content))
+        return cls.build(pairs, index_version)
+
+    def mask(self, doc_ids: Iterable[str]) -> np.ndarray:
+        """
+        Boolean mask over index positions selecting `doc_ids`, for search().
+        """
+        allowed = np.zeros(len(self.doc_ids), dtype=bool)
+        allowed[[self.positions[doc_id] for doc_id in doc_ids if doc_id in self.positions]] = True
+        return allowed
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """
+        Returns the `k` best (doc id, BM25 score) pairs for the query.
+
+        Args:
+            query (str): Query text.
+            k (int): Number of results.
+            allowed (Optional[np.ndarray]): Mask from mask() restricting the candidates.
+
+        Returns:
+            List[Tuple[str, float]]: Matches with a positive score, best first.
+        """
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, tfs = posting
+            scores[docs] += self._idf[term] * tfs * (self.k1 + 1) / (tfs + self._norm[docs])
+        if allowed is not None:
+            scores[~allowed] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.doc_ids[position], float(scores[position])) for position in ranked]
+
+    def save(self, path: str) -> None:
+        data = {
+            "format_version": LEXICAL_FORMAT_VERSION,
+            "index_version": self.index_version,
+            "doc_ids": self.doc_ids,
+            "doc_lengths": self.doc_lengths.tolist(),
+            "postings": {term: [docs.tolist(), tfs.astype(int).tolist()] for term, (docs, tfs) in self.postings.items()},
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable lexical index '{path}': {e}")
+            return None
+        if data.get("format_version") != LEXICAL_FORMAT_VERSION:
+            return None
+        postings = {term: (np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+                    for term, (docs, tfs) in data["postings"].items()}
+        return cls(data["doc_ids"], np.asarray(data["doc_lengths"], dtype=np.float32), postings, data["index_version"])
+
+def ensure_lexical_index(db: FAISS, faiss_db_path: str, index_version: Optional[str]) -> BM25Index:
+    """
+    Loads the BM25 index stored with the FAISS database, rebuilding and saving
+    it if it is missing or was built for another index version.
+
+    Args:
+        db (FAISS): The FAISS database.
+        faiss_db_path (str): Directory of the FAISS database.
+        index_version (Optional[str]): Current index version from the manifest.
+
+    Returns:
+        BM25Index: Index over all documents of `db`.
+    """
+    path = os.path.join(faiss_db_path, LEXICAL_INDEX_FILE)
+    index = BM25Index.load(path)
+    if index is not None and index.index_version == index_version and index_version is not None:
+        return index
+    index = BM25Index.from_faiss(db, index_version)
+    os.makedirs(faiss_db_path, exist_ok=True)
+    index.save(path)
+    logger.info(f"Built BM25 index over {len(index.doc_ids)} documents ({len(index.postings)} terms).")
+    return index
+
+def load_lexical_index(faiss_db_path: str) -> Optional[BM25Index]:
+    """
+    Loads the BM25 index stored with the FAISS database, if any.
+    """
+    return BM25Index.load(os.path.join(faiss_db_path, LEXICAL_INDEX_FILE))
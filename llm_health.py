@@ -0,0 +1,146 @@
+# llm_health.py
+
+import os
+import time
+import threading
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "15"))
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "2"))
+HEALTH_OPEN_COOLDOWN = float(os.getenv("HEALTH_OPEN_COOLDOWN", "30"))
+HEALTH_MAX_COOLDOWN = float(os.getenv("HEALTH_MAX_COOLDOWN", "300"))
+
+# Circuit breaker states
+CLOSED = "closed"        # backend healthy, requests go to it
+OPEN = "open"            # backend down, requests skip it until the cooldown ends
+HALF_OPEN = "half_open"  # cooldown over, a single probe decides whether to close again
+
+class BackendHealthMonitor:
+    """
+    Tracks the health of an LLM backend from a background thread and exposes
+    it without blocking. Consecutive failures (from probes or from the request
+    path) trip a circuit breaker; after a cooldown a single half-open probe
+    decides whether the backend is used again, with the cooldown doubling
+    while it stays down.
+    """
+
+    def __init__(self, name: str, probe: Callable[[], None],
+                 interval: float = HEALTH_CHECK_INTERVAL,
+                 failure_threshold: int = HEALTH_FAILURE_THRESHOLD,
+                 open_cooldown: float = HEALTH_OPEN_COOLDOWN,
+                 max_cooldown: float = HEALTH_MAX_COOLDOWN,
+                 window: int = 50):
+        self.name = name
+        self.probe = probe
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = open_cooldown
+        self.max_cooldown = max_cooldown
+        # Unknown until the first probe finishes; treat as down so startup never waits on it
+        self.state = OPEN
+        self.cooldown = 0.0
+        self.opened_at = time.monotonic()
+        self.consecutive_failures = 0
+        self.latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BackendHealthMonitor":
+        """
+        Starts the background health-check thread (idempotent).
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-health", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                due = self.state != OPEN or time.monotonic() - self.opened_at >= self.cooldown
+                if due and self.state == OPEN:
+                    self.state = HALF_OPEN
+            if due:
+                self._check()
+            self._stop.wait(min(self.interval, 1.0) if self.state == OPEN else self.interval)
+
+    def _check(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.probe()
+        except Exception as e:
+            self.record_failure(e)
+        else:
+            self.record_success((time.perf_counter() - started) * 1000)
+        with self._lock:
+            self.last_checked = time.time()
+
+    def record_success(self, latency_ms: Optional[float] = None) -> None:
+        """
+        Records a successful probe or request and closes the circuit.
+        """
+        with self._lock:
+            if latency_ms is not None:
+                self.latency_ms = latency_ms if self.latency_ms is None else 0.8 * self.latency_ms + 0.2 * latency_ms
+            self._outcomes.append(True)
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info(f"LLM backend '{self.name}' is healthy; circuit closed.")
+            self.state = CLOSED
+            self.cooldown = 0.0
+
+    def record_failure(self, error: Any = None) -> None:
+        """
+        Records a failed probe or request; trips the circuit after enough
+        consecutive failures, or immediately when a half-open probe fails.
+        """
+        with self._lock:
+            self._outcomes.append(False)
+            self.consecutive_failures += 1
+            self.last_error = str(error) if error is not None else None
+            if self.state == HALF_OPEN:
+                self._open(min(self.max_cooldown, max(self.base_cooldown, self.cooldown * 2)))
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open(self.base_cooldown)
+
+    def _open(self, cooldown: float) -> None:
+        self.state = OPEN
+        self.cooldown = cooldown
+        self.opened_at = time.monotonic()
+        logger.warning(f"LLM backend '{self.name}' unavailable ({self.last_error}); "
+                       f"circuit open for {cooldown:.0f}s.")
+
+    def is_available(self) -> bool:
+        """
+        Returns True if requests should be sent to this backend. Never blocks on the network.
+        """
+        return self.state == CLOSED
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Returns state, smoothed latency, recent error rate and last error.
+        """
+        with self._lock:
+            error_rate = (self._outcomes.count(False) / len(self._outcomes)) if self._outcomes else None
+            return {
+                "backend": self.name,
+                "state": self.state,
+                "latency_ms": self.latency_ms,
+                "error_rate": error_rate,
+                "last_error": self.last_error,
+                "last_checked": self.last_checked,
+            }
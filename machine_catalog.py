@@ -0,0 +1,147 @@
+# machine_catalog.py
+
+import os
+import json
+import hashlib
+import logging
+import traceback
+from typing import Any, Dict, List
+from pdf_cache import file_sha256, parse_pdf
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+CATALOG_PATH = os.path.join("faiss_dbs", "machine_catalog.json")
+# A manual is considered valid when this word appears on any page
+VALIDITY_KEYWORD = "dimensions"
+
+def pdf_dir_fingerprint(pdf_dir: str) -> str:
+    """
+    Cheap fingerprint of the PDFs in a directory (names, sizes and mtimes only).
+
+    Args:
+        pdf_dir (str): Directory containing PDF manuals.
+
+    Returns:
+        str: Hex digest that changes whenever a PDF is added, removed or modified.
+    """
+    sha = hashlib.sha1()
+    entries = sorted(
+        (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+        for entry in os.scandir(pdf_dir)
+        if entry.is_file() and entry.name.lower().endswith('.pdf')
+    )
+    for name, size, mtime_ns in entries:
+        sha.update(f"{name}\0{size}\0{mtime_ns}\n".encode("utf-8"))
+    return sha.hexdigest()
+
+def _read_catalog(catalog_path: str) -> Dict[str, Any]:
+    if not os.path.exists(catalog_path):
+        return {}
+    try:
+        with open(catalog_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable machine catalog '{catalog_path}': {e}")
+        return {}
+
+def _catalog_entry(pdf_path: str, previous: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds the catalog entry of one manual, reusing `previous` when the content hash is unchanged.
+    """
+    stat = os.stat(pdf_path)
+    manual_name = os.path.basename(pdf_path)
+    if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+        return previous
+    digest = file_sha256(pdf_path)
+    if previous and previous["sha256"] == digest:
+        return dict(previous, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    entry = {
+        "machine": manual_name[:-4],
+        "file": manual_name,
+        "sha256": digest,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "page_count": 0,
+        "valid": False,
+    }
+    try:
+        parsed = parse_pdf(pdf_path)
+        entry["page_count"] = parsed["page_count"]
+        entry["valid"] = any(VALIDITY_KEYWORD in page["text"].lower() for page in parsed["pages"])
+    except Exception as e:
+        logger.error(f"Error validating PDF {pdf_path}: {e}")
+        logger.debug(traceback.format_exc())  # Detailed traceback for debugging
+    return entry
+
+def build_machine_catalog(pdf_dir: str, catalog_path: str = CATALOG_PATH) -> Dict[str, Any]:
+    """
+    Scans `pdf_dir` and writes the machine catalog manifest. Entries of
+    unchanged manuals are carried over from the existing catalog, so only
+    new or modified PDFs are parsed.
+
+    Args:
+        pdf_dir (str): Directory containing PDF manuals.
+        catalog_path (str): Path of the catalog JSON file.
+
+    Returns:
+        Dict[str, Any]: {"pdf_dir", "fingerprint", "machines": [{"machine", "file",
+            "sha256", "size", "mtime_ns", "page_count", "valid"}, ...]}
+    """
+    previous = _read_catalog(catalog_path)
+    previous_entries = {entry["file"]: entry for entry in previous.get("machines", [])} if previous else {}
+
+    machines = []
+    for manual_name in sorted(os.listdir(pdf_dir)):
+        if manual_name.lower().endswith('.pdf'):
+            pdf_path = os.path.join(pdf_dir, manual_name)
+            machines.append(_catalog_entry(pdf_path, previous_entries.get(manual_name)))
+
+    catalog = {
+        "pdf_dir": os.path.abspath(pdf_dir),
+        "fingerprint": pdf_dir_fingerprint(pdf_dir),
+        "machines": machines,
+    }
+    try:
+        os.makedirs(os.path.dirname(catalog_path) or ".", exist_ok=True)
+        tmp_path = catalog_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, indent=2)
+        os.replace(tmp_path, catalog_path)
+        logger.info(f"Machine catalog with {len(machines)} manuals written to '{catalog_path}'.")
+    except Exception as e:
+        logger.warning(f"Could not write machine catalog '{catalog_path}': {e}")
+    return catalog
+
+def load_machine_catalog(pdf_dir: str, catalog_path: str = CATALOG_PATH) -> Dict[str, Any]:
+    """
+    Loads the machine catalog, refreshing it only if the PDFs in `pdf_dir` changed.
+
+    Args:
+        pdf_dir (str): Directory containing PDF manuals.
+        catalog_path (str): Path of the catalog JSON file.
+
+    Returns:
+        Dict[str, Any]: The machine catalog (see `build_machine_catalog`).
+    """
+    catalog = _read_catalog(catalog_path)
+    if (catalog and catalog.get("pdf_dir") == os.path.abspath(pdf_dir)
+            and catalog.get("fingerprint") == pdf_dir_fingerprint(pdf_dir)):
+        return catalog
+    logger.info(f"PDFs in '{pdf_dir}' changed since the machine catalog was built; refreshing it.")
+    return build_machine_catalog(pdf_dir, catalog_path)
+
+def valid_machines(catalog: Dict[str, Any]) -> List[str]:
+    """
+    Returns the names of the valid machines in a catalog.
+
+    Args:
+        catalog (Dict[str, Any]): The machine catalog.
+
+    Returns:
+        List[str]: Valid ESAB machine names.
+    """
+    return [entry["machine"] for entry in catalog.get("machines", []) if entry["valid"]]
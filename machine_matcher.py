@@ -0,0 +1,129 @@
+# machine_matcher.py
+
+import re
+import string
+import logging
+from typing import Dict, Iterable, List
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+FUZZY_THRESHOLD = 70
+# With hundreds of models a loose fuzzy score matches many names; keep the best few
+FUZZY_MAX_MATCHES = 5
+
+_PUNCTUATION = re.compile(f"[{re.escape(string.punctuation)}]+")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """
+    Lower-cases a text and replaces punctuation and runs of whitespace by single spaces.
+    """
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+def machine_aliases(machines: Iterable[str]) -> Dict[str, str]:
+    """
+    Maps spellings of each machine name ("Warrior-Edge", "warrior edge",
+    "warrioredge", "Warrior 500is") to its lower-cased canonical name.
+
+    Args:
+        machines (Iterable[str]): Machine names.
+
+    Returns:
+        Dict[str, str]: Normalized alias -> canonical machine name.
+    """
+    aliases = {}
+    for machine in machines:
+        canonical = machine.lower()
+        stripped = normalize_text(machine)
+        for alias in (stripped, stripped.replace(" ", ""), stripped + "s"):
+            if alias:
+                aliases.setdefault(alias, canonical)
+    return aliases
+
+def trie_pattern(words: Iterable[str]) -> "re.Pattern":
+    """
+    Compiles words into one whole-word regex whose alternation follows a
+    character trie, so matching cost grows with the query length rather than
+    with the number of words. Longer words win over their prefixes.
+
+    Args:
+        words (Iterable[str]): Normalized words or phrases.
+
+    Returns:
+        re.Pattern: Pattern with the matched word in group 1.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A word ends here; the longer continuation is optional (greedy, so tried first)
+            return "(?:" + body + ")?"
+        return body
+
+    return re.compile(r"(?<!\w)(" + (build(trie) or "(?!)") + r")(?!\w)")
+
+class MachineMatcher:
+    """
+    Detects machine names in queries. Built once from the catalog: exact
+    matches use one trie-compiled pattern over the normalized names and their
+    aliases; if nothing matches exactly, all names are fuzzy-scored against the
+    query in one vectorized rapidfuzz call.
+    """
+
+    def __init__(self, machines: List[str], fuzzy_threshold: float = FUZZY_THRESHOLD,
+                 fuzzy_max_matches: int = FUZZY_MAX_MATCHES):
+        self.machines = list(dict.fromkeys(machines))
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_max_matches = fuzzy_max_matches
+        by_canonical = {m.lower(): m for m in self.machines}
+        self.aliases = {alias: by_canonical[canonical] for alias, canonical in machine_aliases(self.machines).items()}
+        self._pattern = trie_pattern(self.aliases)
+        self._names = [normalize_text(m) for m in self.machines]
+
+    def exact(self, query: str) -> List[str]:
+        """
+        Machines whose name or alias occurs as whole words in the query.
+        """
+        found = [self.aliases[match.group(1)] for match in self._pattern.finditer(normalize_text(query))]
+        return list(dict.fromkeys(found))
+
+    def fuzzy(self, query: str) -> List[str]:
+        """
+        Machines whose best partial/token-set similarity with the query exceeds
+        the threshold, best first.
+        """
+        normalized = normalize_text(query)
+        if not normalized or not self._names:
+            return []
+        partial = process.cdist([normalized], self._names, scorer=fuzz.partial_ratio, workers=-1)[0]
+        token_set = process.cdist([normalized], self._names, scorer=fuzz.token_set_ratio, workers=-1)[0]
+        scores = np.maximum(partial, token_set)
+        candidates = np.flatnonzero(scores > self.fuzzy_threshold)
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")][:self.fuzzy_max_matches]
+        return [self.machines[i] for i in ranked]
+
+    def detect(self, query: str) -> List[str]:
+        """
+        Exact (alias-aware) matches, or fuzzy matches when there are none.
+
+        Args:
+            query (str): User query.
+
+        Returns:
+            List[str]: Detected machine names as spelled in the catalog.
+        """
+        return self.exact(query) or self.fuzzy(query)
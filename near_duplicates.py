@@ -0,0 +1,190 @@
+# near_duplicates.py
+
+import os
+import re
+import zlib
+import logging
+import numpy as np
+from collections import Counter
+from typing import Dict, FrozenSet, List, Tuple
+from langchain_core.documents import Document
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Jaccard similarity of word shingles above which two chunks are one at ingestion
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+# Share of a retrieved chunk's shingles already in a higher-ranked chunk for it to be dropped
+DEDUP_CONTAINMENT = float(os.getenv("DEDUP_CONTAINMENT", "0.8"))
+SHINGLE_WORDS = 5
+MINHASH_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs at Jaccard 0.9 share a band with probability > 0.999
+LSH_BANDS = 16
+# Rough prompt-token estimate used for the savings log
+CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"\w+")
+# Numbers with their unit ("55 V", "3x400", "16A", "0460-510-880", "40 °C"); chunks of different
+# machines are only merged when these agree, since spec tables differ in little else
+_VALUE = re.compile(r"[A-Za-z]*\d+(?:[.,x/-]\d+)*(?:\s*(?:%|°\s*[CF]|(?:kVA|kW|VA|Hz|mm2|mm|kg|bar|dB|l/min|min|"
+                    r"V|A|W|s|m)(?![A-Za-z])))?")
+# Prime above 2**32, so (a * x + b) % p permutes the 32-bit shingle hashes without uint64 overflow
+_PRIME = np.uint64(4294967311)
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> np.ndarray:
+    """
+    Sorted unique 32-bit hashes of the word `size`-grams of a text
+    (one gram for shorter texts). Hashes are stable across processes.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams),
+                                 dtype=np.uint64, count=len(grams)))
+
+def value_tokens(text: str) -> Counter:
+    """
+    Multiset of the numeric/unit tokens of a text, whitespace and case normalized.
+    """
+    return Counter(re.sub(r"\s+", "", token).lower() for token in _VALUE.findall(text))
+
+def _machines(doc: Document) -> FrozenSet[str]:
+    return frozenset(doc.metadata.get("machines") or ([doc.metadata["machine"]] if doc.metadata.get("machine") else []))
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (len(a) + len(b) - common) if len(a) or len(b) else 1.0
+
+def containment(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Share of the shingles of `a` that also occur in `b`; a long chunk that
+    merely contains a short one scores low.
+    """
+    if not len(a) or not len(b):
+        return 0.0
+    return len(np.intersect1d(a, b, assume_unique=True)) / len(a)
+
+class MinHasher:
+    """
+    MinHash signatures with a fixed seed, banded for locality-sensitive lookup.
+    """
+
+    def __init__(self, permutations: int = MINHASH_PERMUTATIONS, bands: int = LSH_BANDS, seed: int = 1):
+        if permutations % bands:
+            raise ValueError("permutations must be a multiple of bands")
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 2 ** 31 - 1, size=(permutations, 1)).astype(np.uint64)
+        self.b = rng.randint(0, 2 ** 31 - 1, size=(permutations, 1)).astype(np.uint64)
+        self.bands = bands
+        self.rows = permutations // bands
+
+    def signature(self, shingle_hashes: np.ndarray) -> np.ndarray:
+        return ((self.a * shingle_hashes[None, :] + self.b) % _PRIME).min(axis=1)
+
+    def band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+def collapse_near_duplicates(documents: List[Document],
+                             threshold: float = DEDUP_THRESHOLD) -> Tuple[List[Document], Dict[str, int]]:
+    """
+    Collapses chunks that are near-copies of an earlier chunk (shared safety
+    boilerplate, repeated page text) into the earlier one. MinHash/LSH finds
+    the candidates, the exact shingle Jaccard similarity decides. Chunks of
+    different machines are only collapsed when all their numeric/unit tokens
+    agree, so a value that differs between machines is never lost.
+
+    A kept chunk that absorbed duplicates gets the provenance of all of them:
+    "machines" (sorted machine names) and "sources" ([{"machine", "page"}]).
+    Unique chunks are returned unchanged, so their document ids stay stable.
+
+    Args:
+        documents (List[Document]): Chunks in document order.
+        threshold (float): Minimum Jaccard similarity of duplicates.
+
+    Returns:
+        Tuple[List[Document], Dict[str, int]]: Kept chunks in document order and
+            stats ("documents", "kept", "collapsed", "chars_saved").
+    """
+    hasher = MinHasher()
+    sets = [shingles(doc.page_content) for doc in documents]
+    values: Dict[int, Counter] = {}
+
+    def same_facts(i: int, j: int) -> bool:
+        if _machines(documents[i]) == _machines(documents[j]):
+            return True
+        for k in (i, j):
+            if k not in values:
+                values[k] = value_tokens(documents[k].page_content)
+        return values[i] == values[j]
+
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    members: Dict[int, List[int]] = {}
+    for i, shingle_set in enumerate(sets):
+        if not len(shingle_set):
+            members[i] = [i]
+            continue
+        keys = hasher.band_keys(hasher.signature(shingle_set))
+        candidates = dict.fromkeys(j for key in keys for j in buckets.get(key, ()))
+        match = next((j for j in candidates if jaccard(shingle_set, sets[j]) >= threshold and same_facts(i, j)), None)
+        if match is not None:
+            members[match].append(i)
+            continue
+        members[i] = [i]
+        for key in keys:
+            buckets.setdefault(key, []).append(i)
+
+    kept = []
+    chars_saved = 0
+    for i, group in members.items():
+        doc = documents[i]
+        if len(group) > 1:
+            sources = [{"machine": documents[j].metadata.get("machine"), "page": documents[j].metadata.get("page")}
+                       for j in group]
+            machines = sorted({source["machine"] for source in sources if source["machine"]})
+            doc = Document(page_content=doc.page_content,
+                           metadata=dict(doc.metadata, machines=machines, sources=sources))
+            chars_saved += sum(len(documents[j].page_content) for j in group[1:])
+        kept.append(doc)
+    stats = {"documents": len(documents), "kept": len(kept),
+             "collapsed": len(documents) - len(kept), "chars_saved": chars_saved}
+    if stats["collapsed"]:
+        logger.info(f"Collapsed {stats['collapsed']} near-duplicate chunks: {len(documents)} -> {len(kept)} documents "
+                    f"({100 * stats['collapsed'] / len(documents):.1f}% smaller index, "
+                    f"~{chars_saved // CHARS_PER_TOKEN} tokens of duplicate text).")
+    return kept, stats
+
+def dedup_documents(docs: List[Document], max_containment: float = DEDUP_CONTAINMENT) -> List[Document]:
+    """
+    Drops retrieved chunks that are mostly contained in a higher-ranked chunk
+    (overlapping splits, a table and the page text around it). A chunk of
+    another machine is only dropped if all its numeric/unit tokens also occur
+    in the higher-ranked chunk, so comparison queries keep both machines' values.
+
+    Args:
+        docs (List[Document]): Retrieved chunks, best first.
+        max_containment (float): Containment at or above which a chunk is dropped.
+
+    Returns:
+        List[Document]: Remaining chunks in rank order.
+    """
+    kept, kept_sets, kept_values = [], [], []
+    dropped_chars = 0
+    for doc in docs:
+        shingle_set = shingles(doc.page_content)
+        doc_values = value_tokens(doc.page_content)
+        if any(containment(shingle_set, other) >= max_containment
+               and (_machines(doc) == _machines(other_doc) or not doc_values - other_values)
+               for other_doc, other, other_values in zip(kept, kept_sets, kept_values)):
+            dropped_chars += len(doc.page_content)
+            continue
+        kept.append(doc)
+        kept_sets.append(shingle_set)
+        kept_values.append(doc_values)
+    if len(kept) < len(docs):
+        logger.info(f"Dropped {len(docs) - len(kept)} of {len(docs)} retrieved chunks as near-duplicates "
+                    f"(~{dropped_chars // CHARS_PER_TOKEN} prompt tokens saved).")
+    return kept
@@ -0,0 +1,210 @@
+# pdf_cache.py
+
+import os
+import json
+import time
+import hashlib
+import pdfplumber
+import logging
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Parsed pages are stored next to the FAISS databases, one JSON file per PDF content hash
+PARSE_CACHE_DIR = os.path.join("faiss_dbs", "parsed_pdfs")
+# Bump when the structure of the parsed artifact changes so stale files are ignored
+PARSE_FORMAT_VERSION = 1
+# Number of pages handed to a worker process per task in parallel ingestion
+PAGES_PER_TASK = 8
+
+# In-process caches: (path, size, mtime) -> sha256 and sha256 -> parsed PDF
+_HASH_CACHE: Dict[tuple, str] = {}
+_PARSED_CACHE: Dict[str, Dict[str, Any]] = {}
+
+def file_sha256(pdf_path: str) -> str:
+    """
+    Computes the SHA-256 of a file's content, memoized on (path, size, mtime).
+
+    Args:
+        pdf_path (str): Path to the file.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    stat = os.stat(pdf_path)
+    stat_key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+    digest = _HASH_CACHE.get(stat_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        _HASH_CACHE[stat_key] = digest
+    return digest
+
+def _parse_page(page, page_number: int) -> Dict[str, Any]:
+    """
+    Extracts text, tables and layout info from a single pdfplumber page.
+    """
+    return {
+        "page_number": page_number,
+        "text": page.extract_text() or "",
+        "tables": page.extract_tables() or [],
+        "width": float(page.width),
+        "height": float(page.height),
+    }
+
+def _cache_file(digest: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{digest}.v{PARSE_FORMAT_VERSION}.json")
+
+def _load_cached(digest: str, cache_dir: str, pdf_path: str) -> Dict[str, Any]:
+    """
+    Returns the parsed artifact from memory or disk, or None if not cached yet.
+    """
+    parsed = _PARSED_CACHE.get(digest)
+    if parsed is not None:
+        return parsed
+    cache_path = _cache_file(digest, cache_dir)
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                parsed = json.load(f)
+            logger.info(f"Loaded parsed pages for '{pdf_path}' from cache.")
+            _PARSED_CACHE[digest] = parsed
+            return parsed
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable parse cache '{cache_path}': {e}")
+    return None
+
+def _store(pdf_path: str, digest: str, pages: List[Dict[str, Any]], cache_dir: str) -> Dict[str, Any]:
+    """
+    Builds the parsed artifact, keeps it in memory and persists it to `cache_dir`.
+    """
+    parsed = {
+        "sha256": digest,
+        "source": os.path.basename(pdf_path),
+        "page_count": len(pages),
+        "pages": pages,
+    }
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = _cache_file(digest, cache_dir)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(parsed, f)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.warning(f"Could not persist parse cache for '{pdf_path}': {e}")
+        logger.debug(traceback.format_exc())  # Detailed traceback for debugging
+    _PARSED_CACHE[digest] = parsed
+    return parsed
+
+def parse_pdf(pdf_path: str, cache_dir: str = PARSE_CACHE_DIR) -> Dict[str, Any]:
+    """
+    Parses a PDF once with pdfplumber and returns the cached per-page artifact.
+    The artifact is keyed by the PDF content hash, kept in memory for the
+    current process and persisted to `cache_dir` for later builds.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        cache_dir (str): Directory holding the parsed-page JSON files.
+
+    Returns:
+        Dict[str, Any]: {"sha256", "source", "page_count", "pages": [{"page_number",
+            "text", "tables", "width", "height"}, ...]}
+    """
+    digest = file_sha256(pdf_path)
+    parsed = _load_cached(digest, cache_dir, pdf_path)
+    if parsed is not None:
+        return parsed
+
+    logger.info(f"Parsing PDF '{pdf_path}' with pdfplumber.")
+    with pdfplumber.open(pdf_path) as pdf:
+        pages = [_parse_page(page, page_number)
+                 for page_number, page in enumerate(pdf.pages, start=1)]
+    return _store(pdf_path, digest, pages, cache_dir)
+
+def _parse_page_range(pdf_path: str, start: int, end: int) -> Tuple[List[Dict[str, Any]], int, float]:
+    """
+    Worker task: parses pages [start, end) of a PDF (0-based).
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int, float]: Parsed pages, worker pid and elapsed seconds.
+    """
+    started = time.perf_counter()
+    with pdfplumber.open(pdf_path) as pdf:
+        pages = [_parse_page(pdf.pages[i], i + 1) for i in range(start, end)]
+    return pages, os.getpid(), time.perf_counter() - started
+
+def parse_pdfs(pdf_paths: List[str], workers: int = 1, cache_dir: str = PARSE_CACHE_DIR) -> List[Dict[str, Any]]:
+    """
+    Parses several PDFs, fanning uncached ones out over a process pool in
+    page ranges of `PAGES_PER_TASK`. Results are merged back in input order
+    and page order, so downstream chunk/table indices are deterministic.
+    Per-worker throughput is logged once the pool finishes.
+
+    Args:
+        pdf_paths (List[str]): List of PDF file paths.
+        workers (int): Number of worker processes; 1 parses serially in-process.
+        cache_dir (str): Directory holding the parsed-page JSON files.
+
+    Returns:
+        List[Dict[str, Any]]: Parsed artifacts (see `parse_pdf`), one per input path.
+    """
+    pending_by_digest = {}
+    for pdf_path in pdf_paths:
+        digest = file_sha256(pdf_path)
+        if digest not in pending_by_digest and _load_cached(digest, cache_dir, pdf_path) is None:
+            pending_by_digest[digest] = pdf_path
+    pending = [(pdf_path, digest) for digest, pdf_path in pending_by_digest.items()]
+
+    if pending and workers > 1:
+        tasks = []
+        for pdf_path, digest in pending:
+            with pdfplumber.open(pdf_path) as pdf:
+                page_count = len(pdf.pages)
+            for start in range(0, page_count, PAGES_PER_TASK):
+                tasks.append((pdf_path, digest, start, min(start + PAGES_PER_TASK, page_count)))
+        logger.info(f"Parsing {len(pending)} PDF(s) as {len(tasks)} page-range tasks on {workers} workers.")
+
+        pages_by_pdf: Dict[str, Dict[int, List[Dict[str, Any]]]] = {digest: {} for _, digest in pending}
+        worker_stats: Dict[int, List[float]] = {}
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(task, pool.submit(_parse_page_range, task[0], task[2], task[3])) for task in tasks]
+            for (pdf_path, digest, start, _), future in futures:
+                pages, pid, elapsed = future.result()
+                pages_by_pdf[digest][start] = pages
+                stats = worker_stats.setdefault(pid, [0, 0.0])
+                stats[0] += len(pages)
+                stats[1] += elapsed
+        wall = time.perf_counter() - started
+
+        for pdf_path, digest in pending:
+            ranges = pages_by_pdf[digest]
+            pages = [page for start in sorted(ranges) for page in ranges[start]]
+            _store(pdf_path, digest, pages, cache_dir)
+        total_pages = sum(stats[0] for stats in worker_stats.values())
+        for pid, (page_count, busy) in sorted(worker_stats.items()):
+            logger.info(f"Worker {pid}: {page_count} pages in {busy:.2f}s ({page_count / busy if busy else 0:.1f} pages/s).")
+        logger.info(f"Parsed {total_pages} pages in {wall:.2f}s ({total_pages / wall if wall else 0:.1f} pages/s overall).")
+
+    return [parse_pdf(pdf_path, cache_dir) for pdf_path in pdf_paths]
+
+def get_pages(pdf_path: str) -> List[Dict[str, Any]]:
+    """
+    Returns the parsed pages of a PDF (see `parse_pdf`).
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+
+    Returns:
+        List[Dict[str, Any]]: Parsed pages in page order.
+    """
+    return parse_pdf(pdf_path)["pages"]
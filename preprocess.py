@@ -1,15 +1,29 @@
 # preprocess.py
 
 import os
-import re
-import pdfplumber
 import glob
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
 from langchain_community.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from pdf_cache import file_sha256, get_pages, parse_pdfs
+from embedding_backends import get_embeddings
+from embedding_pipeline import embed_texts_concurrently
+from machine_catalog import build_machine_catalog, valid_machines
+from index_manifest import compute_index_version, document_id, load_index_manifest, save_index_manifest
+from lexical_index import ensure_lexical_index
+from event_codes import build_event_code_index
+from spec_store import SpecStore
+from capability_index import process_capabilities, save_capability_index
+from section_index import ManualSections, parse_sections
+from near_duplicates import collapse_near_duplicates
+from disk_docstore import FAISS_LOAD_MODE, is_read_only, load_faiss_db, save_faiss_db, write_disk_docstore
+from index_spec import (IndexSpec, build_index, default_index_spec, load_index_spec,
+                        save_index_spec, stores_exact_vectors)
+import argparse
 import logging
 import traceback
 
@@ -18,33 +32,16 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-def is_pdf_valid(pdf_path: str) -> bool:
-    """
-    Validates a PDF by checking for the presence of the word 'dimensions'.
-    
-    Args:
-        pdf_path (str): Path to the PDF file.
-    
-    Returns:
-        bool: True if 'dimensions' is found, False otherwise.
-    """
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text and "dimensions" in text.lower():
-                    logger.info(f"'dimensions' text found in PDF '{pdf_path}'.")
-                    return True
-        logger.warning(f"'dimensions' text not found in PDF '{pdf_path}'.")
-        return False
-    except Exception as e:
-        logger.error(f"Error validating PDF {pdf_path}: {e}")
-        logger.debug(traceback.format_exc())  # Detailed traceback for debugging
-        return False
+# Worker processes used for PDF extraction; 1 keeps ingestion serial
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+
+SECTIONS_TO_EXTRACT = ["INTRODUCTION", "TECHNICAL DATA"]
 
 def load_esab_machines(pdf_dir: str) -> List[str]:
     """
     Validates PDFs in the specified directory and returns a list of valid ESAB machine names.
+    Also writes the machine catalog manifest that the Streamlit app loads
+    instead of scanning the PDFs itself.
     
     Args:
         pdf_dir (str): Directory containing PDF manuals.
@@ -53,31 +50,31 @@ def load_esab_machines(pdf_dir: str) -> List[str]:
         List[str]: List of valid ESAB machine names.
     """
     logger.info(f"Loading ESAB machines from directory '{pdf_dir}'.")
-    ESAB_MACHINES = []
-    for manual_name in os.listdir(pdf_dir):
-        if manual_name.lower().endswith('.pdf'):
-            pdf_path = os.path.join(pdf_dir, manual_name)
-            machine_name = manual_name[:-4]
-            logger.info(f"Validating PDF for machine '{machine_name}'.")
-            if is_pdf_valid(pdf_path):
-                ESAB_MACHINES.append(machine_name)
-                logger.info(f"Added machine '{machine_name}' to ESAB_MACHINES.")
-            else:
-                logger.warning(f"PDF for '{machine_name}' is invalid or lacks 'dimensions' data. Skipping.")
+    catalog = build_machine_catalog(pdf_dir)
+    for entry in catalog["machines"]:
+        if entry["valid"]:
+            logger.info(f"Added machine '{entry['machine']}' to ESAB_MACHINES.")
+        else:
+            logger.warning(f"PDF for '{entry['machine']}' is invalid or lacks 'dimensions' data. Skipping.")
+    ESAB_MACHINES = valid_machines(catalog)
     logger.info(f"Total valid machines found: {len(ESAB_MACHINES)}.")
     return ESAB_MACHINES
 
-def extract_all_content_as_documents(pdf_paths: List[str]) -> List[Document]:
+def extract_all_content_as_documents(pdf_paths: List[str], workers: int = 1) -> List[Document]:
     """
     Converts each PDF's text and tables into Document objects for FAISS indexing.
+    With `workers` > 1 the pdfplumber extraction is spread over a process pool;
+    documents are still emitted in input order, page order and chunk/table order.
     
     Args:
         pdf_paths (List[str]): List of PDF file paths.
+        workers (int): Number of worker processes for PDF extraction.
     
     Returns:
         List[Document]: List of Document objects.
     """
     logger.info("Extracting all content from PDFs as Documents.")
+    parse_pdfs(pdf_paths, workers=workers)
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200
@@ -86,40 +83,78 @@ def extract_all_content_as_documents(pdf_paths: List[str]) -> List[Document]:
     for pdf_path in pdf_paths:
         machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
         logger.info(f"Extracting content from PDF '{pdf_path}'.")
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_number, page in enumerate(pdf.pages, start=1):
-                page_text = page.extract_text() or ""
-                if page_text:
-                    split_texts = text_splitter.split_text(page_text)
-                    for idx, chunk in enumerate(split_texts):
+        for page in get_pages(pdf_path):
+            page_number = page["page_number"]
+            page_text = page["text"]
+            if page_text:
+                split_texts = text_splitter.split_text(page_text)
+                for idx, chunk in enumerate(split_texts):
+                    documents.append(Document(
+                        page_content=chunk,
+                        metadata={
+                            "machine": machine_name,
+                            "page": page_number,
+                            "chunk_idx": idx
+                        }
+                    ))
+                logger.info(f"Extracted {len(split_texts)} text chunks from page {page_number} of '{machine_name}'.")
+            # Convert tables to CSV
+            tables = page["tables"]
+            if tables:
+                for table_idx, table in enumerate(tables):
+                    if table and len(table) > 1:
+                        df = pd.DataFrame(table[1:], columns=table[0]).fillna("")
+                        table_csv = df.to_csv(index=False)
                         documents.append(Document(
-                            page_content=chunk,
+                            page_content=table_csv,
                             metadata={
                                 "machine": machine_name,
                                 "page": page_number,
-                                "chunk_idx": idx
+                                "table_idx": table_idx
                             }
                         ))
-                    logger.info(f"Extracted {len(split_texts)} text chunks from page {page_number} of '{machine_name}'.")
-                # Convert tables to CSV
-                tables = page.extract_tables()
-                if tables:
-                    for table_idx, table in enumerate(tables):
-                        if table and len(table) > 1:
-                            df = pd.DataFrame(table[1:], columns=table[0]).fillna("")
-                            table_csv = df.to_csv(index=False)
-                            documents.append(Document(
-                                page_content=table_csv,
-                                metadata={
-                                    "machine": machine_name,
-                                    "page": page_number,
-                                    "table_idx": table_idx
-                                }
-                            ))
-                            logger.info(f"Extracted table {table_idx} from page {page_number} of '{machine_name}' as CSV.")
+                        logger.info(f"Extracted table {table_idx} from page {page_number} of '{machine_name}' as CSV.")
     logger.info(f"Total documents extracted: {len(documents)}.")
     return documents
 
+def extract_section_trees(pdf_paths: List[str], sections_to_extract: List[str]) -> Dict[str, ManualSections]:
+    """
+    Parses the section tree (number, title, page span and text) of each PDF.
+
+    Args:
+        pdf_paths (List[str]): List of PDF file paths.
+        sections_to_extract (List[str]): Section names recognized as headers even without a number.
+
+    Returns:
+        Dict[str, ManualSections]: Section tree per machine.
+    """
+    trees = {}
+    for pdf_path in pdf_paths:
+        machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        logger.info(f"Processing PDF for machine '{machine_name}'.")
+        try:
+            trees[machine_name] = parse_sections(get_pages(pdf_path), sections_to_extract)
+            logger.info(f"Found {sum(1 for _ in trees[machine_name].walk())} sections in '{machine_name}'.")
+        except Exception as e:
+            logger.error(f"[ERROR] Processing {pdf_path}: {e}")
+            logger.debug(traceback.format_exc())  # Detailed traceback for debugging
+    return trees
+
+def section_texts(machine_name: str, manual: ManualSections, sections_to_extract: List[str]) -> Dict[str, str]:
+    """
+    Text of the requested top-level sections of a manual (repeated sections are joined).
+    """
+    texts = {}
+    for section in sections_to_extract:
+        content = "\n".join(manual.text(s) for s in manual.find(section) if s.level == 1).strip()
+        if content:
+            texts[section] = content
+            logger.info(f"Extracted content for section '{section}' in '{machine_name}'.")
+        else:
+            texts[section] = f"[INFO] No {section.upper()} section found."
+            logger.warning(f"No content found for section '{section}' in '{machine_name}'.")
+    return texts
+
 def extract_sections(pdf_paths: List[str], sections_to_extract: List[str]) -> Dict[str, Dict[str, str]]:
     """
     Extracts specified sections from the given PDF files.
@@ -133,80 +168,14 @@ def extract_sections(pdf_paths: List[str], sections_to_extract: List[str]) -> Di
         Dict[str, Dict[str, str]]: Extracted sections.
     """
     logger.info("Starting extraction of specified sections from PDFs.")
+    trees = extract_section_trees(pdf_paths, sections_to_extract)
     extracted_data = {}
-    # Patterns for the headers we care about
-    section_header_patterns = {
-        section: [
-            re.compile(rf'^\d+\.\s+{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^[IVXLCDM]+\.\s+{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^\d+\s+{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^[IVXLCDM]+\s+{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^{re.escape(section.upper())}$', re.IGNORECASE),
-            re.compile(rf'^\d+\.\s+{re.escape(section.upper())}[:\-]$', re.IGNORECASE),
-            re.compile(rf'^[IVXLCDM]+\.\s+{re.escape(section.upper())}[:\-]$', re.IGNORECASE),
-            re.compile(rf'^{re.escape(section.upper())}[:\-]$', re.IGNORECASE),
-        ]
-        for section in sections_to_extract
-    }
-    # Pattern for any new "unwanted" section header (stop capturing text if we hit a new one)
-    any_section_header_pattern = re.compile(r'^\d+\s+[A-Z\s\-]+$', re.IGNORECASE)
-
     for pdf_path in pdf_paths:
         machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        extracted_data[machine_name] = {section: "" for section in sections_to_extract}
-        logger.info(f"Processing PDF for machine '{machine_name}'.")
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                current_section = None
-                collected_text = {section: "" for section in sections_to_extract}
-
-                for page_number, page in enumerate(pdf.pages, start=1):
-                    page_text = page.extract_text() or ""
-                    lines = page_text.split('\n')
-
-                    for i, line in enumerate(lines):
-                        line_stripped = line.strip()
-                        line_upper = line_stripped.upper()
-
-                        # Check if line is a header for a desired section
-                        matched_section = None
-                        for section, patterns in section_header_patterns.items():
-                            for pattern in patterns:
-                                if pattern.match(line_stripped):
-                                    matched_section = section
-                                    break
-                            if matched_section:
-                                break
-
-                        if matched_section:
-                            current_section = matched_section
-                            # Collect the rest of the page after the matched header
-                            if i + 1 < len(lines):
-                                collected_text[current_section] += '\n'.join(lines[i+1:]) + '\n'
-                            logger.info(f"Detected section '{matched_section}' in '{machine_name}'.")
-                            break  # move to next page
-                        elif any_section_header_pattern.match(line_upper):
-                            # Found a new section not in sections_to_extract
-                            current_section = None
-                            continue
-
-                        # If we're inside a desired section, accumulate text
-                        if current_section:
-                            collected_text[current_section] += line + '\n'
-
-                # Final assignment of extracted text
-                for section in sections_to_extract:
-                    content = collected_text[section].strip()
-                    if content:
-                        extracted_data[machine_name][section] = content
-                        logger.info(f"Extracted content for section '{section}' in '{machine_name}'.")
-                    else:
-                        extracted_data[machine_name][section] = f"[INFO] No {section.upper()} section found."
-                        logger.warning(f"No content found for section '{section}' in '{machine_name}'.")
-        except Exception as e:
-            logger.error(f"[ERROR] Processing {pdf_path}: {e}")
-            logger.debug(traceback.format_exc())  # Detailed traceback for debugging
-
+        if machine_name in trees:
+            extracted_data[machine_name] = section_texts(machine_name, trees[machine_name], sections_to_extract)
+        else:
+            extracted_data[machine_name] = {section: "" for section in sections_to_extract}
     logger.info("Completed extraction of sections from all PDFs.")
     return extracted_data
 
@@ -227,7 +196,10 @@ def dataframe_to_documents(df: pd.DataFrame) -> List[Document]:
         process = row["Welding Process"]
         machines = row["Machines"]
         content = f"The welding process {process} is compatible with the following machines: {machines}."
-        documents.append(Document(page_content=content))
+        documents.append(Document(
+            page_content=content,
+            metadata={"source": "welding_process_analysis", "welding_process": process}
+        ))
     logger.info(f"Converted {len(documents)} DataFrame rows to Documents.")
     return documents
 
@@ -243,29 +215,8 @@ def detect_welding_processes(sections: Dict[str, Dict[str, str]]) -> pd.DataFram
         pd.DataFrame: DataFrame containing welding processes and compatible machines.
     """
     logger.info("Starting detection of welding processes supported by machines.")
-    welding_processes = {
-        "MMA": ["MMA", "STICK", "SMAW"],
-        "MIG/MAG": ["MIG", "MAG", "GMAW"],
-        "TIG": ["TIG", "GTAW"],
-        "FCAW": ["FCAW", "FLUX CORED"]
-    }
-    process_machines = {proc: [] for proc in welding_processes.keys()}
-
-    for machine, content_dict in sections.items():
-        # Combine "INTRODUCTION" + "TECHNICAL DATA" text
-        combined_content = ""
-        for sec_name in ["INTRODUCTION", "TECHNICAL DATA"]:
-            sec_text = content_dict.get(sec_name, "")
-            combined_content += sec_text.upper() + " "
-
-        # Match processes
-        for process_name, keywords in welding_processes.items():
-            for kw in keywords:
-                pattern = r'\b' + re.escape(kw.upper()) + r'\b'
-                if re.search(pattern, combined_content):
-                    process_machines[process_name].append(machine)
-                    logger.info(f"Machine '{machine}' supports welding process '{process_name}'.")
-                    break
+    # Keyword patterns are compiled once per process in capability_index
+    process_machines = process_capabilities(sections)
 
     data = {"Welding Process": [], "Machines": []}
     for process_name, machines_list in process_machines.items():
@@ -279,201 +230,243 @@ def detect_welding_processes(sections: Dict[str, Dict[str, str]]) -> pd.DataFram
     logger.info("Completed detection of welding processes.")
     return df
 
-def extract_all_content_as_documents(pdf_paths: List[str]) -> List[Document]:
+def build_derived_documents(esab_machines: List[str], sections: Dict[str, Dict[str, str]]) -> List[Document]:
     """
-    Converts each PDF's text and tables into Document objects for FAISS indexing.
+    Builds the documents derived from the whole library: the machine list and
+    the welding process compatibility documents.
     
     Args:
-        pdf_paths (List[str]): List of PDF file paths.
+        esab_machines (List[str]): List of valid ESAB machine names.
+        sections (Dict[str, Dict[str, str]]): Extracted sections per machine.
     
     Returns:
-        List[Document]: List of Document objects.
+        List[Document]: Derived Document objects.
     """
-    logger.info("Extracting all content from PDFs as Documents.")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    documents = []
-    for pdf_path in pdf_paths:
-        machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        logger.info(f"Extracting content from PDF '{pdf_path}'.")
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_number, page in enumerate(pdf.pages, start=1):
-                page_text = page.extract_text() or ""
-                if page_text:
-                    split_texts = text_splitter.split_text(page_text)
-                    for idx, chunk in enumerate(split_texts):
-                        documents.append(Document(
-                            page_content=chunk,
-                            metadata={
-                                "machine": machine_name,
-                                "page": page_number,
-                                "chunk_idx": idx
-                            }
-                        ))
-                    logger.info(f"Extracted {len(split_texts)} text chunks from page {page_number} of '{machine_name}'.")
-                # Convert tables to CSV
-                tables = page.extract_tables()
-                if tables:
-                    for table_idx, table in enumerate(tables):
-                        if table and len(table) > 1:
-                            df = pd.DataFrame(table[1:], columns=table[0]).fillna("")
-                            table_csv = df.to_csv(index=False)
-                            documents.append(Document(
-                                page_content=table_csv,
-                                metadata={
-                                    "machine": machine_name,
-                                    "page": page_number,
-                                    "table_idx": table_idx
-                                }
-                            ))
-                            logger.info(f"Extracted table {table_idx} from page {page_number} of '{machine_name}' as CSV.")
-    logger.info(f"Total documents extracted: {len(documents)}.")
+    all_machines_text = "ESAB Machines List:\n" + "\n".join(esab_machines)
+    documents = [Document(
+        page_content=all_machines_text,
+        metadata={"source": "machine_list"}
+    )]
+    logger.info("Added machine list document to FAISS database.")
+
+    process_df = detect_welding_processes(sections)
+    if not process_df.empty:
+        process_documents = dataframe_to_documents(process_df)
+        documents.extend(process_documents)
+        logger.info(f"Added {len(process_documents)} welding process documents to the knowledge base.")
+    else:
+        logger.info("No welding processes identified or no relevant sections found.")
     return documents
 
-def dataframe_to_documents(df: pd.DataFrame) -> List[Document]:
+def build_faiss_store(embeddings, texts: List[str], vectors, metadatas: List[Dict], ids: List[str],
+                      spec: IndexSpec) -> FAISS:
     """
-    Converts a DataFrame of welding processes and machines into
-    a list of string-based Documents for indexing and retrieval.
-    
-    Args:
-        df (pd.DataFrame): DataFrame containing 'Welding Process' and 'Machines'.
-    
-    Returns:
-        List[Document]: List of Document objects.
+    Creates a FAISS store whose index is built according to `spec`.
     """
-    logger.info("Converting DataFrame to Document objects.")
-    documents = []
-    for _, row in df.iterrows():
-        process = row["Welding Process"]
-        machines = row["Machines"]
-        content = f"The welding process {process} is compatible with the following machines: {machines}."
-        documents.append(Document(page_content=content))
-    logger.info(f"Converted {len(documents)} DataFrame rows to Documents.")
-    return documents
+    index = build_index(spec, np.asarray(vectors, dtype=np.float32))
+    docstore = InMemoryDocstore({doc_id: Document(id=doc_id, page_content=text, metadata=metadata)
+                                 for doc_id, text, metadata in zip(ids, texts, metadatas)})
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
 
-def detect_welding_processes(sections: Dict[str, Dict[str, str]]) -> pd.DataFrame:
+def rebuild_faiss_store(db: FAISS, spec: IndexSpec, ids_to_delete: List[str], texts: List[str], vectors,
+                        metadatas: List[Dict], ids_to_add: List[str]) -> FAISS:
     """
-    Detects which machines support MMA, MIG/MAG, TIG, FCAW, etc.
-    Returns a DataFrame with 'Welding Process' and 'Compatible Machines'.
-    
-    Args:
-        sections (Dict[str, Dict[str, str]]): Extracted sections from PDFs.
-    
-    Returns:
-        pd.DataFrame: DataFrame containing welding processes and compatible machines.
+    Rebuilds the store with the `spec` index, minus `ids_to_delete` plus the new
+    chunks. Used for index types without removal (HNSW) or needing retraining
+    (IVF), and when the spec changes. Kept vectors are read back from the index,
+    or from the embedding cache when the index only holds PQ codes.
     """
-    logger.info("Starting detection of welding processes supported by machines.")
-    welding_processes = {
-        "MMA": ["MMA", "STICK", "SMAW"],
-        "MIG/MAG": ["MIG", "MAG", "GMAW"],
-        "TIG": ["TIG", "GTAW"],
-        "FCAW": ["FCAW", "FLUX CORED"]
-    }
-    process_machines = {proc: [] for proc in welding_processes.keys()}
-
-    for machine, content_dict in sections.items():
-        # Combine "INTRODUCTION" + "TECHNICAL DATA" text
-        combined_content = ""
-        for sec_name in ["INTRODUCTION", "TECHNICAL DATA"]:
-            sec_text = content_dict.get(sec_name, "")
-            combined_content += sec_text.upper() + " "
-
-        # Match processes
-        for process_name, keywords in welding_processes.items():
-            for kw in keywords:
-                pattern = r'\b' + re.escape(kw.upper()) + r'\b'
-                if re.search(pattern, combined_content):
-                    process_machines[process_name].append(machine)
-                    logger.info(f"Machine '{machine}' supports welding process '{process_name}'.")
-                    break
-
-    data = {"Welding Process": [], "Machines": []}
-    for process_name, machines_list in process_machines.items():
-        if machines_list:
-            data["Welding Process"].append(process_name)
-            data["Machines"].append(", ".join(machines_list))
-            logger.info(f"Added welding process '{process_name}' with machines: {machines_list}.")
-
-    df = pd.DataFrame(data)
-    df = df.sort_values("Welding Process").reset_index(drop=True)
-    logger.info("Completed detection of welding processes.")
-    return df
+    deleted = set(ids_to_delete)
+    kept = [(position, doc_id) for position, doc_id in sorted(db.index_to_docstore_id.items()) if doc_id not in deleted]
+    kept_docs = [db.docstore.search(doc_id) for _, doc_id in kept]
+    kept_texts = [doc.page_content for doc in kept_docs]
+    if not kept:
+        kept_vectors = np.zeros((0, db.index.d), dtype=np.float32)
+    elif stores_exact_vectors(db.index):
+        kept_vectors = db.index.reconstruct_batch(np.asarray([position for position, _ in kept], dtype=np.int64))
+    else:
+        kept_vectors = np.asarray(embed_texts_concurrently(kept_texts, db.embedding_function), dtype=np.float32)
+    new_vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), db.index.d)
+    return build_faiss_store(
+        db.embedding_function,
+        kept_texts + texts,
+        np.vstack([kept_vectors, new_vectors]),
+        [doc.metadata for doc in kept_docs] + metadatas,
+        [doc_id for _, doc_id in kept] + ids_to_add,
+        spec,
+    )
 
-def create_faiss_db(esab_machines: List[str], pdf_dir: str = 'pdfs', faiss_db_dir: str = 'faiss_dbs') -> FAISS:
+def create_faiss_db(esab_machines: List[str], pdf_dir: str = 'pdfs', faiss_db_dir: str = 'faiss_dbs',
+                    workers: int = INGEST_WORKERS, index_spec: Optional[IndexSpec] = None) -> FAISS:
     """
-    Creates or loads a FAISS database from the provided PDFs and ESAB machines.
+    Creates, loads or incrementally updates the FAISS database for the PDFs in `pdf_dir`.
+    A manifest of per-PDF content hashes and per-chunk ids is stored with the
+    database; only new or changed PDFs are extracted, only new chunks are
+    embedded, vectors of removed chunks and manuals are deleted, and the
+    machine-list and welding-process documents are regenerated. A BM25 keyword
+    index over the same documents is kept next to the FAISS files, and so is
+    the index spec; a changed spec rebuilds the index from the stored vectors.
     
     Args:
         esab_machines (List[str]): List of valid ESAB machine names.
         pdf_dir (str): Directory containing PDF manuals.
         faiss_db_dir (str): Directory to store/load FAISS databases.
+        workers (int): Number of worker processes for PDF extraction.
+        index_spec (Optional[IndexSpec]): FAISS index type; defaults to FAISS_INDEX_SPEC.
     
     Returns:
-        FAISS: Loaded or newly created FAISS database object.
+        FAISS: Up-to-date FAISS database object.
     """
     faiss_db_path = os.path.join(faiss_db_dir, "combined_faiss_db")
     logger.info("Preparing to load or create FAISS database.")
 
-    # Initialize embeddings
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=os.getenv("GOOGLE_API")
-    )
-    logger.info("Initialized GoogleGenerativeAIEmbeddings.")
+    # Initialize embeddings (backend selected by EMBEDDING_BACKEND, behind the embedding cache)
+    embeddings = get_embeddings()
+
+    pdf_paths = sorted(glob.glob(os.path.join(pdf_dir, "*.pdf")))
+    manifest = load_index_manifest(faiss_db_path)
+    spec = index_spec or default_index_spec()
+    stored_spec = load_index_spec(faiss_db_path)
+    db = None
 
-    # If FAISS DB already exists, load it
+    # If FAISS DB already exists, load it and bring it up to date
     if os.path.exists(faiss_db_path):
-        logger.info("Loading existing FAISS database...")
-        try:
-            db = FAISS.load_local(faiss_db_path, embeddings, allow_dangerous_deserialization=True)
-            logger.info("FAISS database loaded successfully.")
-            return db
-        except Exception as e:
-            logger.error(f"Failed to load FAISS database from '{faiss_db_path}': {e}")
-            logger.debug(traceback.format_exc())  # Detailed traceback for debugging
-            return None
+        if not pdf_paths or (manifest is not None and manifest.get("embedding_model") == embeddings.model_name):
+            logger.info("Loading existing FAISS database...")
+            try:
+                db = load_faiss_db(faiss_db_path, embeddings, stored_spec, FAISS_LOAD_MODE,
+                                   manifest.get("index_version") if manifest else None)
+                logger.info("FAISS database loaded successfully.")
+            except Exception as e:
+                logger.error(f"Failed to load FAISS database from '{faiss_db_path}': {e}")
+                logger.debug(traceback.format_exc())  # Detailed traceback for debugging
+                if not pdf_paths:
+                    return None
+                manifest = None
+            if not pdf_paths:
+                logger.warning(f"No PDF files found in '{pdf_dir}'; using the FAISS database as-is.")
+                return db
+        else:
+            logger.warning("Existing FAISS database has no compatible manifest; rebuilding from scratch.")
+            manifest = None
 
-    # Otherwise create a new one
-    logger.info("Creating new FAISS database...")
-    pdf_paths = glob.glob(os.path.join(pdf_dir, "*.pdf"))
     if not pdf_paths:
         logger.error(f"No PDF files found in '{pdf_dir}' directory.")
         return None
 
-    # 1) Extract base documents from PDFs
-    documents = extract_all_content_as_documents(pdf_paths)
-    logger.info(f"Extracted {len(documents)} documents from PDFs.")
-
-    # 2) Also create a doc listing all ESAB machines
-    all_machines_text = "ESAB Machines List:\n" + "\n".join(esab_machines)
-    machine_list_doc = Document(
-        page_content=all_machines_text,
-        metadata={"source": "machine_list"}
-    )
-    documents.append(machine_list_doc)
-    logger.info("Added machine list document to FAISS database.")
-
-    # 3) Extract sections and detect welding processes
-    sections_to_extract = ["INTRODUCTION", "TECHNICAL DATA"]
-    extracted_sections = extract_sections(pdf_paths, sections_to_extract)
-    process_df = detect_welding_processes(extracted_sections)
+    # Event code index for the LLM-free lookup path (only changed manuals are re-parsed)
+    try:
+        build_event_code_index(pdf_paths, os.path.join(faiss_db_dir, "event_codes.json"))
+    except Exception as e:
+        logger.error(f"Failed to build the event code index: {e}")
+        logger.debug(traceback.format_exc())  # Detailed traceback for debugging
 
-    if not process_df.empty:
-        # Convert that DataFrame into Document objects
-        process_documents = dataframe_to_documents(process_df)
-        # Add them to the list of documents
-        documents.extend(process_documents)
-        logger.info(f"Added {len(process_documents)} welding process documents to the knowledge base.")
-    else:
-        logger.info("No welding processes identified or no relevant sections found.")
+    # Typed technical data (parameter, condition, value, unit) from the manuals' tables
+    try:
+        SpecStore(os.path.join(faiss_db_dir, "specs.sqlite")).update(pdf_paths)
+    except Exception as e:
+        logger.error(f"Failed to update the technical data store: {e}")
+        logger.debug(traceback.format_exc())  # Detailed traceback for debugging
 
-    # 4) Build the FAISS DB
+    # 1) Find new, changed and removed manuals by content hash
+    old_pdfs = manifest["pdfs"] if manifest else {}
+    pdf_entries = {}
+    changed_paths = []
+    for pdf_path in pdf_paths:
+        machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        digest = file_sha256(pdf_path)
+        entry = old_pdfs.get(machine_name)
+        if entry and entry["sha256"] == digest:
+            pdf_entries[machine_name] = entry
+        else:
+            logger.info(f"Manual '{machine_name}' is {'changed' if entry else 'new'}.")
+            changed_paths.append(pdf_path)
+            pdf_entries[machine_name] = {"sha256": digest, "doc_ids": [], "sections": {}}
+    removed_machines = sorted(set(old_pdfs) - set(pdf_entries))
+    for machine_name in removed_machines:
+        logger.info(f"Manual '{machine_name}' was removed.")
+
+    # 2) Extract documents of all manuals (parsed pages are cached) when any manual changed or was
+    #    removed, since near-duplicates are collapsed across manuals and a collapsed chunk may cite
+    #    a removed manual; sections of new or changed manuals only
+    new_documents: Dict[str, Document] = {}
+    dedup_stats = manifest.get("dedup") if manifest else None
+    if changed_paths or removed_machines:
+        documents = extract_all_content_as_documents(pdf_paths, workers=workers)
+        logger.info(f"Extracted {len(documents)} documents from {len(pdf_paths)} PDFs.")
+        documents, dedup_stats = collapse_near_duplicates(documents)
+        pdf_entries = {machine_name: dict(entry, doc_ids=[]) for machine_name, entry in pdf_entries.items()}
+        for doc in documents:
+            doc_id = document_id(doc)
+            for machine_name in doc.metadata.get("machines") or [doc.metadata["machine"]]:
+                pdf_entries[machine_name]["doc_ids"].append(doc_id)
+            new_documents[doc_id] = doc
+        for machine_name, manual in extract_section_trees(changed_paths, SECTIONS_TO_EXTRACT).items():
+            pdf_entries[machine_name]["sections"] = section_texts(machine_name, manual, SECTIONS_TO_EXTRACT)
+            pdf_entries[machine_name]["section_tree"] = manual.outline()
+
+    # 3) Regenerate the machine list and welding process documents, and the process -> machines index
+    all_sections = {machine_name: entry["sections"] for machine_name, entry in pdf_entries.items()}
+    derived_documents = build_derived_documents(esab_machines, all_sections)
+    save_capability_index(process_capabilities(all_sections), os.path.join(faiss_db_dir, "process_capabilities.json"))
+    derived_ids = [document_id(doc) for doc in derived_documents]
+    new_documents.update(zip(derived_ids, derived_documents))
+
+    all_ids = set(derived_ids)
+    for entry in pdf_entries.values():
+        all_ids.update(entry["doc_ids"])
+    old_ids = set()
+    if db is not None:
+        old_ids.update(manifest["derived_ids"])
+        for entry in old_pdfs.values():
+            old_ids.update(entry["doc_ids"])
+    ids_to_delete = sorted(old_ids - all_ids)
+    ids_to_add = [doc_id for doc_id in new_documents if doc_id not in old_ids]
+
+    # 4) Build or update the FAISS DB
     try:
-        db = FAISS.from_documents(documents, embeddings)
-        db.save_local(faiss_db_path)
-        logger.info(f"FAISS database created and saved to '{faiss_db_path}'.")
+        documents_to_add = [new_documents[doc_id] for doc_id in ids_to_add]
+        texts = [doc.page_content for doc in documents_to_add]
+        metadatas = [doc.metadata for doc in documents_to_add]
+        if db is None:
+            logger.info(f"Creating new FAISS database ({spec.kind} index)...")
+            vectors = embed_texts_concurrently(texts, embeddings)
+            db = build_faiss_store(embeddings, texts, vectors, metadatas, ids_to_add, spec)
+        elif spec == stored_spec and spec.kind == "flat" and (ids_to_delete or ids_to_add):
+            logger.info(f"Updating FAISS database: {len(ids_to_add)} chunks to embed, {len(ids_to_delete)} to delete.")
+            if is_read_only(db):
+                # A memory-mapped database cannot be updated in place
+                db = load_faiss_db(faiss_db_path, embeddings, stored_spec, "memory")
+            if ids_to_delete:
+                db.delete(ids_to_delete)
+            if ids_to_add:
+                vectors = embed_texts_concurrently(texts, embeddings)
+                db.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids_to_add)
+        elif spec != stored_spec or ids_to_delete or ids_to_add:
+            logger.info(f"Rebuilding {spec.kind} FAISS index: {len(ids_to_add)} chunks to embed, "
+                        f"{len(ids_to_delete)} to delete{', index spec changed' if spec != stored_spec else ''}.")
+            vectors = embed_texts_concurrently(texts, embeddings) if texts else []
+            db = rebuild_faiss_store(db, spec, ids_to_delete, texts, vectors, metadatas, ids_to_add)
+        else:
+            logger.info("FAISS database is up to date.")
+            ensure_lexical_index(db, faiss_db_path, manifest.get("index_version"))
+            return db
+
+        logger.info(f"Embedding cache: {embeddings.stats()}.")
+        save_faiss_db(db, faiss_db_path)
+        save_index_spec(faiss_db_path, spec)
+        index_version = compute_index_version(all_ids)
+        write_disk_docstore(faiss_db_path, db, index_version)
+        save_index_manifest(faiss_db_path, {
+            "embedding_model": embeddings.model_name,
+            "index_version": index_version,
+            "pdfs": pdf_entries,
+            "derived_ids": derived_ids,
+            "dedup": dedup_stats,
+        })
+        # Keyword (BM25) index over the same documents, for hybrid retrieval
+        ensure_lexical_index(db, faiss_db_path, index_version)
+        logger.info(f"FAISS database saved to '{faiss_db_path}'.")
         return db
     except Exception as e:
         logger.error(f"Failed to create/save FAISS database: {e}")
@@ -502,12 +495,23 @@ if __name__ == "__main__":
     This script validates PDFs, extracts necessary information, and creates a FAISS database.
     Run this script before starting the Streamlit application to ensure the FAISS database is ready.
     """
+    parser = argparse.ArgumentParser(description="Build the ESAB FAISS knowledge base.")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                        help="Worker processes for PDF extraction (default: INGEST_WORKERS or 1).")
+    parser.add_argument("--index-spec", default=None,
+                        help='FAISS index type, e.g. "hnsw:hnsw_m=32" or "ivf_pq:nlist=1024,pq_m=48" '
+                             '(default: FAISS_INDEX_SPEC or flat).')
+    args = parser.parse_args()
     try:
+        if args.workers > 1:
+            # Parse every manual in parallel up front; validation below then hits the parse cache
+            parse_pdfs(sorted(glob.glob(os.path.join('pdfs', "*.pdf"))), workers=args.workers)
         esab_machines = load_esab_machines('pdfs')
         if not esab_machines:
             logger.error("No valid machine manuals found. Exiting preprocessing.")
             exit(1)
-        faiss_db = create_faiss_db(esab_machines, pdf_dir='pdfs', faiss_db_dir='faiss_dbs')
+        faiss_db = create_faiss_db(esab_machines, pdf_dir='pdfs', faiss_db_dir='faiss_dbs', workers=args.workers,
+                                   index_spec=IndexSpec.parse(args.index_spec) if args.index_spec else None)
         if faiss_db:
             logger.info("Preprocessing completed successfully.")
         else:
@@ -0,0 +1,81 @@
+# reranker.py
+
+import os
+import time
+import logging
+import numpy as np
+from functools import lru_cache
+from typing import List, Optional
+from langchain_core.documents import Document
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Optional stage: retrieve RERANK_CANDIDATES chunks, keep the RERANK_TOP_N best by cross-encoder score
+RERANK = os.getenv("RERANK", "0") == "1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "5"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# Query + passage tokens seen by the cross-encoder; longer chunks are truncated
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+# Scoring stops after the batch that crosses this budget; unscored chunks keep their first-stage order
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "400"))
+
+@lru_cache(maxsize=2)
+def load_cross_encoder(model_name: str = RERANK_MODEL):
+    """
+    Loads a sentence-transformers CrossEncoder on the CPU, or returns None if unavailable.
+    """
+    try:
+        from sentence_transformers import CrossEncoder
+        model = CrossEncoder(model_name, device="cpu", max_length=RERANK_MAX_LENGTH)
+        logger.info(f"Loaded cross-encoder '{model_name}' for reranking.")
+        return model
+    except Exception as e:
+        logger.warning(f"Cross-encoder '{model_name}' unavailable ({e}); reranking disabled.")
+        return None
+
+def rerank_documents(query: str, docs: List[Document], top_n: int = RERANK_TOP_N,
+                     model_name: str = RERANK_MODEL, batch_size: int = RERANK_BATCH_SIZE,
+                     latency_budget_ms: Optional[float] = RERANK_LATENCY_BUDGET_MS) -> List[Document]:
+    """
+    Scores (query, chunk) pairs with a cross-encoder in batches and returns
+    the `top_n` best chunks.
+
+    Batches are scored in first-stage order. Once `latency_budget_ms` is spent
+    the remaining chunks are not scored: they rank after the scored ones, in
+    their first-stage order. Without a model the first `top_n` chunks are returned.
+
+    Args:
+        query (str): User query.
+        docs (List[Document]): First-stage candidates, best first.
+        top_n (int): Number of chunks to keep.
+        model_name (str): Cross-encoder model.
+        batch_size (int): Pairs per forward pass.
+        latency_budget_ms (Optional[float]): Scoring time budget; None for no limit.
+
+    Returns:
+        List[Document]: Reranked chunks.
+    """
+    model = load_cross_encoder(model_name)
+    if model is None or len(docs) <= 1:
+        return docs[:top_n]
+    started = time.perf_counter()
+    scores: List[float] = []
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        scores.extend(np.asarray(model.predict([(query, doc.page_content) for doc in batch],
+                                               batch_size=batch_size, show_progress_bar=False)).tolist())
+        if latency_budget_ms is not None and (time.perf_counter() - started) * 1000 > latency_budget_ms:
+            break
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    scored = sorted(range(len(scores)), key=lambda i: -scores[i])
+    ranked = scored + list(range(len(scores), len(docs)))
+    if len(scores) < len(docs):
+        logger.warning(f"Rerank latency budget of {latency_budget_ms:.0f} ms reached: "
+                       f"scored {len(scores)} of {len(docs)} chunks.")
+    logger.info(f"Reranked {len(scores)} chunks in {elapsed_ms:.0f} ms; keeping {min(top_n, len(docs))}.")
+    return [docs[i] for i in ranked[:top_n]]
@@ -0,0 +1,319 @@
+# retrieval.py
+
+import os
+import math
+import logging
+import threading
+import numpy as np
+import faiss
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from lexical_index import BM25Index
+from disk_docstore import get_documents, index_metadata, index_positions
+from near_duplicates import DEDUP_CONTAINMENT, dedup_documents
+from context_packer import CHUNK_OVERHEAD_TOKENS, CONTEXT_TOKEN_BUDGET, budget_pack, mmr_pack, token_counter
+from reranker import RERANK, RERANK_CANDIDATES, RERANK_TOP_N, rerank_documents
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Library-wide documents kept in every machine-scoped index
+SHARED_SOURCES = ("welding_process_analysis", "machine_list")
+RETRIEVER_K = 13
+# Hybrid retrieval fuses smaller, more precise candidate lists, so fewer chunks reach the prompt
+HYBRID_K = 6
+HYBRID_FETCH_K = 20
+RRF_K = 60
+# Drop retrieved chunks that repeat a higher-ranked one before they reach the prompt
+QUERY_DEDUP = os.getenv("QUERY_DEDUP", "1") == "1"
+# Select the prompt's chunks by MMR under CONTEXT_TOKEN_BUDGET; retrieval then fetches RETRIEVER_K candidates
+CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "1") == "1"
+
+class ScopedIndex:
+    """
+    A subset of a FAISS index's positions, searched in place through an ID
+    selector, so nothing is copied out of a (possibly memory-mapped) index.
+    Results keep the positions of the full index; every other attribute is
+    the full index's.
+    """
+
+    def __init__(self, index: faiss.Index, positions: np.ndarray):
+        self.index = index
+        self.positions = positions
+        self.ntotal = len(positions)
+        # The search parameters only point at the selector, so it lives as long as this object
+        self._selector = faiss.IDSelectorBatch(positions)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.index, name)
+
+    def _params(self, k: int) -> faiss.SearchParameters:
+        # IVF and HNSW visit only part of the index; widen the search by how little of it is selected
+        scale = self.index.ntotal / max(1, self.ntotal)
+        if isinstance(self.index, faiss.IndexIVF):
+            nprobe = min(self.index.nlist, max(self.index.nprobe, math.ceil(self.index.nprobe * scale)))
+            return faiss.SearchParametersIVF(sel=self._selector, nprobe=nprobe)
+        if isinstance(self.index, faiss.IndexHNSW):
+            ef_search = min(self.index.ntotal, max(self.index.hnsw.efSearch, math.ceil(k * scale)))
+            return faiss.SearchParametersHNSW(sel=self._selector, efSearch=ef_search)
+        return faiss.SearchParameters(sel=self._selector)
+
+    def search(self, x: np.ndarray, k: int, params: Optional[faiss.SearchParameters] = None) -> Tuple[np.ndarray, np.ndarray]:
+        return self.index.search(x, k, params=params or self._params(k))
+
+class ScopedIdMap(Mapping):
+    """
+    Position -> docstore id map of a ScopedIndex, read through the full map.
+    """
+
+    def __init__(self, id_map: Mapping, positions: np.ndarray):
+        self._id_map = id_map
+        self._positions = positions
+        self._ids: Optional[List[str]] = None
+
+    def __getitem__(self, position: int) -> str:
+        slot = np.searchsorted(self._positions, position)
+        if slot >= len(self._positions) or self._positions[slot] != position:
+            raise KeyError(position)
+        return self._id_map[position]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._positions.tolist())
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def values(self) -> List[str]:
+        if self._ids is None:
+            ids_at = getattr(self._id_map, "ids_at", None)
+            positions = self._positions.tolist()
+            self._ids = ids_at(positions) if ids_at else [self._id_map[position] for position in positions]
+        return self._ids
+
+    def items(self):
+        return list(zip(self._positions.tolist(), self.values()))
+
+class MachineIndexes:
+    """
+    Per-machine views of the combined FAISS index: each machine-scoped store
+    searches the combined index in place, restricted to its documents' positions,
+    so nothing is re-embedded or copied. Positions are grouped at startup from a
+    metadata query; stores for a machine set are assembled on first use.
+    """
+
+    def __init__(self, db: FAISS):
+        self.db = db
+        self._lock = threading.Lock()
+        self._by_set: Dict[FrozenSet[str], FAISS] = {}
+        positions: Dict[str, List[int]] = {}
+        shared: List[int] = []
+        for position, metadata in index_metadata(db, ["machines", "machine", "source"]):
+            # Collapsed near-duplicates list every machine they came from
+            machines = metadata.get("machines") or [metadata.get("machine", "")]
+            if any(machines):
+                for machine in machines:
+                    positions.setdefault(machine.lower(), []).append(position)
+            elif metadata.get("source", "") in SHARED_SOURCES:
+                shared.append(position)
+
+        self._positions: Dict[str, np.ndarray] = {
+            key: np.asarray(key_positions, dtype=np.int64)
+            for key, key_positions in list(positions.items()) + [("", shared)]}
+        logger.info(f"Grouped the combined index positions of {len(positions)} machines.")
+
+    def machines(self) -> List[str]:
+        """
+        Returns the (lower-cased) machine names that have documents in the index.
+        """
+        return sorted(key for key in self._positions if key)
+
+    def for_machines(self, machines: List[str]) -> Optional[FAISS]:
+        """
+        Returns a FAISS store over the documents of `machines` plus the shared
+        machine-list and welding-process documents, or None if none of the
+        machines has documents.
+
+        Args:
+            machines (List[str]): Machine names (any case).
+
+        Returns:
+            Optional[FAISS]: Machine-scoped FAISS store sharing the combined index and documents.
+        """
+        key = frozenset(m.lower() for m in machines if m.lower() in self._positions)
+        if not key:
+            return None
+        with self._lock:
+            store = self._by_set.get(key)
+            if store is None:
+                # Documents shared by several of the machines are selected once
+                positions = np.unique(np.concatenate([self._positions[group] for group in sorted(key) + [""]]))
+                store = FAISS(
+                    self.db.embedding_function,
+                    ScopedIndex(self.db.index, positions),
+                    # Documents are looked up in the combined docstore (possibly on disk), not copied
+                    self.db.docstore,
+                    ScopedIdMap(self.db.index_to_docstore_id, positions),
+                    distance_strategy=self.db.distance_strategy,
+                    normalize_L2=self.db._normalize_L2,
+                )
+                self._by_set[key] = store
+                logger.info(f"Assembled machine-scoped index for {sorted(key)} with {len(positions)} documents.")
+        return store
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses FAISS similarity search with BM25 keyword search by reciprocal rank
+    fusion, so exact tokens (event codes, ordering numbers, fuse ratings) are
+    found even when the embedding similarity misses them.
+    """
+
+    store: Any
+    lexical: Any
+    allowed: Optional[Any] = None
+    k: int = HYBRID_K
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+
+    def _vector_ids(self, query: str) -> List[str]:
+        vector = np.asarray([self.store._embed_query(query)], dtype=np.float32)
+        if self.store._normalize_L2:
+            faiss.normalize_L2(vector)
+        _, positions = self.store.index.search(vector, min(self.fetch_k, self.store.index.ntotal))
+        return [self.store.index_to_docstore_id[position] for position in positions[0] if position != -1]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        fused: Dict[str, float] = {}
+        lexical_ids = [doc_id for doc_id, _ in self.lexical.search(query, self.fetch_k, self.allowed)]
+        for ranking in (self._vector_ids(query), lexical_ids):
+            for rank, doc_id in enumerate(ranking):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        ranked = sorted(fused, key=lambda doc_id: -fused[doc_id])[:self.k]
+        docs = get_documents(self.store, ranked)
+        return [doc for doc in docs if not isinstance(doc, str)]
+
+class DedupRetriever(BaseRetriever):
+    """
+    Wraps a retriever and removes chunks that are near-duplicates of a
+    higher-ranked chunk.
+    """
+
+    base: BaseRetriever
+    max_containment: float = DEDUP_CONTAINMENT
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.base.invoke(query, config={"callbacks": run_manager.get_child()})
+        return dedup_documents(docs, self.max_containment)
+
+class RerankRetriever(BaseRetriever):
+    """
+    Reorders a wide candidate set with a CPU cross-encoder and keeps the best few.
+    """
+
+    base: BaseRetriever
+    top_n: int = RERANK_TOP_N
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.base.invoke(query, config={"callbacks": run_manager.get_child()})
+        return rerank_documents(query, docs, self.top_n)
+
+class PackedRetriever(BaseRetriever):
+    """
+    Packs the retrieved chunks into the prompt's token budget by maximal
+    marginal relevance. Chunk vectors are read back from the store's index at
+    the positions of the chunks' docstore ids, so nothing is re-embedded.
+    """
+
+    base: BaseRetriever
+    store: Any
+    budget: int = CONTEXT_TOKEN_BUDGET
+    # False keeps the base retriever's order (e.g. after reranking) and only enforces the budget
+    use_mmr: bool = True
+
+    def _vectors(self, docs: List[Document]) -> np.ndarray:
+        # Chunks without a docstore id (e.g. from an older pickled docstore) are embedded instead
+        with_ids = [i for i, doc in enumerate(docs) if doc.id]
+        rows: List[Optional[int]] = [None] * len(docs)
+        for i, position in zip(with_ids, index_positions(self.store, [docs[i].id for i in with_ids])):
+            rows[i] = position
+        vectors = np.zeros((len(docs), self.store.index.d), dtype=np.float32)
+        found = [i for i, row in enumerate(rows) if row is not None]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if found:
+            vectors[found] = self.store.index.reconstruct_batch(np.asarray([rows[i] for i in found], dtype=np.int64))
+        if missing:
+            vectors[missing] = np.asarray(self.store._embed_documents([docs[i].page_content for i in missing]))
+        return vectors
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.base.invoke(query, config={"callbacks": run_manager.get_child()})
+        if not docs:
+            return docs
+        count_tokens = token_counter()
+        token_counts = [count_tokens(doc.page_content) + CHUNK_OVERHEAD_TOKENS for doc in docs]
+        if self.use_mmr:
+            query_vector = np.asarray(self.store._embed_query(query), dtype=np.float32)
+            selected, stats = mmr_pack(query_vector, self._vectors(docs), token_counts, self.budget)
+        else:
+            selected, stats = budget_pack(token_counts, self.budget)
+        logger.info(f"Packed {len(selected)} of {len(docs)} chunks into {stats['packed_tokens']}/{self.budget} tokens "
+                    f"({stats['candidate_tokens'] - stats['packed_tokens']} tokens saved, "
+                    f"{stats['trimmed']} low-score chunks trimmed).")
+        return [docs[i] for i in selected]
+
+def build_retriever(db: FAISS, machine_indexes: Optional[MachineIndexes], machines: List[str],
+                    k: Optional[int] = None, lexical_index: Optional[BM25Index] = None) -> BaseRetriever:
+    """
+    Returns a retriever restricted to `machines` (plus shared documents) when
+    given, otherwise over the entire knowledge base. With a BM25 index the
+    retriever is hybrid (vector + keyword), otherwise similarity only.
+    Retrieved near-duplicates are then dropped (QUERY_DEDUP), a wide candidate
+    set is optionally reranked by a cross-encoder (RERANK) and the rest is
+    packed into the prompt's token budget (CONTEXT_PACKING).
+
+    Args:
+        db (FAISS): Combined FAISS database.
+        machine_indexes (Optional[MachineIndexes]): Sub-indexes of `db`.
+        machines (List[str]): Detected machines; empty for general queries.
+        k (Optional[int]): Number of documents to retrieve; defaults to
+            RERANK_CANDIDATES when reranking, RETRIEVER_K when packing, else
+            HYBRID_K for hybrid and RETRIEVER_K for similarity retrieval.
+        lexical_index (Optional[BM25Index]): BM25 index over the documents of `db`.
+
+    Returns:
+        BaseRetriever: Retriever for the query.
+    """
+    store = db
+    if machines:
+        scoped = machine_indexes.for_machines(machines) if machine_indexes else None
+        if scoped is not None:
+            logger.info(f"Using machine-scoped FAISS index for {machines} + analysis docs.")
+            store = scoped
+        else:
+            logger.warning("No matching docs for that machine. Using full DB.")
+    else:
+        logger.info("No specific machine. Using entire knowledge base.")
+
+    if RERANK:
+        k = k or RERANK_CANDIDATES
+    elif CONTEXT_PACKING:
+        k = k or RETRIEVER_K
+    if lexical_index is not None:
+        allowed = lexical_index.mask(store.index_to_docstore_id.values()) if store is not db else None
+        k = k or HYBRID_K
+        retriever = HybridRetriever(store=store, lexical=lexical_index, allowed=allowed, k=k,
+                                    fetch_k=max(HYBRID_FETCH_K, k))
+    else:
+        retriever = store.as_retriever(search_type="similarity", search_kwargs={"k": k or RETRIEVER_K})
+    if QUERY_DEDUP:
+        retriever = DedupRetriever(base=retriever)
+    if RERANK:
+        retriever = RerankRetriever(base=retriever)
+    if CONTEXT_PACKING:
+        retriever = PackedRetriever(base=retriever, store=store, use_mmr=not RERANK)
+    return retriever
@@ -0,0 +1,161 @@
+# section_index.py
+
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+SECTION_TITLE_MAX_CHARS = 80
+
+# One pattern for every header shape: optional markdown marks, an optional
+# arabic ("3", "5.6.1") or roman ("II") number with an optional dot, the title
+# and an optional trailing ":" or "-". Table of contents lines fail on their
+# dot leaders, which the title does not allow.
+_SECTION_HEADER = re.compile(
+    r"^(?:#+\s*)?"
+    r"(?:(?P<number>\d+(?:\.\d+)*|[IVXLCDM]+)(?P<dot>\.)?\s+)?"
+    r"(?P<title>[A-Za-z][A-Za-z0-9 &/,()'\-]*?)"
+    r"\s*[:\-]?$"
+)
+
+@dataclass
+class Section:
+    """
+    A numbered section of a manual. `start`/`end` delimit its lines in the
+    owning ManualSections; pages are the manual's page numbers.
+    """
+    number: Optional[str]
+    title: str
+    level: int
+    page_start: int
+    page_end: int
+    start: int
+    end: int
+    children: List["Section"] = field(default_factory=list)
+
+    def outline(self) -> Dict:
+        """
+        JSON-serializable section tree without the text.
+        """
+        return {"number": self.number, "title": self.title, "level": self.level,
+                "page_start": self.page_start, "page_end": self.page_end,
+                "children": [child.outline() for child in self.children]}
+
+@dataclass
+class ManualSections:
+    """
+    Section tree of one manual over its text lines.
+    """
+    lines: List[str]
+    line_pages: List[int]
+    roots: List[Section]
+
+    def walk(self) -> Iterator[Section]:
+        """
+        Every section, depth first in document order.
+        """
+        stack = list(reversed(self.roots))
+        while stack:
+            section = stack.pop()
+            yield section
+            stack.extend(reversed(section.children))
+
+    def find(self, title: str) -> List[Section]:
+        """
+        Sections whose title equals `title` (case-insensitive), in document order.
+        """
+        title = title.upper()
+        return [section for section in self.walk() if section.title.upper() == title]
+
+    def text(self, section: Section) -> str:
+        """
+        Text of a section including its subsections (the header line excluded).
+        """
+        return "\n".join(self.lines[section.start:section.end]).strip()
+
+    def outline(self) -> List[Dict]:
+        return [root.outline() for root in self.roots]
+
+def match_header(line: str, wanted: Iterable[str] = ()) -> Optional[Tuple[Optional[str], str, int]]:
+    """
+    Classifies a stripped line as a section header.
+
+    Top-level headers are a number followed by an upper-case title ("3 TECHNICAL
+    DATA", "II. SAFETY"), or any spelling of a wanted title, numbered or not
+    ("Introduction:"). Subsection headers have a dotted number ("5.6.1 Fan control").
+
+    Args:
+        line (str): Stripped line.
+        wanted (Iterable[str]): Upper-cased titles that are headers even without a number.
+
+    Returns:
+        Optional[Tuple[Optional[str], str, int]]: (number, title, level), or None.
+    """
+    match = _SECTION_HEADER.match(line)
+    if not match:
+        return None
+    number, title = match.group("number"), match.group("title").strip()
+    if title.upper() in wanted:
+        return number, title, 1
+    if number is None or len(title) > SECTION_TITLE_MAX_CHARS:
+        return None
+    if "." in number:
+        return (number, title, number.count(".") + 1) if title[0].isupper() else None
+    return (number, title, 1) if title.isupper() else None
+
+def parse_sections(pages: List[Dict], wanted: Iterable[str] = ()) -> ManualSections:
+    """
+    Builds the section tree of a manual in one pass over its lines.
+
+    Top-level headers repeated as running page headers continue the open
+    section. Subsection headers only count when their number continues the
+    open section ("4.2" inside "4"), and stay part of the parent's text.
+
+    Args:
+        pages (List[Dict]): Parsed pages ({"page_number", "text", ...}) from pdf_cache.
+        wanted (Iterable[str]): Titles recognized as top-level headers even without a number.
+
+    Returns:
+        ManualSections: Lines and section tree.
+    """
+    wanted = {title.upper() for title in wanted}
+    lines: List[str] = []
+    line_pages: List[int] = []
+    roots: List[Section] = []
+    stack: List[Section] = []
+
+    def close(level: int) -> None:
+        while stack and stack[-1].level >= level:
+            section = stack.pop()
+            section.end = len(lines)
+            section.page_end = line_pages[-1] if section.end > section.start else section.page_start
+
+    for page in pages:
+        page_number = page["page_number"]
+        for raw_line in page["text"].split("\n"):
+            header = match_header(raw_line.strip(), wanted)
+            if header:
+                number, title, level = header
+                if level == 1 and stack and stack[0].title.upper() == title.upper() and stack[0].number == number:
+                    # Running page header of the open section
+                    continue
+                if level > 1 and not (stack and stack[0].number and number.startswith(stack[0].number + ".")):
+                    header = None
+            if not header:
+                lines.append(raw_line)
+                line_pages.append(page_number)
+                continue
+            close(level)
+            if level > 1:
+                lines.append(raw_line)
+                line_pages.append(page_number)
+            section = Section(number, title, level, page_number, page_number, len(lines), len(lines))
+            (stack[-1].children if stack else roots).append(section)
+            stack.append(section)
+    close(1)
+    return ManualSections(lines, line_pages, roots)
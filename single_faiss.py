@@ -17,6 +17,9 @@ from langchain_groq import ChatGroq
 from langchain_community.vectorstores import FAISS
 from utils import load_esab_logo, detect_machine_in_query
 import preprocess  # Ensure preprocess.py is in the same directory or properly referenced
+from retrieval import MachineIndexes, build_retriever
+from lexical_index import load_lexical_index
+from llm_health import BackendHealthMonitor
 
 # ---------------------- Setup Logging ----------------------
 logging.basicConfig(level=logging.INFO,
@@ -45,16 +48,20 @@ def get_resources():
     Initializes and returns ESAB machines and FAISS database.
 
     Returns:
-        Tuple[List[str], FAISS]: List of ESAB machines and FAISS database object.
+        Tuple[List[str], FAISS, MachineIndexes, BM25Index]: List of ESAB machines, FAISS
+            database object, its per-machine sub-indexes and its BM25 keyword index.
     """
     logger.info("Initializing resources - should only appear once.")
     esab_machines, faiss_db = preprocess.initialize_resources()
     if not esab_machines:
         logger.error("No valid ESAB machines found during initialization.")
-    return esab_machines, faiss_db
+    # Per-machine sub-indexes reuse the stored vectors, so machine-scoped queries never re-embed
+    machine_indexes = MachineIndexes(faiss_db) if faiss_db else None
+    lexical_index = load_lexical_index(os.path.join(FAISS_DB_DIR, "combined_faiss_db"))
+    return esab_machines, faiss_db, machine_indexes, lexical_index
 
 try:
-    esab_machines, faiss_db = get_resources()
+    esab_machines, faiss_db, machine_indexes, lexical_index = get_resources()
     logger.info(f"Loaded FAISS_DB with {len(faiss_db.index_to_docstore_id)} documents.")
 except Exception as e:
     logger.error(f"Failed to initialize resources: {e}")
@@ -151,29 +158,42 @@ def get_llm():
             temperature=0.05
         )
 
+def probe_aws_connection() -> None:
+    """
+    Health probe of the AWS GPU server; raises if it does not answer with 200.
+    """
+    response = requests.get(f"http://{AWS_IP}:{AWS_PORT}", timeout=5)
+    if response.status_code != 200:
+        raise ConnectionError(f"AWS GPU server returned HTTP {response.status_code}")
+
+@st.cache_resource
+def get_ollama_monitor() -> BackendHealthMonitor:
+    """
+    Process-wide background health monitor (circuit breaker) of the AWS GPU server.
+
+    Returns:
+        BackendHealthMonitor: The started monitor.
+    """
+    logger.info("Starting AWS GPU server health monitor.")
+    return BackendHealthMonitor("ollama", probe_aws_connection).start()
+
 def check_aws_connection() -> bool:
     """
-    Checks connection to AWS GPU server. (Synchronous check)
+    Checks connection to AWS GPU server from the background health monitor's
+    state; no network call is made here.
 
     Returns:
-        bool: True if connected, False otherwise.
+        bool: True if the circuit is closed (server healthy), False otherwise.
     """
-    logger.info("Checking connection to AWS GPU server.")
-    try:
-        response = requests.get(f"http://{AWS_IP}:{AWS_PORT}", timeout=5)
-        if response.status_code == 200:
-            logger.info("✅ Connected to AWS GPU server.")
-            st.sidebar.success("✅ Connected to AWS GPU server")
-            return True
-        else:
-            logger.error(f"❌ Connection to AWS GPU server failed with status code {response.status_code}.")
-            st.sidebar.error("❌ Connection to AWS GPU server failed")
-            return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f"❌ Unable to connect to AWS GPU server: {e}")
-        logger.debug(traceback.format_exc())  # Detailed traceback for debugging
-        st.sidebar.error("❌ Unable to connect to AWS GPU server")
-        return False
+    monitor = get_ollama_monitor()
+    status = monitor.status()
+    if monitor.is_available():
+        logger.info("✅ AWS GPU server healthy.")
+        st.sidebar.success("✅ Connected to AWS GPU server")
+        return True
+    logger.warning(f"❌ AWS GPU server unavailable (state: {status['state']}, last error: {status['last_error']}).")
+    st.sidebar.error("❌ Unable to connect to AWS GPU server")
+    return False
 
 # ---------------------- Chain Setup ----------------------
 def setup_chain(detected_machines: List[str]):
@@ -215,31 +235,9 @@ Promote ESAB products and services where appropriate.
         logger.error("FAISS database is unavailable. Cannot set up RetrievalQA chain.")
         return None, None
 
-    # If user specified machines, filter docs
-    if detected_machines:
-        logger.info(f"Filtering FAISS DB for specified machines: {detected_machines}.")
-        relevant_docs = []
-        for doc_id, doc in faiss_db.docstore._dict.items():
-            machine_meta = doc.metadata.get("machine", "").lower()
-            source_meta = doc.metadata.get("source", "")
-            # Only keep docs for specified machines or process/machine_list docs
-            if machine_meta in [m.lower() for m in detected_machines]:
-                relevant_docs.append(doc)
-            elif source_meta in ("welding_process_analysis", "machine_list"):
-                relevant_docs.append(doc)
-        if relevant_docs:
-            # Make a smaller FAISS with those docs
-            new_db = FAISS.from_documents(relevant_docs, faiss_db.embedding_function)
-            retriever = new_db.as_retriever(search_type="similarity", search_kwargs={"k": 13})
-            logger.info(f"Using filtered FAISS DB for {detected_machines} + analysis docs.")
-        else:
-            # Fallback: no matching docs => use entire DB
-            retriever = faiss_db.as_retriever(search_type="similarity", search_kwargs={"k": 13})
-            logger.warning("No matching docs for the specified machines. Using full FAISS DB.")
-    else:
-        # No machine => entire DB
-        retriever = faiss_db.as_retriever(search_type="similarity", search_kwargs={"k": 13})
-        logger.info("No specific machine detected. Using entire knowledge base.")
+    # Machine-scoped queries search sub-indexes of the stored vectors; nothing is re-embedded.
+    # Vector hits are fused with BM25 keyword hits so codes and part numbers are found exactly
+    retriever = build_retriever(faiss_db, machine_indexes, detected_machines, lexical_index=lexical_index)
 
     # Build the QA chain
     try:
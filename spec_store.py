@@ -0,0 +1,251 @@
+# spec_store.py
+
+import os
+import re
+import sqlite3
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+from langchain.docstore.document import Document
+from pdf_cache import file_sha256, get_pages
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+SPEC_STORE_PATH = os.path.join("faiss_dbs", "specs.sqlite")
+# Share of the question's content words a spec row must cover to be answered without the LLM
+SPEC_MIN_COVERAGE = 0.75
+SPEC_MAX_QUERY_WORDS = 12
+SPEC_MAX_ROWS = 12
+
+_WORD = re.compile(r"[a-z0-9]+")
+_NUMBER = re.compile(r"^[<>≤≥~±]?\s*([-+]?\d+(?:[.,]\d+)?)")
+_UNIT = re.compile(r"(°C|%|l/min|mm2|mm|kg|bar|dB|Hz|kVA|MVA|kW|VA|V|A|W|l|s|min)(?![A-Za-z])")
+# pdfplumber/markdown placeholder header cells ("Col2")
+_PLACEHOLDER = re.compile(r"^Col\d+$")
+# Sub-rows of a parameter group ("MIG/MAG", "60% duty cycle", "at maximum current (MMA)")
+_SUB_ROW = re.compile(r"^(?:MIG|MAG|MMA|TIG|FCAW|GMAW|GTAW|SMAW|\d+\s*%|[a-z])")
+# Welding process names; they narrow a parameter ("Primary current MIG/MAG") but are not one
+_PROCESS_WORDS = {"mig", "mag", "mma", "tig", "fcaw", "gmaw", "gtaw", "smaw"}
+_STOPWORDS = {
+    "what", "whats", "is", "are", "the", "of", "for", "at", "a", "an", "on", "in", "to", "how", "much",
+    "many", "does", "do", "which", "tell", "me", "value", "values", "rated", "rating", "size", "sizes",
+    "machine", "esab", "please", "give", "its", "it", "my", "this", "with", "and", "s",
+}
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def _clean(cell) -> str:
+    text = " ".join(str(cell).split()) if cell is not None else ""
+    return "" if _PLACEHOLDER.match(text) else text
+
+def parse_value(text: str) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Leading number and unit of a table value ("55 V" -> (55.0, "V"), "89%" -> (89.0, "%")).
+    """
+    match = _NUMBER.match(text)
+    if not match:
+        return None, None
+    unit = _UNIT.search(text, match.end())
+    return float(match.group(1).replace(",", ".")), unit.group(1) if unit else None
+
+def _table_section(page_text: str, table: List[List]) -> Optional[str]:
+    heading = _clean(table[0][0]) if table and table[0] else ""
+    if "fuse" in heading.lower():
+        return "FUSE SIZES"
+    running_header = next((line for line in page_text.splitlines() if line.strip()), "")
+    if "TECHNICAL DATA" in running_header.upper() or "TECHNICAL DATA" in heading.upper():
+        return "TECHNICAL DATA"
+    return None
+
+def parse_spec_table(table: List[List]) -> List[Dict]:
+    """
+    Turns a technical-data table into typed rows. Rows without values start a
+    parameter group, rows with several values under a group header are
+    expanded per column (e.g. per mains voltage) into the row's condition.
+
+    Args:
+        table (List[List]): pdfplumber table (rows of cells, None for empty).
+
+    Returns:
+        List[Dict]: Rows {"parameter", "condition", "value", "value_num", "unit"}.
+    """
+    rows = []
+    group, group_has_sub_rows, columns = None, False, None
+    for raw_row in table:
+        cells = [_clean(cell) for cell in raw_row]
+        if not cells or not cells[0]:
+            continue
+        label, values = cells[0], [cell for cell in cells[1:] if cell]
+        if not values:
+            # All-caps rows are table/model titles; others head a parameter group
+            group = None if label.upper() == label else label
+            group_has_sub_rows = False
+            continue
+        if len(values) > 1 and columns is None:
+            # First multi-column row holds the column conditions ("380 V | 400 V | 460 V")
+            group, group_has_sub_rows, columns = label, False, values
+            continue
+        if _SUB_ROW.match(label):
+            group_has_sub_rows = True
+        elif group_has_sub_rows:
+            group, group_has_sub_rows = None, False
+        parameter = f"{group} {label}" if group else label
+        conditions = columns if len(values) > 1 and columns and len(columns) == len(values) else [""] * len(values)
+        for condition, value in zip(conditions, values):
+            value_num, unit = parse_value(value)
+            rows.append({"parameter": parameter, "condition": condition, "value": value,
+                         "value_num": value_num, "unit": unit})
+    return rows
+
+def extract_specs(pages: List[Dict]) -> List[Dict]:
+    """
+    Extracts the typed spec rows of the technical data and fuse size tables of a manual.
+    """
+    specs = []
+    for page in pages:
+        for table in page["tables"]:
+            section = _table_section(page["text"], table)
+            if section is None:
+                continue
+            for row in parse_spec_table(table):
+                specs.append(dict(row, section=section, page=page["page_number"]))
+    return specs
+
+class SpecStore:
+    """
+    Per-machine technical data (parameter, condition, value, unit, page)
+    persisted in SQLite and held in memory for lookups.
+    """
+
+    def __init__(self, path: str = SPEC_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS manuals (machine TEXT PRIMARY KEY, sha256 TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS specs ("
+            "machine TEXT NOT NULL, section TEXT NOT NULL, parameter TEXT NOT NULL, condition TEXT NOT NULL, "
+            "value TEXT NOT NULL, value_num REAL, unit TEXT, page INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS specs_machine ON specs (machine)")
+        self._conn.commit()
+        self._rows: Optional[Dict[str, List[Dict]]] = None
+
+    def update(self, pdf_paths: List[str]) -> None:
+        """
+        Re-extracts the specs of new or changed manuals and drops removed ones.
+        """
+        with self._lock:
+            stored = dict(self._conn.execute("SELECT machine, sha256 FROM manuals").fetchall())
+            current = set()
+            for pdf_path in pdf_paths:
+                machine_name = os.path.splitext(os.path.basename(pdf_path))[0]
+                current.add(machine_name)
+                digest = file_sha256(pdf_path)
+                if stored.get(machine_name) == digest:
+                    continue
+                specs = extract_specs(get_pages(pdf_path))
+                self._conn.execute("DELETE FROM specs WHERE machine = ?", (machine_name,))
+                self._conn.executemany(
+                    "INSERT INTO specs (machine, section, parameter, condition, value, value_num, unit, page) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(machine_name, s["section"], s["parameter"], s["condition"], s["value"],
+                      s["value_num"], s["unit"], s["page"]) for s in specs]
+                )
+                self._conn.execute("INSERT OR REPLACE INTO manuals (machine, sha256) VALUES (?, ?)",
+                                   (machine_name, digest))
+                logger.info(f"Stored {len(specs)} technical data values of '{machine_name}'.")
+            for machine_name in set(stored) - current:
+                self._conn.execute("DELETE FROM specs WHERE machine = ?", (machine_name,))
+                self._conn.execute("DELETE FROM manuals WHERE machine = ?", (machine_name,))
+            self._conn.commit()
+            self._rows = None
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        with self._lock:
+            if self._rows is None:
+                rows: Dict[str, List[Dict]] = {}
+                for machine, section, parameter, condition, value, value_num, unit, page in self._conn.execute(
+                        "SELECT machine, section, parameter, condition, value, value_num, unit, page FROM specs"):
+                    rows.setdefault(machine.lower(), []).append({
+                        "machine": machine, "section": section, "parameter": parameter, "condition": condition,
+                        "value": value, "value_num": value_num, "unit": unit, "page": page,
+                        "words": set(_words(f"{parameter} {condition}")) - _STOPWORDS,
+                    })
+                self._rows = rows
+            return self._rows
+
+    def specs(self, machine: str) -> List[Dict]:
+        """
+        Returns all spec rows of a machine.
+        """
+        return self._load().get(machine.lower(), [])
+
+    def lookup(self, query: str, machines: List[str]) -> List[Dict]:
+        """
+        Returns the spec rows that best cover the question's content words.
+
+        Args:
+            query (str): User question.
+            machines (List[str]): Machines to search; empty searches every machine.
+
+        Returns:
+            List[Dict]: Best-matching rows (ties included), or [] if no row covers
+                at least SPEC_MIN_COVERAGE of the question. A row only counts when
+                it matches at least two content words, or, for a detected machine,
+                a parameter word other than a process name; "What is MIG?" and
+                "What is the current?" are left to the LLM.
+        """
+        rows = self._load()
+        detected = [m.lower() for m in machines if m.lower() in rows]
+        scope = detected or list(rows)
+        machine_words = {word for machine in rows for word in _words(machine)}
+        words = set(_words(query)) - _STOPWORDS - machine_words
+        if not words:
+            return []
+        best, matches = 0.0, []
+        for machine in scope:
+            for row in rows[machine]:
+                matched = words & row["words"]
+                if len(matched) < 2 and not (detected and matched - _PROCESS_WORDS):
+                    continue
+                coverage = len(matched) / len(words)
+                if coverage > best:
+                    best, matches = coverage, [row]
+                elif coverage == best and coverage > 0:
+                    matches.append(row)
+        return matches[:SPEC_MAX_ROWS] if best >= SPEC_MIN_COVERAGE else []
+
+def answer_spec_query(query: str, machines: List[str], store: SpecStore) -> Optional[Tuple[str, List[Document]]]:
+    """
+    Answers short technical-data questions ("open circuit voltage of the Warrior
+    Edge") from the spec store.
+
+    Args:
+        query (str): User question.
+        machines (List[str]): Detected machines; empty searches every machine.
+        store (SpecStore): Spec store.
+
+    Returns:
+        Optional[Tuple[str, List[Document]]]: Answer and source documents, or None
+            when the question should go to the LLM.
+    """
+    if len(query.split()) > SPEC_MAX_QUERY_WORDS:
+        return None
+    rows = store.lookup(query, machines)
+    if not rows:
+        return None
+    lines, sources = [], []
+    for row in rows:
+        condition = f" ({row['condition']})" if row["condition"] else ""
+        line = f"- **{row['machine']}** — {row['parameter']}{condition}: {row['value']} (manual page {row['page']})"
+        lines.append(line)
+        sources.append(Document(page_content=line[2:], metadata={
+            "machine": row["machine"], "page": row["page"], "source": "technical_data"}))
+    logger.info(f"Answered technical data query '{query}' from the spec store.")
+    return "\n".join(lines), sources
@@ -0,0 +1,154 @@
+# streaming.py
+
+import time
+import logging
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.prompts import format_document
+
+# Setup logger
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+SOURCE_SNIPPET_CHARS = 160
+
+# Streams are sequences of (kind, value) events: one ("sources", List[Document])
+# as soon as retrieval finishes, then ("token", str) while the LLM generates
+StreamEvent = Tuple[str, Any]
+
+def _chunk_text(chunk: Any) -> str:
+    # LLMs stream str, chat models stream message chunks
+    return chunk if isinstance(chunk, str) else getattr(chunk, "content", "") or ""
+
+def stream_retrieval_qa(qa_chain: Any, query: str) -> Iterator[StreamEvent]:
+    """
+    Streams a RetrievalQA ("stuff") chain: retrieves with the chain's retriever,
+    emits the documents, then streams the LLM over the chain's own prompt.
+
+    Args:
+        qa_chain (RetrievalQA): Chain built with chain_type="stuff".
+        query (str): User question.
+
+    Yields:
+        StreamEvent: ("sources", docs) once, then ("token", text) events.
+    """
+    docs = qa_chain.retriever.invoke(query)
+    yield "sources", docs
+
+    stuff_chain = qa_chain.combine_documents_chain
+    context = stuff_chain.document_separator.join(
+        format_document(doc, stuff_chain.document_prompt) for doc in docs
+    )
+    llm_chain = stuff_chain.llm_chain
+    inputs = {stuff_chain.document_variable_name: context, "question": query}
+    for chunk in (llm_chain.prompt | llm_chain.llm).stream(inputs):
+        yield "token", _chunk_text(chunk)
+
+def stream_retrieval_chain(retrieval_chain: Any, inputs: Dict[str, Any]) -> Iterator[StreamEvent]:
+    """
+    Streams a `create_retrieval_chain` runnable, which emits its "context"
+    before the "answer" chunks.
+
+    Args:
+        retrieval_chain (Runnable): Chain returned by create_retrieval_chain.
+        inputs (Dict[str, Any]): Chain inputs ("input", "chat_history", ...).
+
+    Yields:
+        StreamEvent: ("sources", docs) once, then ("token", text) events.
+    """
+    for chunk in retrieval_chain.stream(inputs):
+        if "context" in chunk:
+            yield "sources", chunk["context"]
+        if "answer" in chunk:
+            yield "token", _chunk_text(chunk["answer"])
+
+class AnswerStream:
+    """
+    Consumes a stream of events for the UI: sources can be fetched first, then
+    the tokens iterated (e.g. by st.write_stream). Records retrieval time,
+    time-to-first-token and total generation time.
+    """
+
+    def __init__(self, events: Iterable[StreamEvent]):
+        self._events = iter(events)
+        self._pending: List[StreamEvent] = []
+        self._started = time.perf_counter()
+        self.sources: Optional[List[Document]] = None
+        self.retrieval_ms: Optional[float] = None
+        self.ttft_ms: Optional[float] = None
+        self.total_ms: Optional[float] = None
+        self._parts: List[str] = []
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def _take_sources(self, docs: List[Document]) -> None:
+        # A retried stream re-emits its sources; keep the first set shown to the user
+        if self.sources is None:
+            self.sources = docs
+            self.retrieval_ms = self._elapsed_ms()
+
+    def wait_for_sources(self) -> List[Document]:
+        """
+        Advances the stream until the retrieved documents are available.
+
+        Returns:
+            List[Document]: Retrieved documents (empty if the stream emitted none).
+        """
+        for kind, value in self._events:
+            if kind == "sources":
+                self._take_sources(value)
+                break
+            self._pending.append((kind, value))
+        return self.sources or []
+
+    def tokens(self) -> Iterator[str]:
+        """
+        Yields the answer tokens as they arrive.
+        """
+        for kind, value in chain(self._pending, self._events):
+            if kind == "sources":
+                self._take_sources(value)
+            elif kind == "token" and value:
+                if self.ttft_ms is None:
+                    self.ttft_ms = self._elapsed_ms()
+                self._parts.append(value)
+                yield value
+        self._pending = []
+        self.total_ms = self._elapsed_ms()
+        logger.info(f"Streamed answer: retrieval {self.retrieval_ms or 0:.0f} ms, "
+                    f"first token {self.ttft_ms or 0:.0f} ms, total {self.total_ms:.0f} ms, "
+                    f"{len(self._parts)} chunks.")
+
+    @property
+    def answer(self) -> str:
+        return "".join(self._parts)
+
+def format_sources(docs: List[Document], snippet_chars: int = SOURCE_SNIPPET_CHARS) -> str:
+    """
+    Markdown list of the retrieved documents: machine, page and a short snippet.
+
+    Args:
+        docs (List[Document]): Retrieved documents.
+        snippet_chars (int): Maximum snippet length.
+
+    Returns:
+        str: One bullet per document.
+    """
+    lines = []
+    for doc in docs:
+        metadata = doc.metadata or {}
+        if metadata.get("sources"):
+            # Collapsed near-duplicate: every manual and page it appears in
+            label = "; ".join(f"{source['machine']}, p. {source['page']}" for source in metadata["sources"])
+        else:
+            label = metadata.get("machine") or metadata.get("source") or "Document"
+            if metadata.get("page") is not None:
+                label += f", p. {metadata['page']}"
+        snippet = " ".join(doc.page_content.split())
+        if len(snippet) > snippet_chars:
+            snippet = snippet[:snippet_chars].rstrip() + "…"
+        lines.append(f"- **{label}**: {snippet}")
+    return "\n".join(lines)
@@ -15,6 +15,7 @@ from prompt_fabricator_em_400i_500i import get_prompt as get_fabricator_em_400i_
 from prompt_fabricator_et_410ip import get_prompt as get_fabricator_et_410ip_prompt
 from prompt_warrior_edge import get_prompt as get_warrior_edge_prompt
 from prompt_warrior_500i import get_prompt as get_warrior_500i_prompt
+from streaming import AnswerStream, format_sources, stream_retrieval_chain
 
 # Define the list of ESAB machines with supported knowledge bases
 ESAB_MACHINES = ["Warrior-Edge", "Warrior 500i", "Fabricator EM 400i&500i", "Fabricator ET 410iP"]
@@ -162,15 +163,19 @@ if prompt := st.chat_input("Ask a question about ESAB or a specific machine"):
 
         # Generate response based on selected machine and include chat history from memory
         with st.chat_message("assistant"):
+            # Show the retrieved snippets as soon as retrieval finishes, then stream the answer
             with st.status("Thinking...", expanded=True) as status:
-                response = st.session_state.retrieval_chain.invoke({
+                stream = AnswerStream(stream_retrieval_chain(st.session_state.retrieval_chain, {
                     "input": prompt,
                     "machine": st.session_state.current_machine,
                     "chat_history": st.session_state.memory.load_memory_variables({})["chat_history"]
-                })
-                answer = response['answer']
-                status.update(label="Response ready!", state="complete", expanded=False)
-            st.markdown(answer)
+                }))
+                sources = stream.wait_for_sources()
+                if sources:
+                    st.markdown(format_sources(sources))
+                status.update(label=f"Sources ({len(sources)})", state="running")
+            answer = st.write_stream(stream.tokens())
+            status.update(label="Response ready!", state="complete", expanded=False)
             st.session_state.machine_chat_history[st.session_state.current_machine].append({"role": "assistant", "content": answer})
             # Update the conversation memory with the latest interaction
             st.session_state.memory.save_context({"input": prompt}, {"answer": answer})
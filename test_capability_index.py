@@ -0,0 +1,23 @@
+# test_capability_index.py
+
+from capability_index import answer_capability_query, asks_for_machines
+
+CAPABILITIES = {"TIG": ["Renegade ES 300i", "Warrior 500i"], "MMA": ["Renegade ES 300i", "Warrior 500i", "Warrior Edge"]}
+
+def test_asks_for_machines():
+    assert asks_for_machines("Which machines support TIG?")
+    assert asks_for_machines("List the MMA welders")
+    assert not asks_for_machines("Does it support TIG?")
+    assert not asks_for_machines("What is the duty cycle?")
+
+def test_answers_for_all_machines_without_detected_machines():
+    answer, _ = answer_capability_query("Which machines support TIG?", [], CAPABILITIES)
+    assert "Renegade ES 300i" in answer and "Warrior 500i" in answer
+
+def test_answers_for_detected_machines():
+    answer, _ = answer_capability_query("Does the Warrior Edge support TIG?", ["Warrior Edge"], CAPABILITIES)
+    assert answer == "- Warrior Edge: does not support TIG welding"
+
+def test_leaves_other_questions_to_the_llm():
+    assert answer_capability_query("What is the TIG duty cycle?", [], CAPABILITIES) is None
+    assert answer_capability_query("What is MIG?", [], CAPABILITIES) is None
@@ -0,0 +1,54 @@
+# test_embedding_pipeline.py
+
+import os
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+from embedding_pipeline import _checkpoint_path, embed_texts_concurrently
+
+class CountingEmbeddings(Embeddings):
+    model_name = "counting"
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        if self.fail_on in texts:
+            raise RuntimeError("embedding backend down")
+        return [[float(len(text)), float(text.count("a"))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+TEXTS = [f"chunk {'a' * i}" for i in range(10)]
+
+def test_resume_embeds_only_missing_batches(tmp_path):
+    failing = CountingEmbeddings(fail_on=TEXTS[7])
+    with pytest.raises(RuntimeError):
+        embed_texts_concurrently(TEXTS, failing, batch_size=3, max_concurrency=1, max_retries=0,
+                                 checkpoint_dir=str(tmp_path))
+    working = CountingEmbeddings()
+    vectors = embed_texts_concurrently(TEXTS, working, batch_size=3, max_concurrency=1, max_retries=0,
+                                       checkpoint_dir=str(tmp_path))
+    assert vectors == [[float(len(text)), float(text.count("a"))] for text in TEXTS]
+    # Batches checkpointed before the failure are not embedded again
+    assert TEXTS[6:9] in working.calls
+    assert all(text in TEXTS[6:] for call in working.calls for text in call)
+    # Checkpoints are removed after a successful build
+    assert not os.listdir(tmp_path)
+
+def test_resume_ignores_partial_checkpoint_files(tmp_path):
+    embeddings = CountingEmbeddings()
+    run_dir = _checkpoint_path(TEXTS, embeddings, 3, str(tmp_path))
+    os.makedirs(run_dir)
+    np.save(os.path.join(run_dir, "batch_000000.npy"), np.zeros((3, 2), dtype=np.float32))
+    # Left behind by a crash between np.save and os.replace
+    np.save(os.path.join(run_dir, "batch_000001.tmp.npy"), np.zeros((3, 2), dtype=np.float32))
+    with open(os.path.join(run_dir, "batch_000002.npy"), "wb") as f:
+        f.write(b"truncated")
+    vectors = embed_texts_concurrently(TEXTS, embeddings, batch_size=3, max_concurrency=1, max_retries=0,
+                                       checkpoint_dir=str(tmp_path))
+    assert vectors[:3] == [[0.0, 0.0]] * 3
+    assert embeddings.calls == [TEXTS[3:6], TEXTS[6:9], TEXTS[9:]]
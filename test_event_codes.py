@@ -0,0 +1,60 @@
+# test_event_codes.py
+
+from event_codes import EVENT_MAX_ACTIONS, EVENT_MAX_CAUSES, answer_event_code_query, parse_event_codes
+
+PAGES = [
+    {"page_number": 41, "text": "\n".join([
+        "8 EVENT CODES",
+        "#### x11 Wire feed speed fault",
+        "This event code is displayed due to one of the following:",
+        "- 311 - Wire saturation warning/error.",
+        "- 311 - Wire motor start/work current error.",
+    ])},
+    {"page_number": 42, "text": "\n".join([
+        # Running page header of the same section
+        "8 EVENT CODES",
+        "1. Check the correct liners/contact tip/torch used for types of welding wires.",
+        "2. Acknowledge by pressing any buttons on the control panel.",
+        "#### x36 External stop",
+        "- 736 - Fieldbus quickstop.",
+        "1. Acknowledge by pressing any buttons on the control panel.",
+        "2. Restart.",
+    ])},
+    {"page_number": 43, "text": "\n".join([
+        "9 TROUBLESHOOTING",
+        "Perform these checks and inspections before sending for an authorised service technician.",
+        "- No arc",
+        "1. Check that the mains power supply switch is turned ON.",
+        "10 ORDERING SPARE PARTS",
+        "2. Spare parts may be ordered through your nearest ESAB dealer.",
+    ])},
+]
+
+def test_entry_continues_across_running_page_headers():
+    entry = parse_event_codes(PAGES)["x11"]
+    assert entry["title"] == "Wire feed speed fault" and entry["page"] == 41
+    assert [cause["code"] for cause in entry["causes"]] == ["311", "311"]
+    assert entry["actions"] == ["Check the correct liners/contact tip/torch used for types of welding wires.",
+                                "Acknowledge by pressing any buttons on the control panel."]
+
+def test_last_entry_ends_at_the_next_section():
+    entry = parse_event_codes(PAGES)["x36"]
+    assert entry["causes"] == [{"code": "736", "text": "Fieldbus quickstop."}]
+    assert entry["actions"] == ["Acknowledge by pressing any buttons on the control panel.", "Restart."]
+
+def test_causes_and_actions_are_capped():
+    lines = ["#### x20 Thermal fault"]
+    lines += [f"- 420 - Cause {i}." for i in range(EVENT_MAX_CAUSES + 5)]
+    lines += [f"{i}. Action {i} " + "word " * 200 for i in range(1, EVENT_MAX_ACTIONS + 5)]
+    entry = parse_event_codes([{"page_number": 1, "text": "\n".join(lines)}])["x20"]
+    assert len(entry["causes"]) == EVENT_MAX_CAUSES
+    assert len(entry["actions"]) == EVENT_MAX_ACTIONS
+
+def test_answers_code_questions_from_the_index():
+    index = {"warrior edge": {"name": "Warrior Edge", "codes": parse_event_codes(PAGES)}}
+    answer, sources = answer_event_code_query("What does x36 mean?", [], index)
+    assert answer.startswith("**Warrior Edge — x36 External stop** (manual page 42)")
+    assert "2. Restart." in answer
+    assert sources[0].metadata == {"machine": "Warrior Edge", "page": 42, "source": "event_codes"}
+    # Bare numbers need a question about codes
+    assert answer_event_code_query("Set 736 amps", [], index) is None
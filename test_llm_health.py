@@ -0,0 +1,86 @@
+# test_llm_health.py
+
+import time
+from llm_health import CLOSED, HALF_OPEN, OPEN, BackendHealthMonitor
+
+class Probe:
+    """
+    Probe that fails while `down` is set and stops the monitor after each
+    call, so BackendHealthMonitor._run performs exactly one check.
+    """
+
+    def __init__(self):
+        self.down = True
+        self.calls = 0
+        self.states = []
+        self.monitor = None
+
+    def __call__(self):
+        self.calls += 1
+        self.states.append(self.monitor.state)
+        self.monitor.stop()
+        if self.down:
+            raise ConnectionError("connection refused")
+
+def make_monitor(**kwargs):
+    probe = Probe()
+    monitor = BackendHealthMonitor("ollama", probe, interval=0.01, **kwargs)
+    probe.monitor = monitor
+    return monitor, probe
+
+def run_once(monitor):
+    monitor._stop.clear()
+    monitor._run()
+
+def test_starts_unavailable_until_the_first_probe():
+    monitor, probe = make_monitor()
+    assert monitor.state == OPEN and not monitor.is_available()
+    probe.down = False
+    run_once(monitor)
+    assert monitor.state == CLOSED and monitor.is_available()
+
+def test_opens_after_threshold_consecutive_failures():
+    monitor, _ = make_monitor(failure_threshold=2, open_cooldown=30)
+    monitor.record_success()
+    monitor.record_failure(RuntimeError("timeout"))
+    assert monitor.state == CLOSED
+    monitor.record_success()
+    monitor.record_failure(RuntimeError("timeout"))
+    assert monitor.state == CLOSED
+    monitor.record_failure(RuntimeError("timeout"))
+    assert monitor.state == OPEN and monitor.cooldown == 30
+    assert monitor.status()["last_error"] == "timeout"
+
+def test_half_open_probe_failure_doubles_cooldown_up_to_the_maximum():
+    monitor, probe = make_monitor(open_cooldown=10, max_cooldown=25)
+    cooldowns = []
+    for _ in range(3):
+        monitor.opened_at -= monitor.cooldown
+        run_once(monitor)
+        cooldowns.append(monitor.cooldown)
+        assert monitor.state == OPEN
+    assert cooldowns == [10, 20, 25]
+
+def test_probe_waits_for_the_cooldown():
+    monitor, probe = make_monitor(open_cooldown=60)
+    monitor.record_success()
+    monitor.record_failure()
+    monitor.record_failure()
+    monitor.start()
+    time.sleep(0.1)
+    monitor.stop()
+    monitor._thread.join(timeout=2)
+    # The cooldown is not over, so the background thread has not probed
+    assert probe.calls == 0 and monitor.state == OPEN
+
+def test_half_open_probe_success_closes_the_circuit():
+    monitor, probe = make_monitor(open_cooldown=10)
+    run_once(monitor)
+    assert monitor.state == OPEN
+    probe.down = False
+    monitor.opened_at -= monitor.cooldown
+    run_once(monitor)
+    assert monitor.state == CLOSED and monitor.cooldown == 0.0
+    # Each probe after a cooldown ran in the half-open state
+    assert probe.states == [HALF_OPEN, HALF_OPEN]
+    assert monitor.status()["error_rate"] == 0.5
@@ -0,0 +1,38 @@
+# test_near_duplicates.py
+
+from langchain_core.documents import Document
+from near_duplicates import collapse_near_duplicates, containment, dedup_documents, shingles
+
+SHORT = "Set the wire feed speed with the right knob on the front panel before welding."
+LONG = (SHORT + " For 1.0 mm solid wire use 24 V and a shielding gas flow of 12 l/min; "
+        "increase the voltage for thicker plate and check the contact tip for wear.")
+
+def test_containment_is_relative_to_the_tested_chunk():
+    short, long = shingles(SHORT), shingles(LONG)
+    assert containment(short, long) == 1.0
+    assert containment(long, short) < 0.5
+
+def test_dedup_keeps_long_chunk_containing_a_higher_ranked_short_one():
+    docs = [Document(page_content=SHORT, metadata={"machine": "Warrior 500i"}),
+            Document(page_content=LONG, metadata={"machine": "Warrior 500i"})]
+    assert [doc.page_content for doc in dedup_documents(docs)] == [SHORT, LONG]
+
+def test_dedup_drops_short_chunk_contained_in_a_higher_ranked_long_one():
+    docs = [Document(page_content=LONG, metadata={"machine": "Warrior 500i"}),
+            Document(page_content=SHORT, metadata={"machine": "Warrior 500i"})]
+    assert [doc.page_content for doc in dedup_documents(docs)] == [LONG]
+
+def test_dedup_keeps_other_machines_values():
+    first = "Open circuit voltage of the power source, measured without load, in volts: 55 V"
+    second = "Open circuit voltage of the power source, measured without load, in volts: 68 V"
+    docs = [Document(page_content=first, metadata={"machine": "Warrior Edge"}),
+            Document(page_content=second, metadata={"machine": "Warrior 500i"})]
+    assert len(dedup_documents(docs)) == 2
+
+def test_collapse_merges_identical_chunks_of_different_machines():
+    text = "Always disconnect the mains supply before opening the casing of the power source. " * 3
+    docs = [Document(page_content=text, metadata={"machine": "Warrior Edge", "page": 4}),
+            Document(page_content=text, metadata={"machine": "Warrior 500i", "page": 5})]
+    kept, stats = collapse_near_duplicates(docs)
+    assert stats["collapsed"] == 1
+    assert kept[0].metadata["machines"] == ["Warrior 500i", "Warrior Edge"]
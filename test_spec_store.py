@@ -0,0 +1,48 @@
+# test_spec_store.py
+
+import pytest
+from spec_store import SpecStore, answer_spec_query
+
+ROWS = [
+    ("Warrior 500i", "TECHNICAL DATA", "Primary current", "MIG/MAG", "32 A", 32.0, "A", 12),
+    ("Warrior 500i", "TECHNICAL DATA", "Primary current", "MMA", "35 A", 35.0, "A", 12),
+    ("Warrior 500i", "TECHNICAL DATA", "Open circuit voltage", "", "68 V", 68.0, "V", 12),
+    ("Warrior Edge", "TECHNICAL DATA", "Open circuit voltage", "", "55 V", 55.0, "V", 9),
+    ("Warrior Edge", "TECHNICAL DATA", "Setting range", "MIG/MAG current", "16-400 A", None, "A", 9),
+]
+
+@pytest.fixture
+def store(tmp_path):
+    store = SpecStore(str(tmp_path / "specs.sqlite"))
+    store._conn.executemany(
+        "INSERT INTO specs (machine, section, parameter, condition, value, value_num, unit, page) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", ROWS)
+    store._conn.commit()
+    return store
+
+def values(rows):
+    return [(row["machine"], row["value"]) for row in rows]
+
+def test_parameter_question_for_a_machine(store):
+    assert values(store.lookup("Open circuit voltage of the Warrior Edge", ["Warrior Edge"])) == [("Warrior Edge", "55 V")]
+
+def test_multi_word_parameter_question_across_machines(store):
+    assert values(store.lookup("open circuit voltage", [])) == [("Warrior 500i", "68 V"), ("Warrior Edge", "55 V")]
+
+def test_single_word_for_a_detected_machine(store):
+    assert values(store.lookup("What is the primary current?", ["Warrior 500i"])) == [
+        ("Warrior 500i", "32 A"), ("Warrior 500i", "35 A")]
+    assert values(store.lookup("What is the voltage?", ["Warrior Edge"])) == [("Warrior Edge", "55 V")]
+
+def test_single_generic_word_without_a_machine_goes_to_the_llm(store):
+    assert store.lookup("What is the current?", []) == []
+    assert store.lookup("What is the voltage?", []) == []
+
+def test_process_name_alone_goes_to_the_llm(store):
+    assert store.lookup("What is MIG?", []) == []
+    assert store.lookup("What is MIG?", ["Warrior 500i"]) == []
+
+def test_answer_cites_machine_and_page(store):
+    answer, sources = answer_spec_query("open circuit voltage", ["Warrior Edge"], store)
+    assert answer == "- **Warrior Edge** — Open circuit voltage: 55 V (manual page 9)"
+    assert sources[0].metadata == {"machine": "Warrior Edge", "page": 9, "source": "technical_data"}
@@ -1,8 +1,8 @@
 # utils.py
 import base64
-import re
-from typing import List
-from fuzzywuzzy import fuzz
+from functools import lru_cache
+from typing import List, Tuple
+from machine_matcher import MachineMatcher
 import logging
 
 # Setup logger
@@ -30,6 +30,10 @@ def load_esab_logo(logo_path: str = "esab-logo.png") -> str:
         logger.warning(f"ESAB logo file '{logo_path}' not found.")
         return None
 
+@lru_cache(maxsize=8)
+def _machine_matcher(esab_machines: Tuple[str, ...]) -> MachineMatcher:
+    return MachineMatcher(list(esab_machines))
+
 def detect_machine_in_query(query: str, esab_machines: List[str]) -> List[str]:
     """
     Attempts to detect specific machine names from the user's query using exact and fuzzy matching.
@@ -42,39 +46,14 @@ def detect_machine_in_query(query: str, esab_machines: List[str]) -> List[str]:
         List[str]: List of detected machine names.
     """
     logger.info(f"Detecting machines in query: '{query}'.")
-    
-    # Normalize the query by replacing hyphens and other special characters
-    query_normalized = re.sub(r'[-]', ' ', query.lower())
-    machine_names = {re.sub(r'[-]', ' ', m.lower()): m for m in esab_machines}
-    detected = []
-
-    # Exact match
-    for machine_key, machine_original in machine_names.items():
-        pattern = re.compile(rf"\b{re.escape(machine_key)}\b", re.IGNORECASE)
-        if pattern.findall(query_normalized):
-            detected.append(machine_original)
-            logger.info(f"Exact match found for machine '{machine_original}' in query.")
+    matcher = _machine_matcher(tuple(esab_machines))
 
+    detected = matcher.exact(query)
     if detected:
         logger.info(f"Detected machines (exact match): {detected}.")
-        return list(set(detected))
-
-    # Fuzzy matching
-    for machine_key, machine_original in machine_names.items():
-        partial_score = fuzz.partial_ratio(machine_key, query_normalized)
-        token_set_score = fuzz.token_set_ratio(machine_key, query_normalized)
-        if max(partial_score, token_set_score) > 70:
-            detected.append(machine_original)
-            logger.info(f"Fuzzy match found for machine '{machine_original}' with scores {partial_score}, {token_set_score}.")
-
-    # Simple "plural" check
-    for machine_key, machine_original in machine_names.items():
-        if machine_original.endswith('i') and not machine_original.endswith('ii'):
-            plural = machine_original + 's'
-            if plural.lower() in query_normalized:
-                detected.append(machine_original)
-                logger.info(f"Plural match found for machine '{machine_original}' in query.")
+        return detected
 
-    logger.info(f"Detected machines (final): {list(set(detected))}.")
-    return list(set(detected))
+    detected = matcher.fuzzy(query)
+    logger.info(f"Detected machines (fuzzy match): {detected}.")
+    return detected
 